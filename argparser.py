@@ -1,5 +1,10 @@
 import argparse
 
+from copier import DEDUP_METHODS
+from logwriter import LOG_FORMATS, LOG_LEVELS
+from throttle import IO_CLASSES, valid_hours
+from utils import COMPARE_METHODS, DEFAULT_COMPARE_METHOD
+
 parser = argparse.ArgumentParser(description="Sync folders")
 parser.add_argument(
     "--source",
@@ -23,6 +28,215 @@ parser.add_argument(
     help="Log file",
     default="sync.log",
 )
+parser.add_argument(
+    "--index",
+    type=str,
+    help="Metadata index file, empty to disable it",
+    default="sync_index.db",
+)
+parser.add_argument(
+    "--watch",
+    action="store_true",
+    help="Sync on file system events, with a full sync every interval",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    help="Number of files copied or updated concurrently",
+    default=4,
+)
+parser.add_argument(
+    "--delta-threshold",
+    type=int,
+    help="Minimum size in bytes of files updated in place with a delta, 0 to disable it",
+    default=0,
+)
+parser.add_argument(
+    "--compare",
+    type=str,
+    choices=COMPARE_METHODS,
+    help="Hash algorithm used to compare files, or bytes to compare them directly",
+    default=DEFAULT_COMPARE_METHOD,
+)
+parser.add_argument(
+    "--log-level",
+    type=str,
+    choices=LOG_LEVELS,
+    help="Minimum level of the logged messages",
+    default="info",
+)
+parser.add_argument(
+    "--log-format",
+    type=str,
+    choices=LOG_FORMATS,
+    help="Log format, pipe separated text or JSON lines",
+    default="text",
+)
+parser.add_argument(
+    "--log-max-bytes",
+    type=int,
+    help="Size in bytes after which the log file is rotated, 0 to never rotate it",
+    default=0,
+)
+parser.add_argument(
+    "--log-backups",
+    type=int,
+    help="Number of rotated log files kept",
+    default=3,
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    help="Local port exposing the metrics in the Prometheus text format, 0 to disable it",
+    default=0,
+)
+parser.add_argument(
+    "--stats-file",
+    type=str,
+    help="File rewritten with the metrics after each pass",
+    default="",
+)
+parser.add_argument(
+    "--adaptive-interval",
+    action="store_true",
+    help="Shorten the interval while the source changes and back off while it is idle",
+)
+parser.add_argument(
+    "--min-interval",
+    type=int,
+    help="Shortest interval in seconds of the adaptive mode",
+    default=1,
+)
+parser.add_argument(
+    "--max-interval",
+    type=int,
+    help="Longest interval in seconds of the adaptive mode",
+    default=3600,
+)
+parser.add_argument(
+    "--dir-skip",
+    action="store_true",
+    help="Skip listing directories unchanged on both sides since the last pass, needs the index",
+)
+parser.add_argument(
+    "--full-verify-every",
+    type=int,
+    help="Number of passes between two passes listing every directory, 0 to never force them",
+    default=10,
+)
+parser.add_argument(
+    "--dry-run",
+    type=str,
+    nargs="?",
+    const="-",
+    help="Write the planned changes and their estimated duration as JSON to a file, or stdout, without syncing",
+    default="",
+)
+parser.add_argument(
+    "--detect-moves",
+    action="store_true",
+    help="Move files and folders moved in the source within the replica instead of copying them again, needs the index",
+)
+parser.add_argument(
+    "--dedup",
+    type=str,
+    choices=DEDUP_METHODS,
+    help="Share the content of identical files in the replica with hard links or reflinks, needs the index",
+    default="",
+)
+parser.add_argument(
+    "--max-bytes-per-second",
+    type=int,
+    help="Bytes read or written per second by copies, updates and hashes, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--max-ops-per-second",
+    type=int,
+    help="Operations applied to the replica per second, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--burst-seconds",
+    type=float,
+    help="Seconds of unused allowance saved up for bursts above the limits",
+    default=1.0,
+)
+parser.add_argument(
+    "--throttle-hours",
+    type=str,
+    help="Comma separated HH:MM-HH:MM windows the limits apply in, always if empty",
+    default="",
+)
+parser.add_argument(
+    "--nice",
+    type=int,
+    help="Niceness of the process, 0 to leave it unchanged",
+    default=0,
+)
+parser.add_argument(
+    "--io-class",
+    type=str,
+    choices=IO_CLASSES,
+    help="I/O scheduling class of the process, idle only uses the disk when no other process does",
+    default="",
+)
+parser.add_argument(
+    "--exclude",
+    type=str,
+    action="append",
+    help="Gitignore-style pattern of the paths left out of the sync, can be repeated",
+    default=[],
+)
+parser.add_argument(
+    "--include",
+    type=str,
+    action="append",
+    help="Gitignore-style pattern of the paths kept in the sync even if excluded, can be repeated",
+    default=[],
+)
+parser.add_argument(
+    "--min-size",
+    type=int,
+    help="Size in bytes under which files are left out of the sync, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--max-size",
+    type=int,
+    help="Size in bytes above which files are left out of the sync, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--min-age",
+    type=int,
+    help="Seconds since their last modification under which files are left out of the sync, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--max-age",
+    type=int,
+    help="Seconds since their last modification above which files are left out of the sync, 0 for no limit",
+    default=0,
+)
+parser.add_argument(
+    "--hash-workers",
+    type=int,
+    help="Number of files compared concurrently during the walk, up to the number of cores",
+    default=1,
+)
+parser.add_argument(
+    "--mount-concurrency",
+    type=int,
+    help="Directory listings and comparisons in flight per mount on high latency mounts, 0 for a sequential walk",
+    default=0,
+)
+parser.add_argument(
+    "--journal",
+    type=str,
+    help="Journal file of the running pass, used to resume it after an interruption, empty to disable it",
+    default="sync_journal.db",
+)
 
 ARGS = parser.parse_args()
 
@@ -43,6 +257,53 @@ def valid_args() -> tuple[bool, dict]:
         if ARGS.interval and ARGS.interval <= 0:
             parser.error("The interval sync must be greater than 0")
 
+        if ARGS.workers <= 0:
+            parser.error("The number of workers must be greater than 0")
+
+        if ARGS.delta_threshold < 0:
+            parser.error("The delta threshold can't be negative")
+
+        if ARGS.log_max_bytes < 0 or ARGS.log_backups < 0:
+            parser.error("The log rotation settings can't be negative")
+
+        if not 0 <= ARGS.metrics_port <= 65535:
+            parser.error("The metrics port must be between 0 and 65535")
+
+        if not 0 < ARGS.min_interval <= ARGS.max_interval:
+            parser.error(
+                "The minimum interval must be greater than 0 and not above the maximum interval"
+            )
+
+        if ARGS.full_verify_every < 0:
+            parser.error("The full verify cadence can't be negative")
+
+        if ARGS.max_bytes_per_second < 0 or ARGS.max_ops_per_second < 0:
+            parser.error("The rate limits can't be negative")
+
+        if ARGS.burst_seconds <= 0:
+            parser.error("The burst seconds must be greater than 0")
+
+        if not valid_hours(ARGS.throttle_hours):
+            parser.error("The throttle hours must be HH:MM-HH:MM windows separated by commas")
+
+        if not -20 <= ARGS.nice <= 19:
+            parser.error("The niceness must be between -20 and 19")
+
+        if min(ARGS.min_size, ARGS.max_size, ARGS.min_age, ARGS.max_age) < 0:
+            parser.error("The size and age limits can't be negative")
+
+        if ARGS.max_size and ARGS.min_size > ARGS.max_size:
+            parser.error("The minimum size can't be above the maximum size")
+
+        if ARGS.max_age and ARGS.min_age > ARGS.max_age:
+            parser.error("The minimum age can't be above the maximum age")
+
+        if ARGS.hash_workers <= 0:
+            parser.error("The number of hash workers must be greater than 0")
+
+        if ARGS.mount_concurrency < 0:
+            parser.error("The mount concurrency can't be negative")
+
         return True, vars(ARGS)
 
     return False, vars(ARGS)
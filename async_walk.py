@@ -0,0 +1,330 @@
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from diff import Change, Operation, diff_directory, scan_directory
+from filters import PathFilter
+from index import MetadataIndex
+from journal import Journal
+from utils import files_are_equal
+
+BATCHES_PER_TASK: int = 4
+HAND_OVER_TIMEOUT: float = 0.1
+
+
+class AsyncWalker:
+    """
+    AsyncWalker plans a sync with many directory listings and comparisons in flight at once,
+    for network mounts where every metadata call is a round trip. An asyncio loop running on
+    a background thread visits the directory pairs with a set of tasks, and offloads every
+    blocking call to a bounded thread pool. The calls touching each mount are limited by a
+    semaphore, so a slow mount is kept busy without being flooded.
+
+    The changes of each directory are handed over as one batch, before its subdirectories are
+    visited, so a folder is always planned for creation before anything inside it. With a journal,
+    a directory is recorded as completed once the consumer took its batch, so directories without
+    changes are handed over too. Subdirectories
+    are taken last in first out, so the walk stays close to depth first and the number of pending
+    directories follows the depth and width of the tree. Only a few batches per task are buffered
+    when the consumer falls behind.
+
+    Attributes:
+        concurrency (int): The number of blocking calls in flight per mount.
+        executor (ThreadPoolExecutor): The pool running the blocking calls.
+
+    Methods:
+        iter_plan(...) -> Iterator[Change]: Yield the changes that make the replica match the source.
+        close() -> None: Stop the pool.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency: int = concurrency
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=2 * concurrency, thread_name_prefix="AsyncWalker"
+        )
+
+    def __str__(self):
+        return "AsyncWalker"
+
+    def iter_plan(
+        self,
+        source_folder: str,
+        replica_folder: str,
+        compare: Callable[..., bool] = files_are_equal,
+        scan: Callable[[str], list[os.DirEntry] | None] = scan_directory,
+        directories: MetadataIndex | None = None,
+        filters: PathFilter | None = None,
+        journal: Journal | None = None,
+    ) -> Iterator[Change]:
+        """
+        Yield the changes that make the replica folder match the source folder, as the concurrent walk finds them
+
+        Unlike 'iter_plan' of the diff module, replica folders planned for creation are not checked
+        again before being visited, so folders moved into place by the consumer are not compared.
+
+        Parameters:
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
+            compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+                given their paths and their metadata as a stats keyword.
+            scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+            directories (MetadataIndex | None): The cache of directory pairs found in sync, None to list every directory.
+            filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+            journal (Journal | None): The progress of the pass, None to not record it.
+
+        Yields:
+            Change: The changes to apply to the replica, in an order respecting their dependencies.
+
+        Raises:
+            Exception: The error raised by a listing or a comparison, if any.
+        """
+        batches: queue.Queue = queue.Queue(maxsize=2 * self.concurrency * BATCHES_PER_TASK)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.run,
+            args=(
+                batches,
+                stop,
+                source_folder,
+                replica_folder,
+                compare,
+                scan,
+                directories,
+                filters,
+                journal,
+            ),
+            name="AsyncWalker",
+            daemon=True,
+        )
+        thread.start()
+
+        try:
+            while (batch := batches.get()) is not None:
+                if isinstance(batch, BaseException):
+                    raise batch
+                changes, completed = batch
+                yield from changes
+                if journal and completed is not None:
+                    journal.complete_directory(*completed)
+        finally:
+            stop.set()
+            thread.join()
+
+    def run(self, batches: queue.Queue, stop: threading.Event, *args) -> None:
+        """
+        Run the walk on its own event loop and hand over its end or its error
+
+        Parameters:
+            batches (queue.Queue): The queue receiving the batches of changes.
+            stop (threading.Event): Set by the consumer when it stops reading.
+            *args: The folders, callbacks and caches of the walk, see 'iter_plan'.
+
+        Returns:
+            None
+        """
+        try:
+            asyncio.run(self.walk(batches, stop, *args))
+            self.hand_over(batches, stop, None)
+        except BaseException as e:
+            self.hand_over(batches, stop, e)
+
+    @staticmethod
+    def hand_over(batches: queue.Queue, stop: threading.Event, item) -> bool:
+        """
+        Put an item in the queue of the consumer, giving up if the consumer stopped
+
+        Parameters:
+            batches (queue.Queue): The queue of the consumer.
+            stop (threading.Event): Set by the consumer when it stops reading.
+            item: The batch of changes with the directory it completes, an error or None at the end of the walk.
+
+        Returns:
+            bool: True if the item was queued, False if the consumer stopped.
+        """
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=HAND_OVER_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def walk(
+        self,
+        batches: queue.Queue,
+        stop: threading.Event,
+        source_folder: str,
+        replica_folder: str,
+        compare: Callable[..., bool],
+        scan: Callable[[str], list[os.DirEntry] | None],
+        directories: MetadataIndex | None,
+        filters: PathFilter | None,
+        journal: Journal | None,
+    ) -> None:
+        """
+        Visit every directory pair with concurrent tasks
+
+        Parameters:
+            batches (queue.Queue): The queue receiving the batches of changes.
+            stop (threading.Event): Set by the consumer when it stops reading.
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
+            compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+                given their paths and their metadata as a stats keyword.
+            scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+            directories (MetadataIndex | None): The cache of directory pairs found in sync.
+            filters (PathFilter | None): The rules excluding paths from the sync.
+            journal (Journal | None): The progress of the pass.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        semaphores: dict[int, asyncio.Semaphore] = {}
+
+        async def call(device: int | None, func: Callable, *args):
+            if device is None:
+                return await loop.run_in_executor(self.executor, func, *args)
+            async with semaphores[device]:
+                return await loop.run_in_executor(self.executor, func, *args)
+
+        source_device = (await call(None, os.stat, source_folder)).st_dev
+        replica_exists = await call(None, os.path.isdir, replica_folder)
+        replica_device = (
+            (await call(None, os.stat, replica_folder)).st_dev
+            if replica_exists
+            else source_device
+        )
+        for device in (source_device, replica_device):
+            semaphores.setdefault(device, asyncio.Semaphore(self.concurrency))
+
+        if not replica_exists and not await asyncio.to_thread(
+            self.hand_over,
+            batches,
+            stop,
+            ([Change(Operation.CREATE_FOLDER, "", source_folder, replica_folder)], None),
+        ):
+            return
+
+        work: asyncio.LifoQueue = asyncio.LifoQueue()
+        work.put_nowait((source_folder, replica_folder, "", replica_exists))
+
+        async def visit(source_dir, replica_dir, relative_dir, replica_exists):
+            state = None
+            completed = journal.completed_directory(relative_dir) if journal else None
+
+            if completed is not None:
+                for name in reversed(completed):
+                    work.put_nowait(
+                        (
+                            os.path.join(source_dir, name),
+                            os.path.join(replica_dir, name),
+                            os.path.join(relative_dir, name),
+                            await call(
+                                None, os.path.isdir, os.path.join(replica_dir, name)
+                            ),
+                        )
+                    )
+                return
+
+            if directories and replica_exists:
+                state = await call(
+                    replica_device, directories.directory_state, source_dir, replica_dir
+                )
+                cached = await call(
+                    None, directories.cached_directory, source_dir, replica_dir, state
+                )
+
+                if cached is not None:
+                    for name in reversed(cached):
+                        work.put_nowait(
+                            (
+                                os.path.join(source_dir, name),
+                                os.path.join(replica_dir, name),
+                                os.path.join(relative_dir, name),
+                                True,
+                            )
+                        )
+                    return
+
+            source_entries, replica_entries = await asyncio.gather(
+                call(source_device, scan, source_dir),
+                (
+                    call(replica_device, scan, replica_dir)
+                    if replica_exists
+                    else asyncio.sleep(0, result=[])
+                ),
+            )
+
+            if source_entries is None or replica_entries is None:
+                return
+
+            changes, subdirs = await call(
+                source_device,
+                diff_directory,
+                source_dir,
+                replica_dir,
+                relative_dir,
+                source_entries,
+                replica_entries,
+                compare,
+                filters,
+            )
+
+            names = [os.path.basename(subdir[0]) for subdir in subdirs]
+
+            if state and not changes:
+                await call(
+                    None,
+                    directories.store_directory,
+                    source_dir,
+                    replica_dir,
+                    state,
+                    names,
+                    len(source_entries),
+                )
+
+            if (changes or journal) and not await asyncio.to_thread(
+                self.hand_over, batches, stop, (changes, (relative_dir, names))
+            ):
+                stop.set()
+                return
+
+            for subdir in reversed(subdirs):
+                work.put_nowait(subdir)
+
+        async def task():
+            while not stop.is_set():
+                pair = await work.get()
+                try:
+                    await visit(*pair)
+                finally:
+                    work.task_done()
+
+        tasks = [asyncio.create_task(task()) for _ in range(2 * self.concurrency)]
+        joined = asyncio.create_task(work.join())
+
+        try:
+            done, _ = await asyncio.wait(
+                [joined, *tasks], return_when=asyncio.FIRST_COMPLETED
+            )
+            for finished in done:
+                if finished is not joined:
+                    finished.result()
+        finally:
+            for pending in (joined, *tasks):
+                pending.cancel()
+            await asyncio.gather(joined, *tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        """
+        Stop the pool
+
+        Returns:
+            None
+        """
+        self.executor.shutdown(wait=True)
+
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark of the file comparison strategies.
+
+Each strategy compares two identical files and two files differing in their
+first byte, for every requested size. Files are written once and then read
+from the page cache, so results measure CPU and syscall overhead rather than
+the disk, unless the cache is dropped between runs.
+
+Usage:
+    python -m benchmarks.bench_compare --sizes 1K,1M,64M,2G --dir /path/on/disk
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from utils import HASH_ALGORITHMS, bytes_are_equal, file_digest
+
+UNITS = {"K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(size: str) -> int:
+    """
+    Parse a size such as 64K, 10M or 2G.
+    :param size: str - The size with an optional unit suffix.
+    :return: int - The size in bytes.
+    """
+    size = size.strip().upper()
+    if size[-1] in UNITS:
+        return int(float(size[:-1]) * UNITS[size[-1]])
+    return int(size)
+
+
+def legacy_md5(file: str) -> str:
+    """
+    Hash a file the way files_are_equal originally did, with 4 KB reads.
+    :param file: str - The path to the file to be hashed.
+    :return: str - The hexadecimal MD5 digest.
+    """
+    digest = hashlib.md5()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def strategies() -> dict:
+    """
+    Get the compared strategies.
+    :return: dict - Functions comparing two files keyed by strategy name.
+    """
+    compared = {"md5 4K reads (legacy)": lambda a, b: legacy_md5(a) == legacy_md5(b)}
+
+    for algorithm in HASH_ALGORITHMS:
+        compared[algorithm] = (
+            lambda a, b, algorithm=algorithm: file_digest(a, algorithm)
+            == file_digest(b, algorithm)
+        )
+
+    compared["bytes"] = bytes_are_equal
+    return compared
+
+
+def write_file(path: str, size: int, first_byte: int) -> None:
+    """
+    Write a file of pseudo random content with a chosen first byte.
+    :param path: str - The path of the file.
+    :param size: int - The size in bytes.
+    :param first_byte: int - The value of the first byte.
+    :return: None
+    """
+    block = bytearray(os.urandom(min(size, 1024**2)))
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            chunk = block[: min(len(block), size - written)]
+            if written == 0 and chunk:
+                chunk[0] = first_byte
+            f.write(chunk)
+            written += len(chunk)
+
+
+def measure(compare, file1: str, file2: str, size: int) -> float:
+    """
+    Time a comparison, repeating it for small files to get a stable result.
+    :param compare: Callable - The comparison to run.
+    :param file1: str - The path to the first file.
+    :param file2: str - The path to the second file.
+    :param size: int - The size of the files in bytes.
+    :return: float - The mean duration of one comparison in seconds.
+    """
+    repeat = max(1, min(1000, (64 * 1024**2) // max(size, 1)))
+    started = time.perf_counter()
+    for _ in range(repeat):
+        compare(file1, file2)
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark file comparison strategies")
+    parser.add_argument("--sizes", default="1K,64K,1M,64M", help="Comma separated sizes")
+    parser.add_argument("--dir", default=None, help="Folder for the generated files")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench_compare_", dir=args.dir)
+    compared = strategies()
+
+    try:
+        print(f"{'size':>8} {'strategy':<24} {'equal MB/s':>12} {'differ MB/s':>12}")
+
+        for size in [parse_size(size) for size in args.sizes.split(",")]:
+            original = os.path.join(folder, "original")
+            same = os.path.join(folder, "same")
+            other = os.path.join(folder, "other")
+            write_file(original, size, 0)
+            shutil.copyfile(original, same)
+            write_file(other, size, 1)
+
+            for name, compare in compared.items():
+                equal = measure(compare, original, same, size)
+                differ = measure(compare, original, other, size)
+                print(
+                    f"{size:>8} {name:<24} "
+                    f"{2 * size / 1024**2 / equal:>12.1f} "
+                    f"{2 * size / 1024**2 / differ:>12.1f}"
+                )
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+End-to-end benchmark of sync passes on a synthetic tree.
+
+A source tree is generated with the requested number of files, size
+distribution and depth, then four passes are timed: the initial sync into
+an empty replica, two no-op resyncs and an incremental resync after a share
+of the files changed. The first no-op resync still hashes the files copied
+by the initial sync once, the second one shows the steady state. Each pass
+reports files/s, MB/s, counted syscalls, memory peaks and the time spent
+in each phase as recorded by the sync metrics.
+
+Run it on tmpfs to measure CPU overhead, or on a disk to include I/O:
+
+    python -m benchmarks.bench_sync --files 20000 --depth 4 --dir /dev/shm
+
+Syscalls are counted by wrapping the os functions used by the sync and the
+builtin open, plus the read/write syscall counters of /proc/self/io. The
+entries listed by os.scandir are wrapped too, and the first stat of each
+entry is counted as entry_stat, since DirEntry caches it afterwards.
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.bench_compare import parse_size
+from config import ConfigArgs
+from sync import Sync
+
+COUNTED_CALLS: tuple[str, ...] = (
+    "stat",
+    "lstat",
+    "scandir",
+    "listdir",
+    "open",
+    "remove",
+    "rename",
+    "replace",
+    "mkdir",
+    "utime",
+    "chmod",
+    "copy_file_range",
+    "sendfile",
+    "readv",
+)
+
+
+class CountedEntry:
+    """
+    Wrap a directory entry to count the stat syscalls made through it. DirEntry caches its
+    stat result, so only the first call for each follow_symlinks value reaches the kernel.
+    """
+
+    def __init__(self, entry: os.DirEntry, counter: Counter, lock: threading.Lock):
+        self.entry = entry
+        self.counter = counter
+        self.lock = lock
+        self.stated = set()
+
+    def __getattr__(self, name):
+        return getattr(self.entry, name)
+
+    def __fspath__(self):
+        return self.entry.path
+
+    def stat(self, *, follow_symlinks=True):
+        """
+        Get the stat result of the entry, counting the first call.
+        :param follow_symlinks: bool - Whether to follow a symbolic link.
+        :return: os.stat_result - The metadata of the entry.
+        """
+        if follow_symlinks not in self.stated:
+            self.stated.add(follow_symlinks)
+            with self.lock:
+                self.counter["entry_stat"] += 1
+        return self.entry.stat(follow_symlinks=follow_symlinks)
+
+
+class CountedScandir:
+    """
+    Wrap an os.scandir iterator to yield counted entries.
+    """
+
+    def __init__(self, iterator, counter: Counter, lock: threading.Lock):
+        self.iterator = iterator
+        self.counter = counter
+        self.lock = lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return self.iterator.__exit__(*args)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return CountedEntry(next(self.iterator), self.counter, self.lock)
+
+    def close(self):
+        self.iterator.close()
+
+
+@contextlib.contextmanager
+def count_syscalls():
+    """
+    Count the calls made through the os module functions that map to a syscall,
+    plus every builtin open and the first stat of every listed entry, while the context is active.
+    :return: Counter - The number of calls by function name, filled when the context exits.
+    """
+    counter = Counter()
+    lock = threading.Lock()
+    originals = {}
+
+    def counted(name, function):
+        def wrapper(*args, **kwargs):
+            with lock:
+                counter[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    for name in COUNTED_CALLS:
+        if hasattr(os, name):
+            originals[(os, name)] = getattr(os, name)
+            setattr(os, name, counted(name, getattr(os, name)))
+
+    scandir = os.scandir
+    os.scandir = lambda *args, **kwargs: CountedScandir(
+        scandir(*args, **kwargs), counter, lock
+    )
+
+    originals[(builtins, "open")] = builtins.open
+    builtins.open = counted("open", builtins.open)
+    io_before = read_proc_io()
+
+    try:
+        yield counter
+    finally:
+        for (module, name), function in originals.items():
+            setattr(module, name, function)
+
+        io_after = read_proc_io()
+        for key in ("syscr", "syscw"):
+            if key in io_before and key in io_after:
+                counter[key] = io_after[key] - io_before[key]
+
+
+def read_proc_io() -> dict[str, int]:
+    """
+    Read the I/O counters of the current process on Linux.
+    :return: dict[str, int] - The counters of /proc/self/io, empty if unavailable.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            return {
+                key: int(value)
+                for key, value in (line.split(": ") for line in f.read().splitlines())
+            }
+    except OSError:
+        return {}
+
+
+def parse_distribution(distribution: str) -> list[tuple[int, int]]:
+    """
+    Parse a size distribution such as 4K:70,256K:25,8M:5.
+    :param distribution: str - Comma separated size:weight pairs.
+    :return: list[tuple[int, int]] - The sizes in bytes with their weights.
+    """
+    pairs = []
+    for pair in distribution.split(","):
+        size, _, weight = pair.partition(":")
+        pairs.append((parse_size(size), int(weight or 1)))
+    return pairs
+
+
+def generate_tree(
+    folder: str,
+    files: int,
+    depth: int,
+    fanout: int,
+    distribution: list[tuple[int, int]],
+    rng: random.Random,
+) -> list[str]:
+    """
+    Generate a synthetic source tree.
+    :param folder: str - The root folder of the tree.
+    :param files: int - The number of files to create.
+    :param depth: int - The number of folder levels.
+    :param fanout: int - The number of subfolders per folder.
+    :param distribution: list[tuple[int, int]] - The file sizes with their weights.
+    :param rng: random.Random - The random generator.
+    :return: list[str] - The paths of the created files.
+    """
+    folders = [folder]
+    level = [folder]
+    for _ in range(depth):
+        level = [
+            os.path.join(parent, f"dir{index}")
+            for parent in level
+            for index in range(fanout)
+        ]
+        folders.extend(level)
+
+    for path in folders:
+        os.makedirs(path, exist_ok=True)
+
+    sizes = [size for size, weight in distribution]
+    weights = [weight for size, weight in distribution]
+    block = os.urandom(max(sizes))
+    paths = []
+
+    for index in range(files):
+        path = os.path.join(folders[index % len(folders)], f"file{index}.bin")
+        size = rng.choices(sizes, weights)[0]
+        offset = rng.randrange(0, max(len(block) - size, 0) + 1)
+        with open(path, "wb") as f:
+            f.write(block[offset : offset + size])
+        paths.append(path)
+
+    return paths
+
+
+def apply_churn(paths: list[str], churn: float, rng: random.Random) -> int:
+    """
+    Change a share of the source files: half are rewritten with the same size,
+    a quarter are deleted and a quarter of new files are created.
+    :param paths: list[str] - The paths of the source files.
+    :param churn: float - The share of files to change, between 0 and 1.
+    :param rng: random.Random - The random generator.
+    :return: int - The number of changed files.
+    """
+    changed = rng.sample(paths, int(len(paths) * churn))
+    quarter = len(changed) // 4
+
+    for path in changed[: len(changed) - 2 * quarter]:
+        size = os.path.getsize(path)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+
+    for path in changed[len(changed) - 2 * quarter : len(changed) - quarter]:
+        os.remove(path)
+
+    for index, path in enumerate(changed[len(changed) - quarter :]):
+        with open(f"{path}.new{index}", "wb") as f:
+            f.write(os.urandom(rng.randrange(1, 64 * 1024)))
+
+    return len(changed)
+
+
+def tree_size(folder: str) -> tuple[int, int]:
+    """
+    Count the files and bytes of a tree.
+    :param folder: str - The root folder of the tree.
+    :return: tuple[int, int] - The number of files and their total size in bytes.
+    """
+    files = size = 0
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def timed_pass(sync: Sync, source: str, replica: str, trace_heap: bool) -> dict:
+    """
+    Run and measure a sync pass.
+    :param sync: Sync - The synchronization to run.
+    :param source: str - The source folder.
+    :param replica: str - The replica folder.
+    :param trace_heap: bool - Whether to trace the Python heap peak, which slows the pass down.
+    :return: dict - The duration, counted syscalls and memory peaks of the pass.
+    """
+    if trace_heap:
+        tracemalloc.start()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with count_syscalls() as syscalls:
+            started = time.perf_counter()
+            sync.sync_folders(source, replica)
+            elapsed = time.perf_counter() - started
+
+    heap_peak = None
+    if trace_heap:
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "elapsed": elapsed,
+        "syscalls": syscalls,
+        "heap_peak": heap_peak,
+        "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "phases": {
+            name: seconds
+            for name, seconds in sync.metrics.last_pass.items()
+            if name.endswith("_seconds") and name != "finished_timestamp_seconds"
+        },
+    }
+
+
+def report(name: str, result: dict, files: int, size: int) -> None:
+    """
+    Print the measures of a pass.
+    :param name: str - The name of the pass.
+    :param result: dict - The measures returned by timed_pass.
+    :param files: int - The number of files in the source tree.
+    :param size: int - The number of bytes in the source tree.
+    :return: None
+    """
+    elapsed = max(result["elapsed"], 1e-9)
+    syscalls = result["syscalls"]
+    counted = sum(
+        count for call, count in syscalls.items() if call not in ("syscr", "syscw")
+    )
+    details = ", ".join(f"{call}={count}" for call, count in sorted(syscalls.items()))
+
+    heap = (
+        f"heap peak {result['heap_peak'] / 1024 ** 2:.1f} MB, "
+        if result["heap_peak"] is not None
+        else ""
+    )
+
+    print(
+        f"{name:<12} {elapsed:>9.3f}s {files / elapsed:>12.1f} files/s "
+        f"{size / 1024 ** 2 / elapsed:>10.1f} MB/s "
+        f"{counted:>9} calls ({counted / max(files, 1):.1f}/file) "
+        f"{heap}max RSS {result['max_rss'] / 1024 ** 2:.1f} MB"
+    )
+    print(f"{'':<12} {details}")
+    phases = ", ".join(
+        f"{name.removesuffix('_seconds')}={seconds:.3f}s"
+        for name, seconds in sorted(result["phases"].items())
+    )
+    print(f"{'':<12} {phases}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark sync passes")
+    parser.add_argument("--files", type=int, default=5000, help="Number of files")
+    parser.add_argument("--depth", type=int, default=3, help="Folder levels")
+    parser.add_argument("--fanout", type=int, default=4, help="Subfolders per folder")
+    parser.add_argument(
+        "--sizes", default="4K:70,64K:25,1M:5", help="Size distribution as size:weight"
+    )
+    parser.add_argument(
+        "--churn", type=float, default=0.05, help="Share of files changed"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Sync workers")
+    parser.add_argument("--compare", default="sha256", help="Compare method")
+    parser.add_argument("--no-index", action="store_true", help="Disable the index")
+    parser.add_argument(
+        "--dir-skip", action="store_true", help="Skip unchanged directories"
+    )
+    parser.add_argument(
+        "--hash-workers", type=int, default=1, help="Files compared concurrently"
+    )
+    parser.add_argument("--dir", default=None, help="Folder for the generated trees")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--trace-heap", action="store_true", help="Report the Python heap peak"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    folder = tempfile.mkdtemp(prefix="bench_sync_", dir=args.dir)
+    source = os.path.join(folder, "source")
+    replica = os.path.join(folder, "replica")
+    os.makedirs(replica)
+
+    try:
+        paths = generate_tree(
+            source,
+            args.files,
+            args.depth,
+            args.fanout,
+            parse_distribution(args.sizes),
+            rng,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync = Sync(
+                configuration=ConfigArgs(
+                    source,
+                    replica,
+                    60,
+                    os.path.join(folder, "sync.log"),
+                    "" if args.no_index else os.path.join(folder, "index.db"),
+                    workers=args.workers,
+                    compare_method=args.compare,
+                    dir_skip=args.dir_skip,
+                    hash_workers=args.hash_workers,
+                    journal_file=os.path.join(folder, "journal.db"),
+                )
+            )
+        sync.log_writer.echo = False
+
+        files, size = tree_size(source)
+        print(f"{files} files, {size / 1024 ** 2:.1f} MB in {source}")
+
+        passes = [("initial", None), ("no-op", None), ("no-op", None)]
+        passes.append(("incremental", lambda: apply_churn(paths, args.churn, rng)))
+
+        for name, prepare in passes:
+            if prepare:
+                print(f"{prepare()} files changed")
+                files, size = tree_size(source)
+            result = timed_pass(sync, source, replica, args.trace_heap)
+            report(name, result, files, size)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from .absconfig import AbstractConfig
 from .arg_config import ConfigArgs
 from .file_config import ConfigFile
+from .job_config import ConfigJob
 
-__all__ = ["AbstractConfig", "ConfigArgs", "ConfigFile"]
+__all__ = ["AbstractConfig", "ConfigArgs", "ConfigFile", "ConfigJob"]
@@ -1,6 +1,9 @@
 from abc import ABC
 
-from utils import valid_path_folder
+from copier import DEDUP_METHODS
+from logwriter import LOG_FORMATS, LOG_LEVELS
+from throttle import IO_CLASSES, valid_hours
+from utils import COMPARE_METHODS, DEFAULT_COMPARE_METHOD, valid_path_folder
 
 
 class AbstractConfig(ABC):
@@ -12,6 +15,39 @@ class AbstractConfig(ABC):
         replica_folder (str): The replica folder path for syncing.
         interval_sync (int): The interval in seconds for syncing.
         log_file (str): The path to the log file.
+        index_file (str): The path to the metadata index, empty to disable it.
+        watch (bool): Whether to sync on inotify events instead of only every interval.
+        workers (int): The number of threads copying and updating files concurrently.
+        delta_threshold (int): The minimum size in bytes of files updated in place with a delta, 0 to disable it.
+        compare_method (str): The hash algorithm used to compare files, or "bytes" to compare them directly.
+        log_level (str): The minimum level of the logged messages.
+        log_format (str): "text" for the pipe separated log format, "json" for JSON lines.
+        log_max_bytes (int): The size in bytes after which the log file is rotated, 0 to never rotate it.
+        log_backups (int): The number of rotated log files kept.
+        metrics_port (int): The local port exposing the metrics in the Prometheus text format, 0 to disable it.
+        stats_file (str): The path to the file rewritten with the metrics after each pass, empty to disable it.
+        adaptive_interval (bool): Whether the interval shrinks while the source changes and backs off while it is idle.
+        min_interval (int): The shortest interval in seconds of the adaptive mode.
+        max_interval (int): The longest interval in seconds of the adaptive mode.
+        dir_skip (bool): Whether directories unchanged on both sides since they were found in sync are not listed again.
+        full_verify_every (int): The number of passes between two passes listing every directory, 0 to never force them.
+        dry_run (str): The file receiving the JSON report of the planned changes instead of syncing, "-" for stdout, empty to sync.
+        detect_moves (bool): Whether files and folders moved in the source are moved in the replica instead of copied again.
+        dedup (str): "hardlink" or "reflink" to share the content of identical files in the replica, empty to copy every file.
+        max_bytes_per_second (int): The bytes read or written per second by copies, updates and hashes, 0 for no limit.
+        max_ops_per_second (int): The operations applied to the replica per second, 0 for no limit.
+        burst_seconds (float): The seconds of unused allowance saved up for bursts above the limits.
+        throttle_hours (str): The comma separated HH:MM-HH:MM windows the limits apply in, empty for always.
+        nice (int): The niceness of the process, 0 to leave it unchanged.
+        io_class (str): The I/O scheduling class of the process, "best-effort" or "idle", empty to leave it unchanged.
+        exclude (list[str]): The gitignore-style patterns of the paths left out of the sync, "!" patterns include paths back.
+        min_size (int): The size in bytes under which files are left out of the sync, 0 for no limit.
+        max_size (int): The size in bytes above which files are left out of the sync, 0 for no limit.
+        min_age (int): The seconds since their last modification under which files are left out of the sync, 0 for no limit.
+        max_age (int): The seconds since their last modification above which files are left out of the sync, 0 for no limit.
+        hash_workers (int): The number of threads comparing files concurrently during the walk, 1 to compare them one by one.
+        mount_concurrency (int): The number of directory listings and comparisons in flight per mount, 0 to walk one directory at a time.
+        journal_file (str): The path to the journal of the running pass, used to resume it after an interruption, empty to disable it.
 
     Methods:
         valid_configs(): Checks if the configuration arguments are valid by verifying the source and replica folders.
@@ -22,6 +58,39 @@ class AbstractConfig(ABC):
         self.replica_folder: str = ...
         self.interval_sync: int = ...
         self.log_file: str = ...
+        self.index_file: str = "sync_index.db"
+        self.watch: bool = False
+        self.workers: int = 4
+        self.delta_threshold: int = 0
+        self.compare_method: str = DEFAULT_COMPARE_METHOD
+        self.log_level: str = "info"
+        self.log_format: str = "text"
+        self.log_max_bytes: int = 0
+        self.log_backups: int = 3
+        self.metrics_port: int = 0
+        self.stats_file: str = ""
+        self.adaptive_interval: bool = False
+        self.min_interval: int = 1
+        self.max_interval: int = 3600
+        self.dir_skip: bool = False
+        self.full_verify_every: int = 10
+        self.dry_run: str = ""
+        self.detect_moves: bool = False
+        self.dedup: str = ""
+        self.max_bytes_per_second: int = 0
+        self.max_ops_per_second: int = 0
+        self.burst_seconds: float = 1.0
+        self.throttle_hours: str = ""
+        self.nice: int = 0
+        self.io_class: str = ""
+        self.exclude: list[str] = []
+        self.min_size: int = 0
+        self.max_size: int = 0
+        self.min_age: int = 0
+        self.max_age: int = 0
+        self.hash_workers: int = 1
+        self.mount_concurrency: int = 0
+        self.journal_file: str = "sync_journal.db"
 
     def valid_configs(self) -> bool:
         """
@@ -45,6 +114,93 @@ class AbstractConfig(ABC):
         ):
             return False
 
+        if not isinstance(self.workers, int) or self.workers <= 0:
+            return False
+
+        if not isinstance(self.delta_threshold, int) or self.delta_threshold < 0:
+            return False
+
+        if self.compare_method not in COMPARE_METHODS:
+            return False
+
+        if self.log_level not in LOG_LEVELS or self.log_format not in LOG_FORMATS:
+            return False
+
+        if not isinstance(self.log_max_bytes, int) or self.log_max_bytes < 0:
+            return False
+
+        if not isinstance(self.log_backups, int) or self.log_backups < 0:
+            return False
+
+        if not isinstance(self.metrics_port, int) or not 0 <= self.metrics_port <= 65535:
+            return False
+
+        if (
+            not isinstance(self.min_interval, int)
+            or not isinstance(self.max_interval, int)
+            or not 0 < self.min_interval <= self.max_interval
+        ):
+            return False
+
+        if not isinstance(self.full_verify_every, int) or self.full_verify_every < 0:
+            return False
+
+        if not isinstance(self.dry_run, str):
+            return False
+
+        if self.dedup and self.dedup not in DEDUP_METHODS:
+            return False
+
+        if (
+            not isinstance(self.max_bytes_per_second, int)
+            or not isinstance(self.max_ops_per_second, int)
+            or self.max_bytes_per_second < 0
+            or self.max_ops_per_second < 0
+        ):
+            return False
+
+        if (
+            not isinstance(self.burst_seconds, (int, float))
+            or self.burst_seconds <= 0
+            or not isinstance(self.throttle_hours, str)
+            or not valid_hours(self.throttle_hours)
+        ):
+            return False
+
+        if not isinstance(self.nice, int) or not -20 <= self.nice <= 19:
+            return False
+
+        if self.io_class and self.io_class not in IO_CLASSES:
+            return False
+
+        if not isinstance(self.exclude, list) or not all(
+            isinstance(pattern, str) for pattern in self.exclude
+        ):
+            return False
+
+        if not all(
+            isinstance(value, int)
+            for value in (self.min_size, self.max_size, self.min_age, self.max_age)
+        ):
+            return False
+
+        if min(self.min_size, self.max_size, self.min_age, self.max_age) < 0:
+            return False
+
+        if self.max_size and self.min_size > self.max_size:
+            return False
+
+        if self.max_age and self.min_age > self.max_age:
+            return False
+
+        if (
+            not isinstance(self.hash_workers, int)
+            or not isinstance(self.mount_concurrency, int)
+            or self.hash_workers <= 0
+            or self.mount_concurrency < 0
+        ):
+            return False
+
         return True
 
     def __str__(self):
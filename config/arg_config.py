@@ -1,10 +1,15 @@
+import sys
+
+from utils import DEFAULT_COMPARE_METHOD
+
 from .absconfig import AbstractConfig
 
 
 class ConfigArgs(AbstractConfig):
     """
     ConfigArgs class represents a configuration object with specific arguments for source folder,
-    replica folder, interval sync, and log file.
+    replica folder, interval sync, log file, metadata index, watch mode, workers, delta threshold,
+    compare method and log settings.
     It inherits from AbstractConfig class and validates the configuration arguments upon initialization.
     If the configuration arguments are invalid, an exception is raised.
 
@@ -13,6 +18,39 @@ class ConfigArgs(AbstractConfig):
         replica_folder (str): The replica folder path.
         interval_sync (int): The interval for synchronization (default is 60 seconds).
         log_file (str): The log file path (default is "sync.log").
+        index_file (str): The metadata index path, empty to disable it (default is "sync_index.db").
+        watch (bool): Whether to sync on inotify events instead of only every interval (default is False).
+        workers (int): The number of threads copying and updating files concurrently (default is 4).
+        delta_threshold (int): The minimum size in bytes of files updated in place with a delta, 0 to disable it (default is 0).
+        compare_method (str): The hash algorithm used to compare files, or "bytes" to compare them directly (default is "sha256").
+        log_level (str): The minimum level of the logged messages (default is "info").
+        log_format (str): "text" for the pipe separated log format, "json" for JSON lines (default is "text").
+        log_max_bytes (int): The size in bytes after which the log file is rotated, 0 to never rotate it (default is 0).
+        log_backups (int): The number of rotated log files kept (default is 3).
+        metrics_port (int): The local port exposing the metrics in the Prometheus text format, 0 to disable it (default is 0).
+        stats_file (str): The path to the file rewritten with the metrics after each pass, empty to disable it (default is "").
+        adaptive_interval (bool): Whether the interval shrinks while the source changes and backs off while it is idle (default is False).
+        min_interval (int): The shortest interval in seconds of the adaptive mode (default is 1).
+        max_interval (int): The longest interval in seconds of the adaptive mode (default is 3600).
+        dir_skip (bool): Whether directories unchanged on both sides since they were found in sync are not listed again (default is False).
+        full_verify_every (int): The number of passes between two passes listing every directory, 0 to never force them (default is 10).
+        dry_run (str): The file receiving the JSON report of the planned changes instead of syncing, "-" for stdout, empty to sync (default is "").
+        detect_moves (bool): Whether files and folders moved in the source are moved in the replica instead of copied again (default is False).
+        dedup (str): "hardlink" or "reflink" to share the content of identical files in the replica, empty to copy every file (default is "").
+        max_bytes_per_second (int): The bytes read or written per second by copies, updates and hashes, 0 for no limit (default is 0).
+        max_ops_per_second (int): The operations applied to the replica per second, 0 for no limit (default is 0).
+        burst_seconds (float): The seconds of unused allowance saved up for bursts above the limits (default is 1.0).
+        throttle_hours (str): The comma separated HH:MM-HH:MM windows the limits apply in, empty for always (default is "").
+        nice (int): The niceness of the process, 0 to leave it unchanged (default is 0).
+        io_class (str): The I/O scheduling class of the process, "best-effort" or "idle", empty to leave it unchanged (default is "").
+        exclude (list[str]): The gitignore-style patterns of the paths left out of the sync, "!" patterns include paths back (default is None).
+        min_size (int): The size in bytes under which files are left out of the sync, 0 for no limit (default is 0).
+        max_size (int): The size in bytes above which files are left out of the sync, 0 for no limit (default is 0).
+        min_age (int): The seconds since their last modification under which files are left out of the sync, 0 for no limit (default is 0).
+        max_age (int): The seconds since their last modification above which files are left out of the sync, 0 for no limit (default is 0).
+        hash_workers (int): The number of threads comparing files concurrently during the walk, 1 to compare them one by one (default is 1).
+        mount_concurrency (int): The number of directory listings and comparisons in flight per mount, 0 to walk one directory at a time (default is 0).
+        journal_file (str): The journal path of the running pass, used to resume it after an interruption, empty to disable it (default is "sync_journal.db").
 
     Methods:
         __init__: Initializes the ConfigArgs object with the provided configuration arguments and validates them.
@@ -28,13 +66,79 @@ class ConfigArgs(AbstractConfig):
         replica_folder: str,
         interval_sync: int = 60,
         log_file: str = "sync.log",
+        index_file: str = "sync_index.db",
+        watch: bool = False,
+        workers: int = 4,
+        delta_threshold: int = 0,
+        compare_method: str = DEFAULT_COMPARE_METHOD,
+        log_level: str = "info",
+        log_format: str = "text",
+        log_max_bytes: int = 0,
+        log_backups: int = 3,
+        metrics_port: int = 0,
+        stats_file: str = "",
+        adaptive_interval: bool = False,
+        min_interval: int = 1,
+        max_interval: int = 3600,
+        dir_skip: bool = False,
+        full_verify_every: int = 10,
+        dry_run: str = "",
+        detect_moves: bool = False,
+        dedup: str = "",
+        max_bytes_per_second: int = 0,
+        max_ops_per_second: int = 0,
+        burst_seconds: float = 1.0,
+        throttle_hours: str = "",
+        nice: int = 0,
+        io_class: str = "",
+        exclude: list[str] | None = None,
+        min_size: int = 0,
+        max_size: int = 0,
+        min_age: int = 0,
+        max_age: int = 0,
+        hash_workers: int = 1,
+        mount_concurrency: int = 0,
+        journal_file: str = "sync_journal.db",
     ):
-        print("Using configuration arguments")
+        print("Using configuration arguments", file=sys.stderr)
 
         self.source_folder: str = source_folder
         self.replica_folder: str = replica_folder
         self.interval_sync: int = interval_sync
         self.log_file: str = log_file
+        self.index_file: str = index_file
+        self.watch: bool = watch
+        self.workers: int = workers
+        self.delta_threshold: int = delta_threshold
+        self.compare_method: str = compare_method
+        self.log_level: str = log_level
+        self.log_format: str = log_format
+        self.log_max_bytes: int = log_max_bytes
+        self.log_backups: int = log_backups
+        self.metrics_port: int = metrics_port
+        self.stats_file: str = stats_file
+        self.adaptive_interval: bool = adaptive_interval
+        self.min_interval: int = min_interval
+        self.max_interval: int = max_interval
+        self.dir_skip: bool = dir_skip
+        self.full_verify_every: int = full_verify_every
+        self.dry_run: str = dry_run
+        self.detect_moves: bool = detect_moves
+        self.dedup: str = dedup
+        self.max_bytes_per_second: int = max_bytes_per_second
+        self.max_ops_per_second: int = max_ops_per_second
+        self.burst_seconds: float = burst_seconds
+        self.throttle_hours: str = throttle_hours
+        self.nice: int = nice
+        self.io_class: str = io_class
+        self.exclude: list[str] = exclude or []
+        self.min_size: int = min_size
+        self.max_size: int = max_size
+        self.min_age: int = min_age
+        self.max_age: int = max_age
+        self.hash_workers: int = hash_workers
+        self.mount_concurrency: int = mount_concurrency
+        self.journal_file: str = journal_file
 
         if not self.valid_configs():
             raise Exception("Invalid configuration arguments, check your paths")
@@ -1,8 +1,10 @@
 import json
 import os
+import sys
 
 from config.absconfig import AbstractConfig
-from utils import create_folder, valid_path_folder
+from config.job_config import ConfigJob
+from utils import DEFAULT_COMPARE_METHOD, create_folder, valid_path_folder
 
 
 class ConfigFile(AbstractConfig):
@@ -15,6 +17,40 @@ class ConfigFile(AbstractConfig):
         replica_folder (str): The replica folder path for syncing.
         interval_sync (int): The interval in seconds for syncing.
         log_file (str): The path to the log file.
+        index_file (str): The path to the metadata index, empty to disable it.
+        watch (bool): Whether to sync on inotify events instead of only every interval.
+        workers (int): The number of threads copying and updating files concurrently.
+        delta_threshold (int): The minimum size in bytes of files updated in place with a delta, 0 to disable it.
+        compare_method (str): The hash algorithm used to compare files, or "bytes" to compare them directly.
+        log_level (str): The minimum level of the logged messages.
+        log_format (str): "text" for the pipe separated log format, "json" for JSON lines.
+        log_max_bytes (int): The size in bytes after which the log file is rotated, 0 to never rotate it.
+        log_backups (int): The number of rotated log files kept.
+        metrics_port (int): The local port exposing the metrics in the Prometheus text format, 0 to disable it.
+        stats_file (str): The path to the file rewritten with the metrics after each pass, empty to disable it.
+        adaptive_interval (bool): Whether the interval shrinks while the source changes and backs off while it is idle.
+        min_interval (int): The shortest interval in seconds of the adaptive mode.
+        max_interval (int): The longest interval in seconds of the adaptive mode.
+        dir_skip (bool): Whether directories unchanged on both sides since they were found in sync are not listed again.
+        full_verify_every (int): The number of passes between two passes listing every directory, 0 to never force them.
+        dry_run (str): The file receiving the JSON report of the planned changes instead of syncing, "-" for stdout, empty to sync.
+        detect_moves (bool): Whether files and folders moved in the source are moved in the replica instead of copied again.
+        dedup (str): "hardlink" or "reflink" to share the content of identical files in the replica, empty to copy every file.
+        max_bytes_per_second (int): The bytes read or written per second by copies, updates and hashes, 0 for no limit.
+        max_ops_per_second (int): The operations applied to the replica per second, 0 for no limit.
+        burst_seconds (float): The seconds of unused allowance saved up for bursts above the limits.
+        throttle_hours (str): The comma separated HH:MM-HH:MM windows the limits apply in, empty for always.
+        nice (int): The niceness of the process, 0 to leave it unchanged.
+        io_class (str): The I/O scheduling class of the process, "best-effort" or "idle", empty to leave it unchanged.
+        exclude (list[str]): The gitignore-style patterns of the paths left out of the sync, "!" patterns include paths back.
+        min_size (int): The size in bytes under which files are left out of the sync, 0 for no limit.
+        max_size (int): The size in bytes above which files are left out of the sync, 0 for no limit.
+        min_age (int): The seconds since their last modification under which files are left out of the sync, 0 for no limit.
+        max_age (int): The seconds since their last modification above which files are left out of the sync, 0 for no limit.
+        hash_workers (int): The number of threads comparing files concurrently during the walk, 1 to compare them one by one.
+        mount_concurrency (int): The number of directory listings and comparisons in flight per mount, 0 to walk one directory at a time.
+        journal_file (str): The path to the journal of the running pass, used to resume it after an interruption, empty to disable it.
+        jobs (list[dict]): The sync jobs run by one scheduler, each with its own folders and options, empty to sync a single pair.
 
     Methods:
         valid_configs(): Checks if the configuration file is valid by verifying the source and replica folders.
@@ -25,6 +61,7 @@ class ConfigFile(AbstractConfig):
         get_configs() -> json: Get the configuration file loaded as a JSON object.
         reset_configs() -> None: Reset the configuration file by overwriting its content.
         write_configs(key: str, value: str) -> bool: Write the configuration file with a key-value pair.
+        job_configs() -> list[ConfigJob]: Get the configurations of the sync jobs.
 
     Raises:
         Exception: If the configuration file is invalid.
@@ -34,16 +71,50 @@ class ConfigFile(AbstractConfig):
     """
 
     def __init__(self):
-        print("Using configuration file")
+        print("Using configuration file", file=sys.stderr)
         self.config_file: str = "config.json"
         self.source_folder: str = ""
         self.replica_folder: str = ""
         self.interval_sync: int = 60
         self.log_file: str = "sync.log"
+        self.index_file: str = "sync_index.db"
+        self.watch: bool = False
+        self.workers: int = 4
+        self.delta_threshold: int = 0
+        self.compare_method: str = DEFAULT_COMPARE_METHOD
+        self.log_level: str = "info"
+        self.log_format: str = "text"
+        self.log_max_bytes: int = 0
+        self.log_backups: int = 3
+        self.metrics_port: int = 0
+        self.stats_file: str = ""
+        self.adaptive_interval: bool = False
+        self.min_interval: int = 1
+        self.max_interval: int = 3600
+        self.dir_skip: bool = False
+        self.full_verify_every: int = 10
+        self.dry_run: str = ""
+        self.detect_moves: bool = False
+        self.dedup: str = ""
+        self.max_bytes_per_second: int = 0
+        self.max_ops_per_second: int = 0
+        self.burst_seconds: float = 1.0
+        self.throttle_hours: str = ""
+        self.nice: int = 0
+        self.io_class: str = ""
+        self.exclude: list[str] = []
+        self.min_size: int = 0
+        self.max_size: int = 0
+        self.min_age: int = 0
+        self.max_age: int = 0
+        self.hash_workers: int = 1
+        self.mount_concurrency: int = 0
+        self.journal_file: str = "sync_journal.db"
+        self.jobs: list[dict] = []
 
         self.get_configs()
 
-        if not self.source_folder or not self.replica_folder:
+        if not self.jobs and (not self.source_folder or not self.replica_folder):
             self.initial_setup()
 
         if not self.valid_configs():
@@ -66,6 +137,8 @@ class ConfigFile(AbstractConfig):
         Returns:
             bool: True if the source_folder or replica_folder is empty, False otherwise
         """
+        if not isinstance(self.jobs, list):
+            return False
         if not self.source_folder or not self.replica_folder:
             return True
         return super().valid_configs()
@@ -232,3 +305,14 @@ class ConfigFile(AbstractConfig):
         except Exception as e:
             print(e)
             return False
+
+    def job_configs(self) -> list[ConfigJob]:
+        """
+        Get the configurations of the sync jobs
+
+        Every option missing from a job is inherited from the options at the top of the configuration file.
+
+        Returns:
+            list[ConfigJob]: The configuration of each job, in the order of the configuration file.
+        """
+        return [ConfigJob(job, self) for job in self.jobs]
@@ -0,0 +1,36 @@
+from .absconfig import AbstractConfig
+
+
+class ConfigJob(AbstractConfig):
+    """
+    ConfigJob class represents one sync job of a configuration file listing several source and replica pairs.
+    Every option missing from the job is inherited from the configuration file holding the job list.
+    If the job is invalid, an exception is raised.
+
+    Attributes:
+        name (str): The name of the job used in the messages, "source -> replica" by default.
+        All the attributes of AbstractConfig.
+
+    Methods:
+        __init__: Initializes the ConfigJob object from a job entry and the inherited options, and validates it.
+        __str__: Returns a string representation of the ConfigJob object.
+
+    Inherits from:
+        AbstractConfig: An abstract base class defining common configuration attributes and a method for validating configurations.
+    """
+
+    def __init__(self, job: dict, defaults: AbstractConfig):
+        super().__init__()
+
+        for key in vars(AbstractConfig()):
+            self.__dict__[key] = job.get(key, getattr(defaults, key))
+
+        self.name: str = job.get(
+            "name", f"{self.source_folder} -> {self.replica_folder}"
+        )
+
+        if not self.valid_configs():
+            raise Exception(f"Invalid sync job {self.name}, check your paths")
+
+    def __str__(self):
+        return "ConfigJob"
@@ -0,0 +1,316 @@
+import errno
+import os
+import shutil
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE: int = 0x40049409
+COPY_BUFFER_SIZE: int = 8 * 1024 * 1024
+VERIFY_BLOCK_SIZE: int = 1024 * 1024
+PARTIAL_SUFFIX: str = ".syncpart"
+PARTIAL_MODE: int = 0o600
+DEDUP_METHODS: tuple[str, ...] = ("hardlink", "reflink")
+STRATEGIES: tuple[str, ...] = ("reflink", "copy_file_range", "sendfile", "userspace")
+UNSUPPORTED_ERRORS: set[int] = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.ENODATA,
+}
+
+_strategies: dict[tuple[int, int], str] = {}
+
+
+def reflink(
+    source_fd: int,
+    replica_fd: int,
+    size: int,
+    throttle: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Share the source extents with the replica through the FICLONE ioctl (btrfs, XFS).
+    :param source_fd: int - The file descriptor of the source file.
+    :param replica_fd: int - The file descriptor of the replica file.
+    :param size: int - The size of the source file in bytes.
+    :param throttle: Callable[[int], None] | None - Unused, a reflink copies no data.
+    :return: None
+    """
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "FICLONE is not available on this system")
+
+    fcntl.ioctl(replica_fd, FICLONE, source_fd)
+
+
+def copy_range(
+    source_fd: int,
+    replica_fd: int,
+    size: int,
+    throttle: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Copy the file content inside the kernel with os.copy_file_range.
+    Some filesystems report no data instead of an error, so a copy ending before the size fails.
+    :param source_fd: int - The file descriptor of the source file.
+    :param replica_fd: int - The file descriptor of the replica file.
+    :param size: int - The size of the source file in bytes.
+    :param throttle: Callable[[int], None] | None - Called with the bytes copied after each chunk.
+    :return: None
+    """
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available on this system")
+
+    while copied := os.copy_file_range(source_fd, replica_fd, COPY_BUFFER_SIZE):
+        if throttle:
+            throttle(copied)
+
+    offset = os.lseek(source_fd, 0, os.SEEK_CUR)
+    if offset < size:
+        raise OSError(
+            errno.ENODATA, f"copy_file_range stopped after {offset} of {size} bytes"
+        )
+
+
+def send_file(
+    source_fd: int,
+    replica_fd: int,
+    size: int,
+    throttle: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Copy the file content inside the kernel with os.sendfile.
+    Some filesystems report no data instead of an error, so a copy ending before the size fails.
+    :param source_fd: int - The file descriptor of the source file.
+    :param replica_fd: int - The file descriptor of the replica file.
+    :param size: int - The size of the source file in bytes.
+    :param throttle: Callable[[int], None] | None - Called with the bytes copied after each chunk.
+    :return: None
+    """
+    if not hasattr(os, "sendfile"):
+        raise OSError(errno.ENOSYS, "sendfile is not available on this system")
+
+    offset = os.lseek(source_fd, 0, os.SEEK_CUR)
+    while sent := os.sendfile(replica_fd, source_fd, offset, COPY_BUFFER_SIZE):
+        offset += sent
+        if throttle:
+            throttle(sent)
+
+    if offset < size:
+        raise OSError(errno.ENODATA, f"sendfile stopped after {offset} of {size} bytes")
+
+
+def userspace_copy(
+    source_fd: int,
+    replica_fd: int,
+    size: int,
+    throttle: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Copy the file content through a large reusable userspace buffer.
+    :param source_fd: int - The file descriptor of the source file.
+    :param replica_fd: int - The file descriptor of the replica file.
+    :param size: int - The size of the source file in bytes.
+    :param throttle: Callable[[int], None] | None - Called with the bytes copied after each chunk.
+    :return: None
+    """
+    buffer = bytearray(min(COPY_BUFFER_SIZE, max(size, 1)))
+    view = memoryview(buffer)
+
+    while read := os.readv(source_fd, [buffer]):
+        written = 0
+        while written < read:
+            written += os.write(replica_fd, view[written:read])
+        if throttle:
+            throttle(read)
+
+
+BACKENDS = {
+    "reflink": reflink,
+    "copy_file_range": copy_range,
+    "sendfile": send_file,
+    "userspace": userspace_copy,
+}
+
+
+def partial_path(replica_file: str) -> str:
+    """
+    Get the path of the temporary sibling a replica file is written to before being renamed into place.
+    :param replica_file: str - The path to the replica file.
+    :return: str - The path of the partial file, hidden next to the replica.
+    """
+    folder, name = os.path.split(replica_file)
+    return os.path.join(folder, f".{name}{PARTIAL_SUFFIX}")
+
+
+def is_partial(name: str) -> bool:
+    """
+    Check if a file name is the name of a partial file.
+    :param name: str - The file name.
+    :return: bool - True if the name is the name of a partial file, False otherwise.
+    """
+    return name.startswith(".") and name.endswith(PARTIAL_SUFFIX)
+
+
+def verified_offset(source_fd: int, partial_fd: int, block_size: int = VERIFY_BLOCK_SIZE) -> int:
+    """
+    Find how much of a partial file left by an interrupted copy matches the source,
+    by comparing both files block by block from the start.
+    :param source_fd: int - The file descriptor of the source file.
+    :param partial_fd: int - The file descriptor of the partial file.
+    :param block_size: int - The size of the compared blocks in bytes.
+    :return: int - The offset of the first block that is missing or differs from the source.
+    """
+    if not os.fstat(partial_fd).st_size:
+        return 0
+
+    offset = 0
+    source_block = bytearray(block_size)
+    partial_block = bytearray(block_size)
+
+    while True:
+        read = os.preadv(source_fd, [source_block], offset)
+        if not read or os.preadv(partial_fd, [partial_block], offset) != read:
+            return offset
+        if read == block_size:
+            if source_block != partial_block:
+                return offset
+        elif source_block[:read] != partial_block[:read]:
+            return offset
+        offset += read
+
+
+def copy_content(
+    source_fd: int,
+    replica_fd: int,
+    size: int,
+    offset: int = 0,
+    throttle: Callable[[int], None] | None = None,
+) -> str:
+    """
+    Copy the file content from the given offset to the end, using the cheapest copy strategy available.
+    Strategies are tried from reflink to copy_file_range, sendfile and a userspace copy,
+    and the one that works for a whole file is remembered for the pair of source and replica filesystems.
+    A strategy that copies less than the size of the file fails, so the next one is tried.
+    Reflinks clone whole files, so they are skipped when resuming from an offset.
+    :param source_fd: int - The file descriptor of the source file.
+    :param replica_fd: int - The file descriptor of the replica file, truncated at the offset.
+    :param size: int - The size of the source file in bytes.
+    :param offset: int - The offset the copy starts from.
+    :param throttle: Callable[[int], None] | None - Called with the bytes copied after each chunk.
+    :return: str - The name of the strategy used to copy the content.
+    """
+    key = (os.fstat(source_fd).st_dev, os.fstat(replica_fd).st_dev)
+    remembered = _strategies.get(key, STRATEGIES[0])
+    candidates = STRATEGIES[STRATEGIES.index(remembered) :]
+
+    if offset and candidates[0] == "reflink":
+        candidates = candidates[1:]
+
+    for candidate in candidates:
+        os.lseek(source_fd, offset, os.SEEK_SET)
+        os.lseek(replica_fd, offset, os.SEEK_SET)
+
+        try:
+            BACKENDS[candidate](source_fd, replica_fd, size, throttle)
+            break
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRORS or candidate == STRATEGIES[-1]:
+                raise
+            os.ftruncate(replica_fd, offset)
+
+    if not offset:
+        _strategies[key] = candidate
+    return candidate
+
+
+def transfer_file(
+    source_file: str,
+    replica_file: str,
+    throttle: Callable[[int], None] | None = None,
+) -> str:
+    """
+    Copy a file with its metadata like shutil.copy2, using the cheapest copy strategy available.
+    The content is written to a hidden partial sibling which is renamed over the replica once complete,
+    so readers never see a missing or truncated replica. When a previous copy was interrupted,
+    its partial file is kept and the copy resumes after the blocks that still match the source.
+    The partial file stays writable by its owner until the metadata of the source is applied
+    to the renamed replica, so a read-only source never blocks resuming its copy.
+    :param source_file: str - The path to the source file.
+    :param replica_file: str - The path where the file will be copied to.
+    :param throttle: Callable[[int], None] | None - Called with the bytes read or copied, to cap the throughput.
+    :return: str - The name of the strategy used to copy the content.
+    """
+    partial_file = partial_path(replica_file)
+    source_fd = os.open(source_file, os.O_RDONLY)
+
+    try:
+        stat = os.fstat(source_fd)
+
+        try:
+            partial_fd = os.open(partial_file, os.O_RDWR | os.O_CREAT, PARTIAL_MODE)
+        except PermissionError:
+            os.remove(partial_file)
+            partial_fd = os.open(partial_file, os.O_RDWR | os.O_CREAT, PARTIAL_MODE)
+
+        try:
+            offset = verified_offset(source_fd, partial_fd)
+            if throttle and offset:
+                throttle(2 * offset)
+            os.ftruncate(partial_fd, offset)
+            strategy = copy_content(
+                source_fd, partial_fd, stat.st_size, offset, throttle
+            )
+        finally:
+            os.close(partial_fd)
+    finally:
+        os.close(source_fd)
+
+    os.replace(partial_file, replica_file)
+    shutil.copystat(source_file, replica_file)
+    return strategy
+
+
+def link_file(source_file: str, existing_file: str, replica_file: str, method: str) -> None:
+    """
+    Create a replica file sharing the content of an identical file already in the replica.
+    A hard link shares the inode, and so the metadata, of the existing file. A reflink shares
+    its extents only, so the replica gets its own inode with the metadata of the source.
+    :param source_file: str - The path to the source file, whose metadata is copied by reflinks.
+    :param existing_file: str - The path to the identical file in the replica.
+    :param replica_file: str - The path of the new replica file.
+    :param method: str - "hardlink" or "reflink".
+    :return: None
+    """
+    if method == "hardlink":
+        os.link(existing_file, replica_file)
+        return
+
+    partial_file = partial_path(replica_file)
+    existing_fd = os.open(existing_file, os.O_RDONLY)
+
+    try:
+        stat = os.fstat(existing_fd)
+        partial_fd = os.open(
+            partial_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, PARTIAL_MODE
+        )
+
+        try:
+            reflink(existing_fd, partial_fd, stat.st_size)
+        finally:
+            os.close(partial_fd)
+    except OSError:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+        raise
+    finally:
+        os.close(existing_fd)
+
+    os.replace(partial_file, replica_file)
+    shutil.copystat(source_file, replica_file)
@@ -0,0 +1,75 @@
+import os
+from typing import Callable
+
+DELTA_BLOCK_SIZE: int = 64 * 1024
+
+
+def delta_update(
+    source_file: str,
+    replica_file: str,
+    block_size: int = DELTA_BLOCK_SIZE,
+    throttle: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Update a replica file in place by rewriting only the blocks that differ from the source.
+    Both files are read block by block at the same offsets, unchanged blocks are left untouched
+    and the replica is truncated or extended to the size of the source.
+    :param source_file: str - The path to the source file.
+    :param replica_file: str - The path to the replica file to be updated in place.
+    :param block_size: int - The size of the compared blocks in bytes.
+    :param throttle: Callable[[int], None] | None - Called with the bytes read and written for each block.
+    :return: int - The number of bytes written to the replica.
+    """
+    written = 0
+    offset = 0
+    source_block = bytearray(block_size)
+    replica_block = bytearray(block_size)
+
+    with open(source_file, "rb") as source, open(replica_file, "r+b") as replica:
+        while True:
+            read = source.readinto(source_block)
+            if not read:
+                break
+
+            replica_read = replica.readinto(replica_block)
+
+            if read == block_size:
+                changed = replica_read != read or source_block != replica_block
+            else:
+                changed = replica_read < read or bytes(source_block[:read]) != bytes(
+                    replica_block[:read]
+                )
+
+            if changed:
+                replica.seek(offset)
+                replica.write(memoryview(source_block)[:read])
+                written += read
+
+            if throttle:
+                throttle(read + replica_read + (read if changed else 0))
+
+            offset += read
+            replica.seek(offset)
+
+        replica.truncate(offset)
+
+    return written
+
+
+def delta_eligible(replica_file: str, threshold: int) -> bool:
+    """
+    Check if a replica file should be updated in place with a delta instead of a full copy.
+    Files with several hard links are excluded, since writing in place would change every link.
+    :param replica_file: str - The path to the replica file.
+    :param threshold: int - The minimum size in bytes to use a delta, 0 to never use it.
+    :return: bool - True if the file should be updated with a delta, False otherwise.
+    """
+    if threshold <= 0:
+        return False
+
+    try:
+        stat = os.stat(replica_file)
+    except OSError:
+        return False
+
+    return stat.st_size >= threshold and stat.st_nlink == 1
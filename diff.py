@@ -0,0 +1,671 @@
+import os
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Iterator
+
+from copier import PARTIAL_SUFFIX, is_partial
+from filters import PathFilter
+from hashing import HashService
+from index import MetadataIndex
+from journal import Journal
+from utils import files_are_equal
+
+
+class Operation(Enum):
+    """
+    Operation enumerates the kinds of changes a sync pass can apply to the replica.
+    Each value matches the name of the Sync method that executes it.
+    """
+
+    CREATE_FOLDER = "create_folder"
+    COPY_FILE = "copy_file"
+    UPDATE_FILE = "update_file"
+    DELETE_FILE = "delete_file"
+    DELETE_FOLDER = "delete_folder"
+
+
+@dataclass(frozen=True)
+class Change:
+    """
+    Change represents a single step of a change plan.
+
+    Attributes:
+        operation (Operation): The kind of change to apply.
+        path (str): The path relative to the synced roots.
+        source (str | None): The absolute source path, None for deletions.
+        replica (str): The absolute replica path.
+    """
+
+    operation: Operation
+    path: str
+    source: str | None
+    replica: str
+
+
+def scan_directory(
+    folder: str, on_error: Callable[[OSError], None] | None = None
+) -> list[os.DirEntry] | None:
+    """
+    List a directory once with os.scandir.
+
+    A directory that can't be listed gives None rather than an empty listing, so the walk
+    skips its pair instead of deleting a whole replica directory on a transient error.
+
+    Parameters:
+        folder (str): The directory to list.
+        on_error (Callable[[OSError], None] | None): Reports the error when the directory can't be listed.
+
+    Returns:
+        list[os.DirEntry] | None: The entries of the directory sorted by name, None if the directory can't be listed.
+    """
+    try:
+        with os.scandir(folder) as entries:
+            return sorted(entries, key=entry_name)
+    except OSError as e:
+        if on_error:
+            on_error(e)
+        return None
+
+
+def entry_name(entry: os.DirEntry) -> str:
+    """
+    Get the name of an entry, used to sort listings.
+
+    Parameters:
+        entry (os.DirEntry): The entry.
+
+    Returns:
+        str: The name of the entry.
+    """
+    return entry.name
+
+
+def entry_is_dir(entry: os.DirEntry) -> bool:
+    """
+    Check if an entry is a directory, following symlinks like os.walk does.
+
+    Parameters:
+        entry (os.DirEntry): The entry to check.
+
+    Returns:
+        bool: True if the entry is a directory, False otherwise.
+    """
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def entry_stat(entry: os.DirEntry) -> os.stat_result | None:
+    """
+    Get the metadata of an entry, stat'ed once and then cached by the entry itself.
+
+    Parameters:
+        entry (os.DirEntry): The entry to inspect.
+
+    Returns:
+        os.stat_result | None: The metadata, None if the entry can't be stat'ed.
+    """
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
+
+def path_stat(path: str) -> os.stat_result | None:
+    """
+    Get the metadata of a path, following symlinks like entry_stat does.
+
+    Parameters:
+        path (str): The path to inspect.
+
+    Returns:
+        os.stat_result | None: The metadata, None if the path can't be stat'ed.
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def diff_directory(
+    source_dir: str,
+    replica_dir: str,
+    relative_dir: str,
+    source_entries: list[os.DirEntry],
+    replica_entries: list[os.DirEntry],
+    compare: Callable[..., bool] = files_are_equal,
+    filters: PathFilter | None = None,
+    verify: Callable[[Change, tuple], None] | None = None,
+) -> tuple[list[Change], list[tuple[str, str, str, bool]]]:
+    """
+    Compare the listings of one source directory and its replica.
+
+    Both listings are sorted by name and merged in a single pass, so no lookup table is built.
+    A replica entry is always deleted before a source entry with the same name is created.
+    Partial files left in the replica by interrupted copies are kept for the copy to resume,
+    unless their source file is gone. A replica entry named like a partial file is synced as a
+    regular entry when the source has an entry with the same name. Entries excluded by the filters are dropped from both
+    listings, so they are neither copied nor deleted and excluded folders are never visited.
+
+    Parameters:
+        source_dir (str): The absolute source directory.
+        replica_dir (str): The absolute replica directory.
+        relative_dir (str): The directory path relative to the synced roots.
+        source_entries (list[os.DirEntry]): The listing of the source directory, sorted by name.
+        replica_entries (list[os.DirEntry]): The listing of the replica directory, sorted by name.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+        verify (Callable[[Change, tuple], None] | None): Receives the updates of files with the same size and their
+            metadata instead of comparing them here, so they are compared later, None to compare them here.
+
+    Returns:
+        tuple[list[Change], list[tuple[str, str, str, bool]]]: The changes for this directory and the
+        subdirectories to visit next as (source, replica, relative path, replica exists) tuples.
+    """
+    changes: list[Change] = []
+    subdirs: list[tuple[str, str, str, bool]] = []
+    source_index = replica_index = 0
+    if any(is_partial(entry.name) for entry in replica_entries):
+        source_names = {entry.name for entry in source_entries}
+        partials = {
+            entry.name
+            for entry in replica_entries
+            if is_partial(entry.name) and entry.name not in source_names
+        }
+        replica_entries = [
+            entry for entry in replica_entries if entry.name not in partials
+        ]
+
+        for name in sorted(partials):
+            if name[1 : -len(PARTIAL_SUFFIX)] not in source_names:
+                changes.append(
+                    Change(
+                        Operation.DELETE_FILE,
+                        os.path.join(relative_dir, name),
+                        None,
+                        os.path.join(replica_dir, name),
+                    )
+                )
+
+    if filters:
+        excluded = {
+            entry.name
+            for entry in source_entries
+            if filters.excluded_entry(os.path.join(relative_dir, entry.name), entry)
+        }
+        source_entries = [
+            entry for entry in source_entries if entry.name not in excluded
+        ]
+        replica_entries = [
+            entry
+            for entry in replica_entries
+            if entry.name not in excluded
+            and not filters.excluded(
+                os.path.join(relative_dir, entry.name), entry_is_dir(entry)
+            )
+        ]
+
+    while source_index < len(source_entries) or replica_index < len(replica_entries):
+        source_entry = replica_entry = None
+
+        if replica_index == len(replica_entries) or (
+            source_index < len(source_entries)
+            and source_entries[source_index].name < replica_entries[replica_index].name
+        ):
+            source_entry = source_entries[source_index]
+            source_index += 1
+        elif source_index == len(source_entries) or (
+            replica_entries[replica_index].name < source_entries[source_index].name
+        ):
+            replica_entry = replica_entries[replica_index]
+            replica_index += 1
+        else:
+            source_entry = source_entries[source_index]
+            replica_entry = replica_entries[replica_index]
+            source_index += 1
+            replica_index += 1
+
+        name = (source_entry or replica_entry).name
+        relative = os.path.join(relative_dir, name)
+        replica_path = os.path.join(replica_dir, name)
+
+        if replica_entry is not None:
+            replica_is_dir = entry_is_dir(replica_entry)
+
+            if source_entry is None or entry_is_dir(source_entry) != replica_is_dir:
+                operation = (
+                    Operation.DELETE_FOLDER if replica_is_dir else Operation.DELETE_FILE
+                )
+                changes.append(Change(operation, relative, None, replica_path))
+                replica_entry = None
+
+        if source_entry is None:
+            continue
+
+        source_path = os.path.join(source_dir, name)
+
+        if entry_is_dir(source_entry):
+            if replica_entry is None:
+                changes.append(
+                    Change(Operation.CREATE_FOLDER, relative, source_path, replica_path)
+                )
+            subdirs.append(
+                (source_path, replica_path, relative, replica_entry is not None)
+            )
+            continue
+
+        if replica_entry is None:
+            changes.append(
+                Change(Operation.COPY_FILE, relative, source_path, replica_path)
+            )
+            continue
+
+        stats = (entry_stat(source_entry), entry_stat(replica_entry))
+        same_size = (
+            None not in stats and stats[0].st_size == stats[1].st_size
+        )
+
+        if same_size and not verify and compare(source_path, replica_path, stats=stats):
+            continue
+
+        update = Change(Operation.UPDATE_FILE, relative, source_path, replica_path)
+
+        if same_size and verify:
+            verify(update, stats)
+        else:
+            changes.append(update)
+
+    return changes, subdirs
+
+
+def iter_plan(
+    source_folder: str,
+    replica_folder: str,
+    compare: Callable[..., bool] = files_are_equal,
+    relative_dir: str = "",
+    scan: Callable[[str], list[os.DirEntry] | None] = scan_directory,
+    directories: MetadataIndex | None = None,
+    filters: PathFilter | None = None,
+    hasher: HashService | None = None,
+    journal: Journal | None = None,
+) -> Iterator[Change]:
+    """
+    Yield the changes that make the replica folder match the source folder, as the trees are walked.
+
+    Both trees are listed exactly once with os.scandir. Directories are visited
+    depth first, so a folder is always created before anything inside it and a
+    deleted folder is removed as a whole instead of file by file. Only the listings of
+    the directories on the current path and their pending siblings are held at a time,
+    so memory follows the depth and width of the tree, not its number of files.
+
+    With a directory cache, a directory pair whose metadata is unchanged since its
+    listings were last found in sync is not listed again, only its subdirectories are visited.
+    Files modified in place inside such a directory are missed until the cache is cleared.
+
+    Replica folders planned for creation are checked again before being visited, since the
+    consumer may have created them by moving an existing folder, whose content is then compared.
+
+    A directory pair whose source or replica can't be listed is skipped with its subdirectories,
+    with no change, and is visited again by the next pass.
+
+    With a hash service, files with the same size are compared on its pool while the walk goes on,
+    and their updates are yielded as the comparisons finish, after the changes of their directory.
+    A directory pair is then cached once all of its comparisons found equal files.
+
+    With a journal, a directory is recorded as completed once all of its changes were taken by the
+    consumer, and the directories completed by an interrupted pass are not listed again.
+
+    Parameters:
+        source_folder (str): The source folder to sync from.
+        replica_folder (str): The replica folder to sync to.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        relative_dir (str): Limit the plan to this subfolder, relative to both folders.
+        scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+        directories (MetadataIndex | None): The cache of directory pairs found in sync, None to list every directory.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+        hasher (HashService | None): The pool comparing files concurrently, None to compare them during the walk.
+        journal (Journal | None): The progress of the pass, None to not record it.
+
+    Yields:
+        Change: The changes to apply to the replica, in order.
+    """
+    source_dir = os.path.join(source_folder, relative_dir) if relative_dir else source_folder
+    replica_dir = (
+        os.path.join(replica_folder, relative_dir) if relative_dir else replica_folder
+    )
+    replica_exists = os.path.isdir(replica_dir)
+
+    if not replica_exists:
+        yield Change(Operation.CREATE_FOLDER, relative_dir, source_dir, replica_dir)
+
+    pending = [(source_dir, replica_dir, relative_dir, replica_exists)]
+
+    try:
+        yield from walk_plan(
+            pending, compare, scan, directories, filters, hasher, journal
+        )
+    finally:
+        if hasher:
+            hasher.discard()
+
+
+def walk_plan(
+    pending: list[tuple[str, str, str, bool]],
+    compare: Callable[..., bool],
+    scan: Callable[[str], list[os.DirEntry] | None],
+    directories: MetadataIndex | None,
+    filters: PathFilter | None,
+    hasher: HashService | None,
+    journal: Journal | None = None,
+) -> Iterator[Change]:
+    """
+    Walk the directory pairs of a plan depth first, see iter_plan.
+
+    Parameters:
+        pending (list[tuple[str, str, str, bool]]): The stack of (source, replica, relative path, replica exists) pairs to visit.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+        directories (MetadataIndex | None): The cache of directory pairs found in sync, None to list every directory.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+        hasher (HashService | None): The pool comparing files concurrently, None to compare them during the walk.
+        journal (Journal | None): The progress of the pass, None to not record it.
+
+    Yields:
+        Change: The changes to apply to the replica, in order.
+    """
+    verifying: dict[tuple[str, str], list] = {}
+
+    while pending:
+        source_dir, replica_dir, relative_dir, replica_exists = pending.pop()
+        state = None
+        completed = journal.completed_directory(relative_dir) if journal else None
+
+        if completed is not None:
+            pending.extend(
+                (
+                    os.path.join(source_dir, name),
+                    os.path.join(replica_dir, name),
+                    os.path.join(relative_dir, name),
+                    False,
+                )
+                for name in reversed(completed)
+            )
+            continue
+
+        if not replica_exists:
+            replica_exists = os.path.isdir(replica_dir)
+
+        if directories and replica_exists:
+            state = directories.directory_state(source_dir, replica_dir)
+            cached = directories.cached_directory(source_dir, replica_dir, state)
+
+            if cached is not None:
+                pending.extend(
+                    (
+                        os.path.join(source_dir, name),
+                        os.path.join(replica_dir, name),
+                        os.path.join(relative_dir, name),
+                        True,
+                    )
+                    for name in reversed(cached)
+                )
+                continue
+
+        source_entries = scan(source_dir)
+        replica_entries = scan(replica_dir) if replica_exists else []
+
+        if source_entries is None or replica_entries is None:
+            continue
+
+        deferred: list[tuple[Change, tuple]] = []
+        changes, subdirs = diff_directory(
+            source_dir,
+            replica_dir,
+            relative_dir,
+            source_entries,
+            replica_entries,
+            compare,
+            filters,
+            (lambda change, stats: deferred.append((change, stats)))
+            if hasher
+            else None,
+        )
+        pending.extend(reversed(subdirs))
+        names = [os.path.basename(subdir[0]) for subdir in subdirs]
+        cached = (state, names, len(source_entries)) if state and not changes else None
+
+        if deferred:
+            verifying[(source_dir, replica_dir)] = [
+                len(deferred),
+                True,
+                cached,
+                relative_dir,
+                names,
+            ]
+        elif cached:
+            directories.store_directory(source_dir, replica_dir, *cached)
+
+        for change, stats in deferred:
+            hasher.submit(
+                (change, (source_dir, replica_dir)), change.source, change.replica, stats
+            )
+
+        yield from changes
+
+        if journal and not deferred:
+            journal.complete_directory(relative_dir, names)
+
+        if hasher:
+            yield from verified_changes(hasher, directories, verifying, journal)
+
+    if hasher:
+        yield from verified_changes(
+            hasher, directories, verifying, journal, wait_all=True
+        )
+
+
+def verified_changes(
+    hasher: HashService,
+    directories: MetadataIndex | None,
+    verifying: dict[tuple[str, str], list],
+    journal: Journal | None = None,
+    wait_all: bool = False,
+) -> Iterator[Change]:
+    """
+    Yield the updates of the files a hash service found different, as its comparisons finish.
+
+    Each directory pair waiting in verifying holds its number of pending comparisons, whether
+    they all found equal files so far, the state, subdirectories and number of entries to
+    cache it with once the last one is done, None if it can't be cached, and its relative
+    path and subdirectories to record in the journal.
+
+    Parameters:
+        hasher (HashService): The pool comparing the files.
+        directories (MetadataIndex | None): The cache of directory pairs found in sync.
+        verifying (dict[tuple[str, str], list]): The directory pairs waiting for their comparisons.
+        journal (Journal | None): The progress of the pass, None to not record it.
+        wait_all (bool): Whether to wait for every pending comparison.
+
+    Yields:
+        Change: The updates of the files whose content differs.
+    """
+    for (change, directory), equal in hasher.results(wait_all):
+        waiting = verifying.get(directory)
+
+        if not equal:
+            yield change
+            if waiting:
+                waiting[1] = False
+
+        if waiting:
+            waiting[0] -= 1
+            if waiting[0] == 0:
+                del verifying[directory]
+                if waiting[1] and waiting[2]:
+                    directories.store_directory(*directory, *waiting[2])
+                if journal:
+                    journal.complete_directory(*waiting[3:])
+
+
+def build_plan(
+    source_folder: str,
+    replica_folder: str,
+    compare: Callable[..., bool] = files_are_equal,
+    relative_dir: str = "",
+    scan: Callable[[str], list[os.DirEntry] | None] = scan_directory,
+    directories: MetadataIndex | None = None,
+    filters: PathFilter | None = None,
+    hasher: HashService | None = None,
+) -> list[Change]:
+    """
+    Build the whole change plan that makes the replica folder match the source folder, see iter_plan.
+
+    Parameters:
+        source_folder (str): The source folder to sync from.
+        replica_folder (str): The replica folder to sync to.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        relative_dir (str): Limit the plan to this subfolder, relative to both folders.
+        scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+        directories (MetadataIndex | None): The cache of directory pairs found in sync, None to list every directory.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+        hasher (HashService | None): The pool comparing files concurrently, None to compare them during the walk.
+
+    Returns:
+        list[Change]: The ordered changes to apply to the replica.
+    """
+    return list(
+        iter_plan(
+            source_folder,
+            replica_folder,
+            compare,
+            relative_dir,
+            scan,
+            directories,
+            filters,
+            hasher,
+        )
+    )
+
+
+def topmost_missing(replica_folder: str, relative: str) -> str:
+    """
+    Get the topmost ancestor of a path whose parent folder exists in the replica.
+
+    Parameters:
+        replica_folder (str): The replica folder.
+        relative (str): The path relative to the replica folder.
+
+    Returns:
+        str: The path itself if its parent exists in the replica, its topmost missing ancestor otherwise.
+    """
+    parent = os.path.dirname(relative)
+    while parent and not os.path.isdir(os.path.join(replica_folder, parent)):
+        relative, parent = parent, os.path.dirname(parent)
+    return relative
+
+
+def iter_path_plan(
+    source_folder: str,
+    replica_folder: str,
+    relative: str,
+    compare: Callable[..., bool] = files_are_equal,
+    scan: Callable[[str], list[os.DirEntry] | None] = scan_directory,
+    filters: PathFilter | None = None,
+) -> Iterator[Change]:
+    """
+    Yield the changes for a single path, used when only a few paths are known to have changed.
+
+    If the parent folder of the path is missing in the replica, the plan covers the
+    topmost missing ancestor instead, so folders are still created before their content.
+    A path excluded by the filters, or below an excluded folder, yields no change.
+    A replica file that can't be stat'ed, like a broken symlink, is updated, and a source file
+    removed since it was checked deletes its replica.
+
+    Parameters:
+        source_folder (str): The source folder to sync from.
+        replica_folder (str): The replica folder to sync to.
+        relative (str): The changed path, relative to both folders.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+
+    Yields:
+        Change: The changes to apply to the replica, in order.
+    """
+    if filters and filters.excluded_path(
+        relative, os.path.join(source_folder, relative)
+    ):
+        return
+
+    relative = topmost_missing(replica_folder, relative)
+    source_path = os.path.join(source_folder, relative)
+    replica_path = os.path.join(replica_folder, relative)
+    source_exists = os.path.exists(source_path)
+    source_is_dir = os.path.isdir(source_path)
+    replica_exists = os.path.lexists(replica_path)
+    replica_is_dir = os.path.isdir(replica_path)
+
+    if replica_exists and (not source_exists or source_is_dir != replica_is_dir):
+        operation = Operation.DELETE_FOLDER if replica_is_dir else Operation.DELETE_FILE
+        yield Change(operation, relative, None, replica_path)
+        replica_exists = False
+
+    if not source_exists:
+        return
+
+    if source_is_dir:
+        yield from iter_plan(
+            source_folder, replica_folder, compare, relative, scan, filters=filters
+        )
+
+    elif not replica_exists:
+        yield Change(Operation.COPY_FILE, relative, source_path, replica_path)
+
+    else:
+        stats = (path_stat(source_path), path_stat(replica_path))
+
+        if stats[0] is None:
+            yield Change(Operation.DELETE_FILE, relative, None, replica_path)
+
+        elif (
+            stats[1] is None
+            or stats[0].st_size != stats[1].st_size
+            or not compare(source_path, replica_path, stats=stats)
+        ):
+            yield Change(Operation.UPDATE_FILE, relative, source_path, replica_path)
+
+
+def build_path_plan(
+    source_folder: str,
+    replica_folder: str,
+    relative: str,
+    compare: Callable[..., bool] = files_are_equal,
+    scan: Callable[[str], list[os.DirEntry] | None] = scan_directory,
+    filters: PathFilter | None = None,
+) -> list[Change]:
+    """
+    Build the whole change plan for a single path, see iter_path_plan.
+
+    Parameters:
+        source_folder (str): The source folder to sync from.
+        replica_folder (str): The replica folder to sync to.
+        relative (str): The changed path, relative to both folders.
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        scan (Callable[[str], list[os.DirEntry] | None]): Lists a directory sorted by name, None if it can't be listed.
+        filters (PathFilter | None): The rules excluding paths from the sync, None to include everything.
+
+    Returns:
+        list[Change]: The ordered changes to apply to the replica.
+    """
+    return list(
+        iter_path_plan(
+            source_folder, replica_folder, relative, compare, scan, filters
+        )
+    )
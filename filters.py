@@ -0,0 +1,229 @@
+import os
+import re
+import time
+
+
+def translate(pattern: str) -> str:
+    """
+    Translate a gitignore-style pattern, without its negation and trailing slash, to a regular expression.
+
+    A pattern with a slash before its end is anchored to the synced roots, other patterns
+    match a name at any depth. "*" and "?" never match a slash, "**" matches across folders.
+
+    Parameters:
+        pattern (str): The pattern.
+
+    Returns:
+        str: The regular expression matching the relative paths, with "/" separators.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    parts = ["" if anchored else "(?:.*/)?"]
+    index = 0
+
+    while index < len(pattern):
+        char = pattern[index]
+
+        if pattern.startswith("**/", index) and (index == 0 or pattern[index - 1] == "/"):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        elif char == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            content = pattern[index + 1 : end].replace("\\", "\\\\")
+            if content.startswith("!"):
+                content = f"^{content[1:]}"
+            parts.append(f"[{content}]")
+            index = end
+        else:
+            parts.append(re.escape(char))
+
+        index += 1
+
+    return "".join(parts)
+
+
+class PathFilter:
+    """
+    PathFilter decides which paths are left out of the sync, from gitignore-style patterns
+    and from size and age limits of the source files.
+
+    Patterns are read in order and the last one matching a path wins, a pattern starting with "!"
+    includes back what earlier patterns excluded and a pattern ending with "/" only matches folders.
+    Consecutive patterns of the same kind are compiled once into a single regular expression,
+    so a path is usually matched with a few regular expressions whatever the number of patterns.
+
+    An excluded folder is pruned from the walk, so nothing below it is listed. Excluded paths are
+    neither copied nor deleted, the replica keeps whatever it already holds under them.
+
+    Attributes:
+        groups (list[tuple[re.Pattern, bool, bool]]): The compiled runs of patterns,
+            as (regular expression, negated, folders only) tuples.
+        min_size (int): The size in bytes under which files are excluded, 0 for no limit.
+        max_size (int): The size in bytes above which files are excluded, 0 for no limit.
+        min_age (int): The seconds since their last modification under which files are excluded, 0 for no limit.
+        max_age (int): The seconds since their last modification above which files are excluded, 0 for no limit.
+
+    Methods:
+        enabled() -> bool: Check if any pattern or limit is configured.
+        excluded(relative: str, is_dir: bool) -> bool: Check if a path matches the patterns.
+        excluded_stat(stat: os.stat_result) -> bool: Check if a file is out of the size and age limits.
+        excluded_entry(relative: str, entry: os.DirEntry) -> bool: Check if a source entry is excluded.
+        excluded_path(relative: str, source_path: str) -> bool: Check if a path or any of its parents is excluded.
+    """
+
+    def __init__(
+        self,
+        patterns: list[str] | None = None,
+        min_size: int = 0,
+        max_size: int = 0,
+        min_age: int = 0,
+        max_age: int = 0,
+    ):
+        self.groups: list[tuple[re.Pattern, bool, bool]] = []
+        self.min_size: int = min_size
+        self.max_size: int = max_size
+        self.min_age: int = min_age
+        self.max_age: int = max_age
+
+        runs: list[tuple[list[str], bool, bool]] = []
+
+        for pattern in patterns or []:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+
+            negated = pattern.startswith("!")
+            pattern = pattern[1:] if negated else pattern
+            dir_only = pattern.endswith("/")
+            expression = translate(pattern.rstrip("/"))
+
+            if runs and runs[-1][1:] == (negated, dir_only):
+                runs[-1][0].append(expression)
+            else:
+                runs.append(([expression], negated, dir_only))
+
+        for expressions, negated, dir_only in runs:
+            self.groups.append(
+                (re.compile(f"(?:{'|'.join(expressions)})\\Z"), negated, dir_only)
+            )
+
+    def __str__(self):
+        return "PathFilter"
+
+    def enabled(self) -> bool:
+        """
+        Check if any pattern or limit is configured
+
+        Returns:
+            bool: True if some paths can be excluded, False otherwise.
+        """
+        return bool(
+            self.groups or self.min_size or self.max_size or self.min_age or self.max_age
+        )
+
+    def excluded(self, relative: str, is_dir: bool) -> bool:
+        """
+        Check if a path matches the patterns, the last matching pattern wins
+
+        Parameters:
+            relative (str): The path relative to the synced roots.
+            is_dir (bool): Whether the path is a folder.
+
+        Returns:
+            bool: True if the path is excluded, False otherwise.
+        """
+        if os.sep != "/":
+            relative = relative.replace(os.sep, "/")
+
+        for expression, negated, dir_only in reversed(self.groups):
+            if (is_dir or not dir_only) and expression.match(relative):
+                return not negated
+
+        return False
+
+    def excluded_stat(self, stat: os.stat_result) -> bool:
+        """
+        Check if a file is out of the size and age limits
+
+        Parameters:
+            stat (os.stat_result): The metadata of the source file.
+
+        Returns:
+            bool: True if the file is excluded, False otherwise.
+        """
+        if self.min_size and stat.st_size < self.min_size:
+            return True
+
+        if self.max_size and stat.st_size > self.max_size:
+            return True
+
+        if self.min_age or self.max_age:
+            age = time.time() - stat.st_mtime
+
+            if self.min_age and age < self.min_age:
+                return True
+
+            if self.max_age and age > self.max_age:
+                return True
+
+        return False
+
+    def excluded_entry(self, relative: str, entry: os.DirEntry) -> bool:
+        """
+        Check if a source entry is excluded by the patterns, or by the limits for a file
+
+        Parameters:
+            relative (str): The path of the entry relative to the synced roots.
+            entry (os.DirEntry): The entry listed in the source.
+
+        Returns:
+            bool: True if the entry is excluded, False otherwise.
+        """
+        try:
+            is_dir = entry.is_dir()
+            if self.excluded(relative, is_dir):
+                return True
+            return not is_dir and self.excluded_stat(entry.stat())
+        except OSError:
+            return False
+
+    def excluded_path(self, relative: str, source_path: str) -> bool:
+        """
+        Check if a path or any of its parent folders is excluded, for paths synced outside a walk.
+        A path missing from the source is matched as a folder, so an excluded folder is never deleted.
+
+        Parameters:
+            relative (str): The path relative to the synced roots.
+            source_path (str): The absolute source path, used for the limits if it is a file.
+
+        Returns:
+            bool: True if the path is excluded, False otherwise.
+        """
+        parent = os.path.dirname(relative)
+        while parent:
+            if self.excluded(parent, True):
+                return True
+            parent = os.path.dirname(parent)
+
+        is_dir = os.path.isdir(source_path) or not os.path.lexists(source_path)
+        if self.excluded(relative, is_dir):
+            return True
+
+        try:
+            return not is_dir and self.excluded_stat(os.stat(source_path))
+        except OSError:
+            return False
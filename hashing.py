@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Iterator
+
+PENDING_PER_WORKER: int = 4
+
+
+class HashService:
+    """
+    HashService runs file comparisons on a pool of threads, so verifying a tree hashes as many
+    files at once as there are workers. hashlib releases the GIL while hashing large chunks and
+    file reads release it while waiting on the disk, so threads scale with the cores without
+    moving the metadata index or the open files into other processes.
+
+    Comparisons are submitted in batches as the trees are walked and their results are streamed
+    back in completion order. The number of comparisons in flight is bounded, so a walk that
+    finds many candidates waits for results instead of queuing every file of the tree.
+
+    Attributes:
+        compare (Callable[..., bool]): Checks if two files with the same size have the same content,
+            given their paths and their metadata as a stats keyword.
+        workers (int): The number of comparisons run at once.
+        executor (ThreadPoolExecutor): The pool running the comparisons.
+        pending (dict[Future, Hashable]): The comparisons in flight and the item each one was submitted with.
+
+    Methods:
+        submit(item: Hashable, source_file: str, replica_file: str, stats: tuple | None) -> None: Queue a comparison.
+        results(wait_all: bool) -> Iterator[tuple[Hashable, bool]]: Yield the finished comparisons.
+        discard() -> None: Forget the pending comparisons of an abandoned walk.
+        close() -> None: Stop the pool once the running comparisons are done.
+    """
+
+    def __init__(self, compare: Callable[..., bool], workers: int):
+        self.compare: Callable[..., bool] = compare
+        self.workers: int = workers
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="HashService"
+        )
+        self.pending: dict[Future, Hashable] = {}
+
+    def __str__(self):
+        return "HashService"
+
+    def submit(
+        self,
+        item: Hashable,
+        source_file: str,
+        replica_file: str,
+        stats: tuple[os.stat_result, os.stat_result] | None = None,
+    ) -> None:
+        """
+        Queue the comparison of a source file with its replica
+
+        Parameters:
+            item (Hashable): The value yielded back with the result, such as the planned change.
+            source_file (str): The path of the source file.
+            replica_file (str): The path of the replica file.
+            stats (tuple[os.stat_result, os.stat_result] | None): The metadata of both files
+                from their directory listing, None to let the comparison stat them.
+
+        Returns:
+            None
+        """
+        future = self.executor.submit(
+            self.compare, source_file, replica_file, stats=stats
+        )
+        self.pending[future] = item
+
+    def results(self, wait_all: bool = False) -> Iterator[tuple[Hashable, bool]]:
+        """
+        Yield the comparisons that finished, waiting while too many are in flight
+
+        Parameters:
+            wait_all (bool): Whether to wait for every pending comparison, at the end of a walk.
+
+        Yields:
+            tuple[Hashable, bool]: The submitted item and whether the files have the same content.
+
+        Raises:
+            Exception: The error raised by a comparison, if any.
+        """
+        limit = 0 if wait_all else self.workers * PENDING_PER_WORKER
+
+        while self.pending:
+            done = [future for future in self.pending if future.done()]
+
+            if not done:
+                if len(self.pending) <= limit:
+                    return
+                done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = self.pending.pop(future)
+                yield item, future.result()
+
+    def discard(self) -> None:
+        """
+        Forget the pending comparisons of an abandoned walk, cancelling those not started yet
+
+        Returns:
+            None
+        """
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+    def close(self) -> None:
+        """
+        Stop the pool once the running comparisons are done
+
+        Returns:
+            None
+        """
+        self.discard()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,484 @@
+import os
+import sqlite3
+import threading
+from typing import Callable
+
+from metrics import Metrics
+from utils import DEFAULT_COMPARE_METHOD, HASH_ALGORITHMS, bytes_are_equal, file_digest
+
+FOLDER_DIGEST: str = "folder"
+
+
+class MetadataIndex:
+    """
+    MetadataIndex keeps an on-disk SQLite record of the files seen by previous syncs,
+    so unchanged files are recognised by their metadata instead of being hashed again.
+
+    Each record is keyed by the absolute file path and stores the size, modification time,
+    inode and content digest that were observed when the file was last hashed.
+    Digests are prefixed with their algorithm, so changing the compare method never mixes them.
+    With the "bytes" method, files compared equal share a token instead of a digest.
+
+    Folders created in the replica are recorded with the FOLDER_DIGEST marker, and records can be
+    looked up by inode, so a file or folder moved in the source can be found at its former path,
+    or by digest, so identical content already in the replica can be shared.
+
+    Directories whose listings matched on both sides are also recorded with the metadata of the
+    source and replica directories, so a later pass can skip listing them while both are unchanged.
+
+    The index can be shared by the worker threads, every access to the database is serialized.
+
+    Attributes:
+        index_file (str): The path to the SQLite database.
+        method (str): The compare method, a hash algorithm or "bytes".
+        algorithm (str): The hash algorithm used for digests.
+        metrics (Metrics | None): The metrics counting the hashed bytes.
+        throttle (Callable[[int], None] | None): Called with the bytes read while hashing, to cap the throughput.
+        on_error (Callable[[OSError], None] | None): Reports the errors of the files that can't be compared.
+
+    Methods:
+        lookup(file: str) -> tuple[int, int, int, str] | None: Get the record stored for a file.
+        current(record: tuple | None, stat: os.stat_result) -> bool: Check if a record matches the file metadata.
+        store(file: str, stat: os.stat_result, digest: str) -> None: Record the metadata and digest of a file.
+        remove(path: str) -> None: Forget a file or every file below a folder.
+        move(path: str, new_path: str) -> None: Move the records of a file or of every file below a folder.
+        lookup_inode(inode: int, folder: str) -> list[tuple[str, int, int, int, str]]: Get the records of an inode below a folder.
+        lookup_digest(digest: str, folder: str) -> list[tuple[str, int, int, int, str]]: Get the records of a digest below a folder.
+        digest(file: str) -> str: Get the digest of a file, hashing it only if its metadata changed.
+        files_are_equal(source_file: str, replica_file: str) -> bool: Compare two files using the recorded digests.
+        record_copy(source_file: str, replica_file: str) -> None: Record a fresh replica copy with the digest of its source.
+        directory_state(source_dir: str, replica_dir: str) -> tuple[int, ...] | None: Get the metadata of a directory pair.
+        cached_directory(source_dir: str, replica_dir: str, state: tuple) -> list[str] | None: Get the subdirectories of an unchanged directory pair.
+        store_directory(source_dir: str, replica_dir: str, state: tuple, subdirs: list[str], entries: int) -> None: Record a directory pair in sync.
+        clear_directories(source_folder: str) -> None: Forget the directory pairs below a source folder.
+        commit() -> None: Persist the pending changes.
+        close() -> None: Persist the pending changes and close the database.
+    """
+
+    def __init__(
+        self,
+        index_file: str,
+        method: str = DEFAULT_COMPARE_METHOD,
+        metrics: Metrics | None = None,
+        throttle: Callable[[int], None] | None = None,
+        on_error: Callable[[OSError], None] | None = None,
+    ):
+        self.index_file: str = index_file
+        self.method: str = method
+        self.metrics: Metrics | None = metrics
+        self.throttle: Callable[[int], None] | None = throttle
+        self.on_error: Callable[[OSError], None] | None = on_error
+        self.algorithm: str = (
+            method if method in HASH_ALGORITHMS else DEFAULT_COMPARE_METHOD
+        )
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(index_file, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, "
+            "size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "inode INTEGER NOT NULL, "
+            "digest TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS files_inode ON files (inode)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS files_digest ON files (digest)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS directories ("
+            "source TEXT NOT NULL, "
+            "replica TEXT NOT NULL, "
+            "state TEXT NOT NULL, "
+            "subdirs TEXT NOT NULL, "
+            "entries INTEGER NOT NULL, "
+            "PRIMARY KEY (source, replica)"
+            ") WITHOUT ROWID"
+        )
+
+    def __str__(self):
+        return "MetadataIndex"
+
+    def lookup(self, file: str) -> tuple[int, int, int, str] | None:
+        """
+        Get the record stored for a file
+
+        Parameters:
+            file (str): The absolute path of the file.
+
+        Returns:
+            tuple[int, int, int, str] | None: The size, mtime_ns, inode and digest of the file, None if it isn't indexed.
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT size, mtime_ns, inode, digest FROM files WHERE path = ?",
+                (file,),
+            ).fetchone()
+
+    @staticmethod
+    def current(record: tuple | None, stat: os.stat_result) -> bool:
+        """
+        Check if a record matches the current metadata of its file
+
+        Parameters:
+            record (tuple | None): The record returned by lookup.
+            stat (os.stat_result): The current metadata of the file.
+
+        Returns:
+            bool: True if the size, mtime and inode are unchanged, False otherwise.
+        """
+        return bool(record) and record[:3] == (
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_ino,
+        )
+
+    def store(self, file: str, stat: os.stat_result, digest: str) -> None:
+        """
+        Record the metadata and digest of a file
+
+        Parameters:
+            file (str): The absolute path of the file.
+            stat (os.stat_result): The metadata of the file when it was hashed.
+            digest (str): The digest of the file content.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (file, stat.st_size, stat.st_mtime_ns, stat.st_ino, digest),
+            )
+
+    def remove(self, path: str) -> None:
+        """
+        Forget a file or every file below a folder
+
+        Parameters:
+            path (str): The absolute path of the file or folder.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+                (path, f"{path}{os.sep}", f"{path}{chr(ord(os.sep) + 1)}"),
+            )
+
+    def move(self, path: str, new_path: str) -> None:
+        """
+        Move the records of a file or of every file below a folder, after it was renamed
+
+        Parameters:
+            path (str): The former absolute path of the file or folder.
+            new_path (str): The new absolute path of the file or folder.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE OR REPLACE files SET path = ? || substr(path, ?) "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (
+                    new_path,
+                    len(path) + 1,
+                    path,
+                    f"{path}{os.sep}",
+                    f"{path}{chr(ord(os.sep) + 1)}",
+                ),
+            )
+
+    def lookup_inode(self, inode: int, folder: str) -> list[tuple[str, int, int, int, str]]:
+        """
+        Get the records of an inode below a folder
+
+        Parameters:
+            inode (int): The inode number.
+            folder (str): The absolute folder the records must be below, as inodes are only unique per filesystem.
+
+        Returns:
+            list[tuple[str, int, int, int, str]]: The path, size, mtime_ns, inode and digest of each record.
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT path, size, mtime_ns, inode, digest FROM files "
+                "WHERE inode = ? AND path >= ? AND path < ?",
+                (inode, f"{folder}{os.sep}", f"{folder}{chr(ord(os.sep) + 1)}"),
+            ).fetchall()
+
+    def lookup_digest(
+        self, digest: str, folder: str
+    ) -> list[tuple[str, int, int, int, str]]:
+        """
+        Get the records of the files with a digest below a folder
+
+        Parameters:
+            digest (str): The digest, prefixed with its algorithm.
+            folder (str): The absolute folder the records must be below.
+
+        Returns:
+            list[tuple[str, int, int, int, str]]: The path, size, mtime_ns, inode and digest of each record.
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT path, size, mtime_ns, inode, digest FROM files "
+                "WHERE digest = ? AND path >= ? AND path < ?",
+                (digest, f"{folder}{os.sep}", f"{folder}{chr(ord(os.sep) + 1)}"),
+            ).fetchall()
+
+    def digest(self, file: str, stat: os.stat_result | None = None) -> str:
+        """
+        Get the digest of a file, hashing it only if its metadata changed since it was indexed
+
+        Parameters:
+            file (str): The absolute path of the file.
+            stat (os.stat_result | None): The metadata of the file from its directory listing, None to stat it here.
+
+        Returns:
+            str: The digest of the file content.
+        """
+        stat = stat or os.stat(file)
+        record = self.lookup(file)
+
+        if self.current(record, stat) and record[3].startswith(f"{self.algorithm}:"):
+            return record[3]
+
+        digest = f"{self.algorithm}:{file_digest(file, self.algorithm, self.throttle)}"
+        self.store(file, stat, digest)
+
+        if self.metrics:
+            self.metrics.add("bytes_hashed", stat.st_size)
+        return digest
+
+    def files_are_equal(
+        self,
+        source_file: str,
+        replica_file: str,
+        stats: tuple[os.stat_result, os.stat_result] | None = None,
+    ) -> bool:
+        """
+        Check if two files are equal by comparing their indexed digests
+
+        With the "bytes" method, files are compared directly unless both are unchanged
+        since they were last found equal.
+
+        Parameters:
+            source_file (str): The path of the source file.
+            replica_file (str): The path of the replica file.
+            stats (tuple[os.stat_result, os.stat_result] | None): The metadata of both files
+                from their directory listing, None to stat them here.
+
+        Returns:
+            bool: True if the files have the same content, False otherwise.
+        """
+        try:
+            source_stat, replica_stat = stats or (None, None)
+
+            if self.method != "bytes":
+                return self.digest(source_file, source_stat) == self.digest(
+                    replica_file, replica_stat
+                )
+
+            source_stat = source_stat or os.stat(source_file)
+            replica_stat = replica_stat or os.stat(replica_file)
+            source_record = self.lookup(source_file)
+            replica_record = self.lookup(replica_file)
+
+            if (
+                self.current(source_record, source_stat)
+                and self.current(replica_record, replica_stat)
+                and source_record[3] == replica_record[3]
+                and source_record[3].startswith("bytes:")
+            ):
+                return True
+
+            if self.metrics:
+                self.metrics.add("bytes_hashed", source_stat.st_size * 2)
+
+            if not bytes_are_equal(source_file, replica_file, self.throttle):
+                return False
+
+            token = (
+                f"bytes:{source_stat.st_size}:"
+                f"{source_stat.st_mtime_ns}:{source_stat.st_ino}"
+            )
+            self.store(source_file, source_stat, token)
+            self.store(replica_file, replica_stat, token)
+            return True
+        except OSError as e:
+            if self.on_error:
+                self.on_error(e)
+            return False
+
+    def record_copy(self, source_file: str, replica_file: str) -> None:
+        """
+        Record a fresh replica copy with the digest of its source
+
+        The replica is only recorded when the source is indexed and unchanged,
+        otherwise it will be hashed on the next comparison.
+
+        Parameters:
+            source_file (str): The path of the copied source file.
+            replica_file (str): The path of the replica copy.
+
+        Returns:
+            None
+        """
+        try:
+            source_stat = os.stat(source_file)
+            replica_stat = os.stat(replica_file)
+        except OSError:
+            self.remove(replica_file)
+            return
+
+        record = self.lookup(source_file)
+
+        if self.current(record, source_stat):
+            self.store(replica_file, replica_stat, record[3])
+        else:
+            self.remove(replica_file)
+
+    @staticmethod
+    def directory_state(source_dir: str, replica_dir: str) -> tuple[int, ...] | None:
+        """
+        Get the metadata of a source directory and its replica
+
+        A directory's mtime changes whenever an entry is added, removed or renamed in it,
+        but not when a file inside it is modified in place.
+
+        Parameters:
+            source_dir (str): The absolute source directory.
+            replica_dir (str): The absolute replica directory.
+
+        Returns:
+            tuple[int, ...] | None: The mtime_ns, inode and size of both directories, None if one is missing.
+        """
+        try:
+            source_stat = os.stat(source_dir)
+            replica_stat = os.stat(replica_dir)
+        except OSError:
+            return None
+
+        return (
+            source_stat.st_mtime_ns,
+            source_stat.st_ino,
+            source_stat.st_size,
+            replica_stat.st_mtime_ns,
+            replica_stat.st_ino,
+            replica_stat.st_size,
+        )
+
+    def cached_directory(
+        self, source_dir: str, replica_dir: str, state: tuple[int, ...] | None
+    ) -> list[str] | None:
+        """
+        Get the subdirectories of a directory pair left unchanged since it was found in sync
+
+        Parameters:
+            source_dir (str): The absolute source directory.
+            replica_dir (str): The absolute replica directory.
+            state (tuple[int, ...] | None): The current metadata returned by directory_state.
+
+        Returns:
+            list[str] | None: The names of the subdirectories, None if the pair must be listed again.
+        """
+        if state is None:
+            return None
+
+        with self.lock:
+            record = self.connection.execute(
+                "SELECT state, subdirs, entries FROM directories "
+                "WHERE source = ? AND replica = ?",
+                (source_dir, replica_dir),
+            ).fetchone()
+
+        if not record or record[0] != ",".join(map(str, state)):
+            return None
+
+        if self.metrics:
+            self.metrics.add("directories_skipped")
+            self.metrics.add("entries_skipped", record[2])
+        return record[1].split("\0") if record[1] else []
+
+    def store_directory(
+        self,
+        source_dir: str,
+        replica_dir: str,
+        state: tuple[int, ...] | None,
+        subdirs: list[str],
+        entries: int,
+    ) -> None:
+        """
+        Record a directory pair whose listings were found in sync
+
+        Parameters:
+            source_dir (str): The absolute source directory.
+            replica_dir (str): The absolute replica directory.
+            state (tuple[int, ...] | None): The metadata returned by directory_state before the pair was listed.
+            subdirs (list[str]): The names of the subdirectories.
+            entries (int): The number of entries of the source directory.
+
+        Returns:
+            None
+        """
+        if state is None:
+            return
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?)",
+                (
+                    source_dir,
+                    replica_dir,
+                    ",".join(map(str, state)),
+                    "\0".join(subdirs),
+                    entries,
+                ),
+            )
+
+    def clear_directories(self, source_folder: str) -> None:
+        """
+        Forget the directory pairs below a source folder, so the next pass lists every directory
+
+        Parameters:
+            source_folder (str): The absolute source folder.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM directories WHERE source = ? OR (source >= ? AND source < ?)",
+                (
+                    source_folder,
+                    f"{source_folder}{os.sep}",
+                    f"{source_folder}{chr(ord(os.sep) + 1)}",
+                ),
+            )
+
+    def commit(self) -> None:
+        """
+        Persist the pending changes
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Persist the pending changes and close the database
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import threading
+import time
+
+from copier import partial_path
+from index import MetadataIndex
+
+CHECKPOINT_SECONDS: float = 10.0
+TRANSFER_OPERATIONS: tuple[str, ...] = ("copy_file", "update_file")
+
+
+class Journal:
+    """
+    Journal keeps an on-disk SQLite record of the progress of the running pass, so a pass
+    interrupted by a crash, a kill or a reboot resumes where it stopped instead of walking,
+    comparing and copying everything again.
+
+    A pass records the directories whose changes were all taken from the plan, with their
+    subdirectories, and every change from the moment it is taken until it is applied. The offset
+    reached by the copies in flight is read from their partial files at every checkpoint.
+    A resumed pass skips the recorded directories, visiting only their subdirectories, and plans
+    the pending changes again from the current state of their paths. Interrupted copies then
+    resume from their partial files, after the blocks that still match the source.
+
+    Records are committed every CHECKPOINT_SECONDS together with the metadata index, so the
+    digests computed before an interruption are kept too. Several jobs can share the journal,
+    every record is keyed by the source and replica folders of its pass.
+
+    Attributes:
+        journal_file (str): The path to the SQLite database.
+        index (MetadataIndex | None): The metadata index committed at every checkpoint.
+        source_folder (str | None): The source folder of the running pass, None between passes.
+        replica_folder (str | None): The replica folder of the running pass, None between passes.
+        completed (dict[str, list[str]]): The directories completed by the interrupted pass, with their subdirectories.
+        checkpointed (float): The monotonic time of the last checkpoint.
+
+    Methods:
+        begin(source_folder: str, replica_folder: str) -> bool: Start a pass, resuming the interrupted one if any.
+        pending() -> list[tuple[str, str, int]]: Get the changes of the interrupted pass that were never applied.
+        completed_directory(relative: str) -> list[str] | None: Get the subdirectories of a completed directory.
+        complete_directory(relative: str, subdirs: list[str]) -> None: Record a directory whose changes were all planned.
+        planned(path: str, operation: str) -> None: Record a change taken from the plan.
+        applied(path: str, operation: str) -> None: Forget a change once applied.
+        checkpoint(force: bool) -> None: Persist the progress and the metadata index.
+        finish() -> None: Forget the progress of a pass that ran to its end.
+        close() -> None: Persist the progress and close the database.
+    """
+
+    def __init__(self, journal_file: str, index: MetadataIndex | None = None):
+        self.journal_file: str = journal_file
+        self.index: MetadataIndex | None = index
+        self.source_folder: str | None = None
+        self.replica_folder: str | None = None
+        self.completed: dict[str, list[str]] = {}
+        self.checkpointed: float = time.monotonic()
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(journal_file, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS passes ("
+            "source TEXT NOT NULL, "
+            "replica TEXT NOT NULL, "
+            "started REAL NOT NULL, "
+            "PRIMARY KEY (source, replica)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS directories ("
+            "source TEXT NOT NULL, "
+            "replica TEXT NOT NULL, "
+            "relative TEXT NOT NULL, "
+            "subdirs TEXT NOT NULL, "
+            "PRIMARY KEY (source, replica, relative)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "source TEXT NOT NULL, "
+            "replica TEXT NOT NULL, "
+            "path TEXT NOT NULL, "
+            "operation TEXT NOT NULL, "
+            "offset INTEGER NOT NULL, "
+            "PRIMARY KEY (source, replica, path, operation)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def __str__(self):
+        return "Journal"
+
+    def begin(self, source_folder: str, replica_folder: str) -> bool:
+        """
+        Start a pass, resuming the interrupted pass of the same folders if any
+
+        Parameters:
+            source_folder (str): The source folder of the pass.
+            replica_folder (str): The replica folder of the pass.
+
+        Returns:
+            bool: True if an interrupted pass is resumed, False if the pass starts from scratch.
+        """
+        with self.lock:
+            self.source_folder = source_folder
+            self.replica_folder = replica_folder
+            self.checkpointed = time.monotonic()
+            resumed = self.connection.execute(
+                "SELECT started FROM passes WHERE source = ? AND replica = ?",
+                (source_folder, replica_folder),
+            ).fetchone()
+
+            if not resumed:
+                self.completed = {}
+                self.connection.execute(
+                    "INSERT INTO passes VALUES (?, ?, ?)",
+                    (source_folder, replica_folder, time.time()),
+                )
+                self.connection.commit()
+                return False
+
+            self.completed = {
+                relative: subdirs.split("\0") if subdirs else []
+                for relative, subdirs in self.connection.execute(
+                    "SELECT relative, subdirs FROM directories "
+                    "WHERE source = ? AND replica = ?",
+                    (source_folder, replica_folder),
+                )
+            }
+            return True
+
+    def pending(self) -> list[tuple[str, str, int]]:
+        """
+        Get the changes of the interrupted pass that were taken from the plan but never applied
+
+        Returns:
+            list[tuple[str, str, int]]: The relative path, operation and offset reached by the copy of each change, sorted by path.
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT path, operation, offset FROM changes "
+                "WHERE source = ? AND replica = ? ORDER BY path",
+                (self.source_folder, self.replica_folder),
+            ).fetchall()
+
+    def completed_directory(self, relative: str) -> list[str] | None:
+        """
+        Get the subdirectories of a directory completed by the interrupted pass
+
+        Parameters:
+            relative (str): The directory relative to the synced folders.
+
+        Returns:
+            list[str] | None: The names of the subdirectories, None if the directory must be visited.
+        """
+        return self.completed.get(relative)
+
+    def complete_directory(self, relative: str, subdirs: list[str]) -> None:
+        """
+        Record a directory whose changes were all taken from the plan
+
+        Parameters:
+            relative (str): The directory relative to the synced folders.
+            subdirs (list[str]): The names of its subdirectories, still to visit.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?)",
+                (self.source_folder, self.replica_folder, relative, "\0".join(subdirs)),
+            )
+        self.checkpoint(force=False)
+
+    def planned(self, path: str, operation: str) -> None:
+        """
+        Record a change taken from the plan, until it is applied
+
+        Parameters:
+            path (str): The path of the change, relative to the synced folders.
+            operation (str): The operation of the change, the value of an Operation.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?, 0)",
+                (self.source_folder, self.replica_folder, path, operation),
+            )
+        self.checkpoint(force=False)
+
+    def applied(self, path: str, operation: str) -> None:
+        """
+        Forget a change once it is applied
+
+        Parameters:
+            path (str): The path of the change, relative to the synced folders.
+            operation (str): The operation of the change, the value of an Operation.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM changes "
+                "WHERE source = ? AND replica = ? AND path = ? AND operation = ?",
+                (self.source_folder, self.replica_folder, path, operation),
+            )
+        self.checkpoint(force=False)
+
+    def checkpoint(self, force: bool = True) -> None:
+        """
+        Persist the progress, with the offsets reached by the copies in flight, and the metadata index
+
+        Parameters:
+            force (bool): Whether to persist now, or only once CHECKPOINT_SECONDS passed since the last checkpoint.
+
+        Returns:
+            None
+        """
+        if not force and time.monotonic() - self.checkpointed < CHECKPOINT_SECONDS:
+            return
+
+        with self.lock:
+            self.checkpointed = time.monotonic()
+
+            if self.index:
+                self.index.commit()
+
+            transfers = self.connection.execute(
+                "SELECT path, operation FROM changes "
+                "WHERE source = ? AND replica = ? AND operation IN (?, ?)",
+                (self.source_folder, self.replica_folder, *TRANSFER_OPERATIONS),
+            ).fetchall()
+
+            for path, operation in transfers:
+                try:
+                    offset = os.path.getsize(
+                        partial_path(os.path.join(self.replica_folder, path))
+                    )
+                except OSError:
+                    continue
+
+                self.connection.execute(
+                    "UPDATE changes SET offset = ? "
+                    "WHERE source = ? AND replica = ? AND path = ? AND operation = ?",
+                    (offset, self.source_folder, self.replica_folder, path, operation),
+                )
+
+            self.connection.commit()
+
+    def finish(self) -> None:
+        """
+        Forget the progress of a pass that ran to its end
+
+        Returns:
+            None
+        """
+        with self.lock:
+            for table in ("passes", "directories", "changes"):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE source = ? AND replica = ?",
+                    (self.source_folder, self.replica_folder),
+                )
+            self.connection.commit()
+            self.source_folder = self.replica_folder = None
+            self.completed = {}
+
+    def close(self) -> None:
+        """
+        Persist the progress and close the database
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
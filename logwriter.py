@@ -0,0 +1,205 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import TextIO
+
+LOG_LEVELS: dict[str, int] = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LOG_FORMATS: tuple[str, ...] = ("text", "json")
+
+
+class LogWriter:
+    """
+    LogWriter writes log records from a background thread, so logging never blocks
+    the threads copying files. Records are queued, then written and flushed in batches
+    to a log file kept open, optionally echoed to stdout or another stream, and the file is rotated by size.
+
+    Attributes:
+        log_file (str): The path to the log file.
+        level (str): The minimum level of the written records.
+        log_format (str): "text" for the pipe separated format, "json" for JSON lines.
+        max_bytes (int): The size in bytes after which the log file is rotated, 0 to never rotate it.
+        backups (int): The number of rotated log files kept.
+        echo (bool): Whether records are also printed to the echo stream.
+        stream (TextIO | None): The stream records are echoed to, None for stdout.
+        flush_interval (float): The maximum seconds a record waits before being written.
+
+    Methods:
+        write(level: str, name: str, message: str, **fields) -> None: Queue a record without blocking.
+        format(record: tuple) -> str: Format a record as a line.
+        rotate() -> None: Rotate the log file.
+        flush() -> None: Wait until every queued record is written.
+        close() -> None: Write the queued records and stop the background thread.
+    """
+
+    def __init__(
+        self,
+        log_file: str,
+        level: str = "info",
+        log_format: str = "text",
+        max_bytes: int = 0,
+        backups: int = 3,
+        echo: bool = True,
+        stream: TextIO | None = None,
+        flush_interval: float = 0.5,
+    ):
+        self.log_file: str = log_file
+        self.level: str = level
+        self.log_format: str = log_format
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+        self.echo: bool = echo
+        self.stream: TextIO | None = stream
+        self.flush_interval: float = flush_interval
+
+        self.records: queue.SimpleQueue = queue.SimpleQueue()
+        self.file = open(self.log_file, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self.run, name="LogWriter", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def __str__(self):
+        return "LogWriter"
+
+    def write(self, level: str, name: str, message: str, **fields) -> None:
+        """
+        Queue a record without blocking
+
+        Parameters:
+            level (str): The level of the record, a key of LOG_LEVELS.
+            name (str): The name of the logged event.
+            message (str): The message of the record.
+            **fields: Extra fields, only written in the JSON format.
+
+        Returns:
+            None
+        """
+        if LOG_LEVELS[level] < LOG_LEVELS[self.level]:
+            return
+
+        self.records.put((datetime.now(), level, name, message, fields))
+
+    def format(self, record: tuple) -> str:
+        """
+        Format a record as a line
+
+        Parameters:
+            record (tuple): The queued record.
+
+        Returns:
+            str: The formatted line, without the line break.
+        """
+        moment, level, name, message, fields = record
+
+        if self.log_format == "json":
+            return json.dumps(
+                {
+                    "time": moment.isoformat(timespec="milliseconds"),
+                    "level": level,
+                    "event": name,
+                    "message": message,
+                    **fields,
+                },
+                default=str,
+            )
+
+        return f"{moment.strftime('%Y-%m-%d %H:%M:%S')}|{name}|{message}"
+
+    def run(self) -> None:
+        """
+        Write the queued records in batches until a None record is received
+
+        Returns:
+            None
+        """
+        running = True
+
+        while running:
+            try:
+                batch = [self.records.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            while True:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            done = []
+
+            for record in batch:
+                if record is None:
+                    running = False
+                elif isinstance(record, threading.Event):
+                    done.append(record)
+                else:
+                    lines.append(f"{self.format(record)}\n")
+
+            if lines:
+                text = "".join(lines)
+                self.file.write(text)
+                self.file.flush()
+
+                if self.echo:
+                    stream = self.stream or sys.stdout
+                    stream.write(text)
+                    stream.flush()
+
+                if self.max_bytes and self.file.tell() >= self.max_bytes:
+                    self.rotate()
+
+            for event in done:
+                event.set()
+
+        self.file.close()
+
+    def rotate(self) -> None:
+        """
+        Rotate the log file, keeping the configured number of backups
+
+        Returns:
+            None
+        """
+        self.file.close()
+
+        if self.backups:
+            for index in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.log_file}.{index}"):
+                    os.replace(f"{self.log_file}.{index}", f"{self.log_file}.{index + 1}")
+            os.replace(self.log_file, f"{self.log_file}.1")
+            self.file = open(self.log_file, "a", encoding="utf-8")
+        else:
+            self.file = open(self.log_file, "w", encoding="utf-8")
+
+    def flush(self) -> None:
+        """
+        Wait until every queued record is written
+
+        Returns:
+            None
+        """
+        if not self.thread.is_alive():
+            return
+
+        written = threading.Event()
+        self.records.put(written)
+        written.wait()
+
+    def close(self) -> None:
+        """
+        Write the queued records and stop the background thread
+
+        Returns:
+            None
+        """
+        if not self.thread.is_alive():
+            return
+
+        self.records.put(None)
+        self.thread.join()
+        atexit.unregister(self.close)
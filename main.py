@@ -1,6 +1,10 @@
+import sys
+
 from argparser import valid_args
 from config import ConfigArgs, ConfigFile
+from scheduler import Scheduler
 from sync import Sync
+from throttle import set_priority
 
 if __name__ == "__main__":
 
@@ -12,10 +16,54 @@ if __name__ == "__main__":
             replica_folder=args["replica"],
             interval_sync=args["interval"],
             log_file=args["log"],
+            index_file=args["index"],
+            watch=args["watch"],
+            workers=args["workers"],
+            delta_threshold=args["delta_threshold"],
+            compare_method=args["compare"],
+            log_level=args["log_level"],
+            log_format=args["log_format"],
+            log_max_bytes=args["log_max_bytes"],
+            log_backups=args["log_backups"],
+            metrics_port=args["metrics_port"],
+            stats_file=args["stats_file"],
+            adaptive_interval=args["adaptive_interval"],
+            min_interval=args["min_interval"],
+            max_interval=args["max_interval"],
+            dir_skip=args["dir_skip"],
+            full_verify_every=args["full_verify_every"],
+            dry_run=args["dry_run"],
+            detect_moves=args["detect_moves"],
+            dedup=args["dedup"],
+            max_bytes_per_second=args["max_bytes_per_second"],
+            max_ops_per_second=args["max_ops_per_second"],
+            burst_seconds=args["burst_seconds"],
+            throttle_hours=args["throttle_hours"],
+            nice=args["nice"],
+            io_class=args["io_class"],
+            exclude=args["exclude"]
+            + [f"!{pattern}" for pattern in args["include"]],
+            min_size=args["min_size"],
+            max_size=args["max_size"],
+            min_age=args["min_age"],
+            max_age=args["max_age"],
+            hash_workers=args["hash_workers"],
+            mount_concurrency=args["mount_concurrency"],
+            journal_file=args["journal"],
         )
 
     else:
         config = ConfigFile()
 
-    synchronization = Sync(configuration=config)
-    synchronization.start()
+    try:
+        set_priority(config.nice, config.io_class)
+    except OSError as e:
+        print(f"Could not set the process priority: {e}", file=sys.stderr)
+
+    if not valid and config.jobs:
+        scheduler = Scheduler(config.job_configs(), config.workers)
+        scheduler.start()
+
+    else:
+        synchronization = Sync(configuration=config)
+        synchronization.start()
@@ -0,0 +1,308 @@
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """
+    Histogram counts observations in cumulative buckets, like a Prometheus histogram.
+
+    Attributes:
+        buckets (tuple[float, ...]): The upper bounds of the buckets.
+        counts (list[int]): The number of observations per bucket, the last one is +Inf.
+        total (float): The sum of the observations.
+        count (int): The number of observations.
+
+    Methods:
+        observe(value: float) -> None: Add an observation.
+        render(name: str) -> list[str]: Render the histogram in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.total: float = 0.0
+        self.count: int = 0
+
+    def __str__(self):
+        return "Histogram"
+
+    def observe(self, value: float) -> None:
+        """
+        Add an observation
+
+        Parameters:
+            value (float): The observed value.
+
+        Returns:
+            None
+        """
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str) -> list[str]:
+        """
+        Render the histogram in the Prometheus text format
+
+        Parameters:
+            name (str): The name of the metric.
+
+        Returns:
+            list[str]: The lines of the metric.
+        """
+        lines = [f"# TYPE {name} histogram"]
+        cumulative = 0
+
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+
+        lines.append(f"{name}_sum {self.total}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class Metrics:
+    """
+    Metrics collects counters and timings of the sync passes and renders them
+    in the Prometheus text format. Every method is safe to call from the worker threads.
+
+    Attributes:
+        counters (Counter): The cumulative counters, such as files scanned or bytes copied.
+        operations (Counter): The number of applied operations by type.
+        errors (Counter): The number of failed operations by type.
+        phases (Counter): The cumulative seconds spent in each phase of the passes.
+        last_pass (dict[str, float]): The counters and durations of the last finished pass.
+        copy_latency (Histogram): The per file copy and update latency.
+
+    Methods:
+        add(name: str, value: int) -> None: Increase a counter.
+        add_phase(phase: str, seconds: float) -> None: Add time spent in a phase.
+        record_operation(operation: str, ok: bool, seconds: float | None) -> None: Count an applied operation.
+        start_pass() -> None: Mark the beginning of a pass.
+        end_pass() -> None: Mark the end of a pass and keep its figures.
+        render() -> str: Render every metric in the Prometheus text format.
+        write_stats(stats_file: str) -> None: Atomically rewrite the stats file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.operations: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.phases: Counter = Counter()
+        self.last_pass: dict[str, float] = {}
+        self.copy_latency: Histogram = Histogram()
+        self.pass_started: float | None = None
+        self.pass_start_counters: Counter = Counter()
+        self.pass_start_phases: Counter = Counter()
+
+    def __str__(self):
+        return "Metrics"
+
+    def add(self, name: str, value: int = 1) -> None:
+        """
+        Increase a counter
+
+        Parameters:
+            name (str): The name of the counter.
+            value (int): The increment.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.counters[name] += value
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        """
+        Add time spent in a phase of a pass
+
+        Parameters:
+            phase (str): The phase, such as walk, compare or copy.
+            seconds (float): The time spent.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.phases[phase] += seconds
+
+    def record_operation(
+        self, operation: str, ok: bool, seconds: float | None = None
+    ) -> None:
+        """
+        Count an applied operation
+
+        Parameters:
+            operation (str): The name of the operation.
+            ok (bool): Whether the operation succeeded.
+            seconds (float | None): The latency of a copy or update, None for other operations.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.operations[operation] += 1
+            if not ok:
+                self.errors[operation] += 1
+            if seconds is not None:
+                self.copy_latency.observe(seconds)
+
+    def start_pass(self) -> None:
+        """
+        Mark the beginning of a pass
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.pass_started = time.monotonic()
+            self.pass_start_counters = Counter(self.counters)
+            self.pass_start_phases = Counter(self.phases)
+
+    def end_pass(self) -> None:
+        """
+        Mark the end of a pass and keep its figures
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.pass_started is None:
+                return
+
+            last_pass = {
+                name: value - self.pass_start_counters[name]
+                for name, value in self.counters.items()
+            }
+            for phase, seconds in self.phases.items():
+                last_pass[f"{phase}_seconds"] = seconds - self.pass_start_phases[phase]
+            last_pass["duration_seconds"] = time.monotonic() - self.pass_started
+            last_pass["finished_timestamp_seconds"] = time.time()
+
+            self.last_pass = last_pass
+            self.counters["passes"] += 1
+            self.pass_started = None
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        with self.lock:
+            lines = []
+
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE sync_{name}_total counter")
+                lines.append(f"sync_{name}_total {value}")
+
+            lines.append("# TYPE sync_operations_total counter")
+            for operation, value in sorted(self.operations.items()):
+                lines.append(f'sync_operations_total{{operation="{operation}"}} {value}')
+
+            lines.append("# TYPE sync_errors_total counter")
+            for operation, value in sorted(self.errors.items()):
+                lines.append(f'sync_errors_total{{operation="{operation}"}} {value}')
+
+            lines.append("# TYPE sync_phase_seconds_total counter")
+            for phase, value in sorted(self.phases.items()):
+                lines.append(f'sync_phase_seconds_total{{phase="{phase}"}} {value}')
+
+            for name, value in sorted(self.last_pass.items()):
+                lines.append(f"# TYPE sync_last_pass_{name} gauge")
+                lines.append(f"sync_last_pass_{name} {value}")
+
+            lines.extend(self.copy_latency.render("sync_copy_latency_seconds"))
+            return "\n".join(lines) + "\n"
+
+    def write_stats(self, stats_file: str) -> None:
+        """
+        Atomically rewrite the stats file with the rendered metrics
+
+        Parameters:
+            stats_file (str): The path to the stats file.
+
+        Returns:
+            None
+        """
+        temporary = f"{stats_file}.tmp"
+
+        with open(temporary, "w") as f:
+            f.write(self.render())
+
+        os.replace(temporary, stats_file)
+
+
+class MetricsServer:
+    """
+    MetricsServer exposes the metrics in the Prometheus text format on a local HTTP port,
+    from a background thread.
+
+    Attributes:
+        metrics (Metrics): The exposed metrics.
+        server (ThreadingHTTPServer): The HTTP server answering every path with the metrics.
+
+    Methods:
+        close() -> None: Stop the server.
+    """
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        self.metrics: Metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                body = metrics.render().encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self.thread.start()
+
+    def __str__(self):
+        return "MetricsServer"
+
+    def close(self) -> None:
+        """
+        Stop the server
+
+        Returns:
+            None
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,195 @@
+import heapq
+import json
+import os
+import tempfile
+import time
+from typing import Iterable
+
+from diff import Change, Operation
+
+PROBE_SIZE: int = 64 * 1024 * 1024
+PROBE_BLOCK_SIZE: int = 1024 * 1024
+PROBE_FILES: int = 64
+
+
+def change_size(change: Change) -> int:
+    """
+    Get the number of bytes a change will read or remove.
+
+    Copies and updates read the whole source file, deletions remove the replica file
+    or every file below the replica folder, folder creations move no data.
+
+    Parameters:
+        change (Change): The planned change.
+
+    Returns:
+        int: The number of bytes, 0 if the files can't be stat'ed.
+    """
+    try:
+        if change.operation in (Operation.COPY_FILE, Operation.UPDATE_FILE):
+            return os.path.getsize(change.source)
+
+        if change.operation == Operation.DELETE_FILE:
+            return os.path.getsize(change.replica)
+
+        if change.operation == Operation.DELETE_FOLDER:
+            return sum(
+                os.path.getsize(os.path.join(folder, name))
+                for folder, dirs, files in os.walk(change.replica)
+                for name in files
+            )
+    except OSError:
+        pass
+
+    return 0
+
+
+def summarize_plan(plan: Iterable[Change]) -> tuple[dict[str, dict[str, int]], list[str]]:
+    """
+    Count the changes and bytes of a plan by operation.
+
+    Parameters:
+        plan (Iterable[Change]): The planned changes.
+
+    Returns:
+        tuple[dict[str, dict[str, int]], list[str]]: The count and bytes of each operation,
+        and the largest source files to transfer, used to probe the read throughput.
+    """
+    operations = {operation.value: {"count": 0, "bytes": 0} for operation in Operation}
+    transfers: list[tuple[int, str]] = []
+
+    for change in plan:
+        size = change_size(change)
+        operations[change.operation.value]["count"] += 1
+        operations[change.operation.value]["bytes"] += size
+
+        if change.operation in (Operation.COPY_FILE, Operation.UPDATE_FILE):
+            if len(transfers) < PROBE_FILES:
+                heapq.heappush(transfers, (size, change.source))
+            else:
+                heapq.heappushpop(transfers, (size, change.source))
+
+    return operations, [file for size, file in sorted(transfers, reverse=True)]
+
+
+def measure_read_throughput(files: list[str], probe_size: int = PROBE_SIZE) -> float:
+    """
+    Measure the read throughput of a volume by reading up to probe_size bytes of some of its files.
+    The files are dropped from the page cache first where possible, so cached data doesn't inflate the result.
+
+    Parameters:
+        files (list[str]): The files to read, largest first.
+        probe_size (int): The maximum number of bytes to read.
+
+    Returns:
+        float: The throughput in bytes per second, 0 if nothing could be read.
+    """
+    buffer = bytearray(PROBE_BLOCK_SIZE)
+    read = 0
+    started = time.perf_counter()
+
+    for file in files:
+        try:
+            fd = os.open(file, os.O_RDONLY)
+        except OSError:
+            continue
+
+        try:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            while read < probe_size and (count := os.readv(fd, [buffer])):
+                read += count
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+        if read >= probe_size:
+            break
+
+    elapsed = time.perf_counter() - started
+    return read / elapsed if read and elapsed > 0 else 0.0
+
+
+def measure_write_throughput(folder: str, probe_size: int = PROBE_SIZE) -> float:
+    """
+    Measure the write throughput of a volume by writing and syncing a temporary file in a folder,
+    which is removed afterwards.
+
+    Parameters:
+        folder (str): The folder on the measured volume.
+        probe_size (int): The number of bytes to write.
+
+    Returns:
+        float: The throughput in bytes per second, 0 if the folder isn't writable.
+    """
+    block = os.urandom(PROBE_BLOCK_SIZE)
+    written = 0
+
+    try:
+        fd, probe = tempfile.mkstemp(prefix=".sync-probe-", dir=folder)
+    except OSError:
+        return 0.0
+
+    try:
+        started = time.perf_counter()
+        while written < probe_size:
+            written += os.write(fd, block[: probe_size - written])
+        os.fsync(fd)
+        elapsed = time.perf_counter() - started
+    except OSError:
+        return 0.0
+    finally:
+        os.close(fd)
+        os.remove(probe)
+
+    return written / elapsed if elapsed > 0 else 0.0
+
+
+def estimate_duration(
+    operations: dict[str, dict[str, int]], read_throughput: float, write_throughput: float
+) -> float | None:
+    """
+    Estimate the duration of the copies and updates of a plan, bound by the slower of the two volumes.
+
+    Parameters:
+        operations (dict[str, dict[str, int]]): The count and bytes of each operation.
+        read_throughput (float): The read throughput of the source volume in bytes per second.
+        write_throughput (float): The write throughput of the replica volume in bytes per second.
+
+    Returns:
+        float | None: The estimated seconds, None if a throughput couldn't be measured.
+    """
+    transfer = sum(
+        operations[operation.value]["bytes"]
+        for operation in (Operation.COPY_FILE, Operation.UPDATE_FILE)
+    )
+
+    if not transfer:
+        return 0.0
+
+    if not read_throughput or not write_throughput:
+        return None
+
+    return transfer / min(read_throughput, write_throughput)
+
+
+def write_report(report_file: str, report: dict | list) -> None:
+    """
+    Write a dry run report as JSON.
+
+    Parameters:
+        report_file (str): The path of the report file, "-" for stdout.
+        report (dict | list): The report of a sync or the reports of several jobs.
+
+    Returns:
+        None
+    """
+    text = json.dumps(report, indent=4)
+
+    if report_file == "-":
+        print(text)
+        return
+
+    with open(report_file, "w") as f:
+        f.write(f"{text}\n")
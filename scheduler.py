@@ -0,0 +1,175 @@
+import heapq
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ConfigJob
+from logwriter import LogWriter
+from metrics import Metrics, MetricsServer
+from planner import write_report
+from sync import Sync
+
+
+class Scheduler:
+    """
+    Scheduler runs several sync jobs in one process. Jobs are kept in a heap ordered by their
+    next due time and run one pass at a time, so jobs never stampede the same disks together,
+    while the copies and updates of every job share one worker pool sized by the global worker budget.
+    A job is due again its own interval after its pass ends, so a slow pass never piles up,
+    and jobs in adaptive mode follow their own change rate.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The worker pool shared by every job, sized by the global worker budget
+            which replaces the workers option of each job.
+        log_writers (dict[str, LogWriter]): The log writers by log file, shared by the jobs logging to the same file.
+        metrics (dict[int, Metrics]): The metrics by port, shared by the jobs exposing the same port.
+        metrics_servers (list[MetricsServer]): The HTTP endpoints exposing the metrics.
+        syncs (list[Sync]): The synchronization of each job.
+        queue (list[tuple[float, int, Sync]]): The heap of jobs by next due time.
+
+    Methods:
+        log_writer(config: ConfigJob) -> LogWriter: Get the log writer of a job.
+        job_metrics(config: ConfigJob) -> Metrics | None: Get the shared metrics of a job.
+        run_next() -> Sync: Wait for the next due job and run a pass of it.
+        start(): Run the jobs forever.
+    """
+
+    def __init__(self, configs: list[ConfigJob], workers: int):
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers)
+        self.log_writers: dict[str, LogWriter] = {}
+        self.metrics: dict[int, Metrics] = {}
+        self.metrics_servers: list[MetricsServer] = []
+
+        for config in configs:
+            config.workers = workers
+
+        self.syncs: list[Sync] = [
+            Sync(
+                configuration=config,
+                executor=self.executor,
+                log_writer=self.log_writer(config),
+                metrics=self.job_metrics(config),
+            )
+            for config in configs
+        ]
+        now = time.monotonic()
+        self.queue: list[tuple[float, int, Sync]] = [
+            (now, order, sync) for order, sync in enumerate(self.syncs)
+        ]
+        heapq.heapify(self.queue)
+
+    def __str__(self):
+        return "Scheduler"
+
+    def log_writer(self, config: ConfigJob) -> LogWriter:
+        """
+        Get the log writer of a job, shared by the jobs logging to the same file
+
+        Parameters:
+            config (ConfigJob): The configuration of the job.
+
+        Returns:
+            LogWriter: The log writer of the job.
+        """
+        if config.log_file not in self.log_writers:
+            self.log_writers[config.log_file] = LogWriter(
+                config.log_file,
+                level=config.log_level,
+                log_format=config.log_format,
+                max_bytes=config.log_max_bytes,
+                backups=config.log_backups,
+            )
+
+        return self.log_writers[config.log_file]
+
+    def job_metrics(self, config: ConfigJob) -> Metrics | None:
+        """
+        Get the metrics of a job, shared by the jobs exposing the same port
+
+        Parameters:
+            config (ConfigJob): The configuration of the job.
+
+        Returns:
+            Metrics | None: The shared metrics, None if the job does not expose its metrics.
+        """
+        if not config.metrics_port:
+            return None
+
+        if config.metrics_port not in self.metrics:
+            self.metrics[config.metrics_port] = Metrics()
+            self.metrics_servers.append(
+                MetricsServer(self.metrics[config.metrics_port], config.metrics_port)
+            )
+
+        return self.metrics[config.metrics_port]
+
+    def run_next(self) -> Sync:
+        """
+        Wait for the next due job and run a pass of it
+
+        A failing pass is logged and the job is scheduled again, so it never stops the other jobs.
+
+        Returns:
+            Sync: The synchronization of the job that ran.
+        """
+        due, order, sync = heapq.heappop(self.queue)
+        delay = due - time.monotonic()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        print(f"Syncing {sync.config.name}...")
+        started = time.monotonic()
+
+        try:
+            sync.sync_folders(sync.config.source_folder, sync.config.replica_folder)
+        except Exception as e:
+            sync.log("run_next", f"{sync.config.name}: {e}", "error")
+
+        interval = sync.adapt_interval(
+            sync.metrics.last_pass.get("changes", 0), time.monotonic() - started
+        )
+        heapq.heappush(self.queue, (time.monotonic() + interval, order, sync))
+        return sync
+
+    def start(self):
+        """
+        Run the jobs forever, each one every configured interval.
+
+        Watch mode is not available for jobs, they are synced on their interval.
+        In dry run mode, the reports of every job are written as a JSON list and nothing is synced.
+        With the reports on stdout, the log records are echoed to stderr and written before the reports.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        dry_run = next((sync.config.dry_run for sync in self.syncs if sync.config.dry_run), "")
+
+        if dry_run:
+            if dry_run == "-":
+                for log_writer in self.log_writers.values():
+                    log_writer.stream = sys.stderr
+
+            report = [
+                {
+                    "name": sync.config.name,
+                    **sync.dry_run(sync.config.source_folder, sync.config.replica_folder),
+                }
+                for sync in self.syncs
+            ]
+
+            for log_writer in self.log_writers.values():
+                log_writer.flush()
+
+            write_report(dry_run, report)
+            return
+
+        for sync in self.syncs:
+            if sync.config.watch:
+                print(f"Watch mode is not available for jobs, polling {sync.config.name}")
+
+        while True:
+            self.run_next()
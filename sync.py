@@ -1,13 +1,43 @@
+import errno
 import os
 import shutil
+import sys
 import time
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
-from config import ConfigArgs, ConfigFile
+from async_walk import AsyncWalker
+from config import ConfigArgs, ConfigFile, ConfigJob
+from copier import UNSUPPORTED_ERRORS, link_file, transfer_file
+from delta import delta_eligible, delta_update
+from diff import (
+    Change,
+    Operation,
+    iter_path_plan,
+    iter_plan,
+    scan_directory,
+    topmost_missing,
+)
+from filters import PathFilter
+from hashing import HashService
+from index import FOLDER_DIGEST, MetadataIndex
+from journal import Journal
+from logwriter import LogWriter
+from metrics import Metrics, MetricsServer
+from planner import (
+    estimate_duration,
+    measure_read_throughput,
+    measure_write_throughput,
+    summarize_plan,
+    write_report,
+)
+from throttle import Throttle
 from utils import files_are_equal
+from watcher import Watcher
 
-LOG_FILE: str = "sync.log"
+PENDING_PER_WORKER: int = 4
 
 
 class Sync:
@@ -20,28 +50,124 @@ class Sync:
     which continuously syncs the folders based on the configured interval.
 
     Attributes:
-        config (ConfigArgs | ConfigFile): The configuration object containing the source folder,
+        config (ConfigArgs | ConfigFile | ConfigJob): The configuration object containing the source folder,
         replica folder, interval sync, and log file settings.
+        index (MetadataIndex | None): The metadata index used to skip hashing unchanged files, None if disabled.
+        journal (Journal | None): The progress of the running pass, used to resume it after an interruption, None if disabled.
+        filters (PathFilter): The patterns and limits excluding paths from the sync.
+        throttle (Throttle): The byte and operation rate limits of the copies, updates and hashes.
+        hasher (HashService | None): The pool comparing files during the walk, None with a single hash worker.
+        walker (AsyncWalker | None): The concurrent walker used on high latency mounts, None to walk one directory at a time.
+        executor (ThreadPoolExecutor | None): The worker pool running copies and updates, None with a single worker.
+            A pool shared by several jobs can be passed instead.
+        log_writer (LogWriter): The background writer of the log file, possibly shared by several jobs.
+        metrics (Metrics): The counters and timings of the passes, possibly shared by several jobs.
+        metrics_server (MetricsServer | None): The local HTTP endpoint exposing the metrics, None if disabled
+            or if the metrics are shared and served by the caller.
+        interval (float): The seconds to wait before the next pass.
+        passes (int): The number of full passes started.
 
     Methods:
         logger(func): Decorator function for logging method calls.
         sync_folders(source_folder: Path, replica_folder: Path) -> bool: Sync the folders between the specified source and replica paths.
+        sync_paths(source_folder: str, replica_folder: str, paths: set[str]) -> bool: Sync only the given source paths.
+        dry_run(source_folder: str, replica_folder: str) -> dict: Report the changes a sync would apply and their estimated duration.
+        finish_pass() -> None: Close the metrics of a pass and rewrite the stats file if configured.
+        adapt_interval(changes: int, elapsed: float) -> float: Compute the wait before the next pass.
+        plan(source_folder: str, replica_folder: str, directories: MetadataIndex | None, journal: Journal | None) -> Iterator[Change]: Walk both folders and yield the changes.
+        resume_plan(source_folder: str, replica_folder: str) -> Iterator[Change]: Plan again the changes left behind by an interrupted pass.
+        path_filter() -> PathFilter | None: Get the rules excluding paths from the plans.
+        throttled() -> Callable[[int], None] | None: Get the callback charging the byte limit.
+        scan(folder: str) -> list[os.DirEntry] | None: List a directory, counting the scanned entries.
+        compare(source_file: str, replica_file: str) -> bool: Compare two files with the same size.
+        apply_plan(plan: Iterable[Change], source_folder: str, replica_folder: str, journal: Journal | None) -> None: Apply a change plan to the replica as it is produced.
+        find_move(change: Change, source_folder: str, replica_folder: str) -> tuple[str, str] | None: Find where the replica holds a moved path.
+        move_path(former_source: str, former_replica: str, source: str, replica: str) -> bool: Move a path within the replica.
+        execute(change: Change, source_folder: str) -> int: Apply a change and return the number of bytes written.
+        apply_change(change: Change) -> bool: Apply a single change of the plan to the replica.
+        log_summary(files: int, size: int, errors: int, elapsed: float) -> None: Log the throughput of a pass.
+        log(name: str, message: str, level: str, **fields) -> None: Log a message without blocking.
+        update_index(change: Change, source_folder: str) -> None: Keep the metadata index in line with an applied change.
         create_folder(folder: str) -> bool: Create a folder at the specified path.
         delete_folder(folder: str) -> bool: Delete a folder at the specified path.
         delete_file(file: str) -> bool: Delete a file at the specified path.
         copy_file(source_file: str, replica_file: str) -> bool: Copy a file from the source path to the replica path.
         update_file(source_file: str, replica_file: str) -> bool: Update a file by replacing it with a new version from the source path.
+        watch(): Sync the folders whenever the source changes, with a full sync every configured interval.
         start(): Start the synchronization process by continuously syncing the folders based on the configured interval.
     """
 
     def __init__(
         self,
-        configuration: ConfigArgs | ConfigFile,
+        configuration: ConfigArgs | ConfigFile | ConfigJob,
+        executor: ThreadPoolExecutor | None = None,
+        log_writer: LogWriter | None = None,
+        metrics: Metrics | None = None,
     ):
         self.config = configuration
+        self.metrics: Metrics = metrics or Metrics()
+        self.interval: float = self.config.interval_sync
+        self.passes: int = 0
 
-        global LOG_FILE
-        LOG_FILE = self.config.log_file
+        self.filters: PathFilter = PathFilter(
+            self.config.exclude,
+            self.config.min_size,
+            self.config.max_size,
+            self.config.min_age,
+            self.config.max_age,
+        )
+        self.throttle: Throttle = Throttle(
+            self.config.max_bytes_per_second,
+            self.config.max_ops_per_second,
+            self.config.burst_seconds,
+            self.config.throttle_hours,
+            self.metrics,
+        )
+        self.index: MetadataIndex | None = (
+            MetadataIndex(
+                self.config.index_file,
+                self.config.compare_method,
+                self.metrics,
+                self.throttled(),
+                lambda e: self.log("compare", str(e), "error"),
+            )
+            if self.config.index_file
+            else None
+        )
+        self.journal: Journal | None = (
+            Journal(self.config.journal_file, self.index)
+            if self.config.journal_file
+            else None
+        )
+        self.hasher: HashService | None = (
+            HashService(self.compare, self.config.hash_workers)
+            if self.config.hash_workers > 1
+            else None
+        )
+        self.walker: AsyncWalker | None = (
+            AsyncWalker(self.config.mount_concurrency)
+            if self.config.mount_concurrency > 0
+            else None
+        )
+        self.executor: ThreadPoolExecutor | None = executor or (
+            ThreadPoolExecutor(max_workers=self.config.workers)
+            if self.config.workers > 1
+            else None
+        )
+
+        self.log_writer: LogWriter = log_writer or LogWriter(
+            self.config.log_file,
+            level=self.config.log_level,
+            log_format=self.config.log_format,
+            max_bytes=self.config.log_max_bytes,
+            backups=self.config.log_backups,
+            stream=sys.stderr if self.config.dry_run == "-" else None,
+        )
+        self.metrics_server: MetricsServer | None = (
+            MetricsServer(self.metrics, self.config.metrics_port)
+            if self.config.metrics_port and metrics is None
+            else None
+        )
 
     def __str__(self):
         return "Sync"
@@ -63,20 +189,12 @@ class Sync:
                 return result
         """
 
-        def wrapper(*args, **kwargs):
-            operation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print_args = args
-
-            if args and hasattr(args[0], "__class__"):
-                print_args = args[1:]
-
-            message = f"{operation_time}|{func.__name__}|{print_args}|{kwargs}"
-            print(message)
-
-            with open(LOG_FILE, "a") as f:
-                f.write(f"{message}\n")
+        def wrapper(self, *args, **kwargs):
+            self.log_writer.write(
+                "info", func.__name__, f"{args}|{kwargs}", args=args, kwargs=kwargs
+            )
 
-            result = func(*args, **kwargs)
+            result = func(self, *args, **kwargs)
             return result
 
         return wrapper
@@ -85,6 +203,13 @@ class Sync:
         """
         Sync the folders
 
+        Both folders are scanned once to build a change plan, which is then applied to the replica.
+        When the metadata index is enabled, files whose size, mtime and inode didn't change are not hashed again.
+        With dir_skip, directories unchanged on both sides are not listed again, except on the first pass
+        and every full_verify_every passes, which list every directory.
+        With the journal, a pass interrupted by a crash or a kill is resumed by the next one, which skips
+        the directories it completed and plans again the changes it left behind, see 'resume_plan'.
+
         Parameters:
             source_folder (Path): The source folder to sync from.
             replica_folder (Path): The replica folder to sync to.
@@ -92,45 +217,668 @@ class Sync:
         Returns:
             bool: True if the synchronization is successful, False otherwise.
         """
-        if not os.path.exists(replica_folder):
-            self.create_folder(replica_folder)
+        self.metrics.start_pass()
+        directories = self.index if self.config.dir_skip else None
 
-        for root, dirs, files in os.walk(source_folder):
-            for file in files:
-                source_file = os.path.join(root, file)
-                replica_file = source_file.replace(source_folder, replica_folder)
+        if directories and (
+            self.passes == 0
+            or self.config.full_verify_every
+            and self.passes % self.config.full_verify_every == 0
+        ):
+            directories.clear_directories(source_folder)
 
-                if not os.path.exists(replica_file):
-                    self.copy_file(source_file, replica_file)
-                    continue
+        self.passes += 1
+        resumed: Iterable[Change] = ()
 
-                if not files_are_equal(source_file, replica_file):
-                    self.update_file(source_file, replica_file)
-                    continue
+        if self.journal and self.journal.begin(source_folder, replica_folder):
+            resumed = self.resume_plan(source_folder, replica_folder)
+
+        try:
+            self.apply_plan(
+                chain(
+                    resumed,
+                    self.plan(source_folder, replica_folder, directories, self.journal),
+                ),
+                source_folder,
+                replica_folder,
+                self.journal,
+            )
+            if self.journal:
+                self.journal.finish()
+        finally:
+            if self.journal:
+                self.journal.checkpoint()
+            self.finish_pass()
+
+        return True
+
+    def sync_paths(self, source_folder: str, replica_folder: str, paths: set[str]) -> bool:
+        """
+        Sync only the given source paths
+
+        Paths inside another given folder are covered by the plan of that folder, so they are skipped.
+
+        Parameters:
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
+            paths (set[str]): The absolute source paths that changed.
+
+        Returns:
+            bool: True if the synchronization is successful, False otherwise.
+        """
+        relatives = [os.path.relpath(path, source_folder) for path in paths]
+
+        if any(relative == "." or relative.startswith("..") for relative in relatives):
+            return self.sync_folders(source_folder, replica_folder)
+
+        roots = {topmost_missing(replica_folder, relative) for relative in relatives}
+        selected: list[str] = []
+
+        for relative in sorted(roots):
+            parent = os.path.dirname(relative)
+            while parent and parent not in roots:
+                parent = os.path.dirname(parent)
+            if not parent:
+                selected.append(relative)
+
+        self.metrics.start_pass()
+
+        try:
+            self.apply_plan(
+                (
+                    change
+                    for relative in selected
+                    for change in iter_path_plan(
+                        source_folder,
+                        replica_folder,
+                        relative,
+                        self.compare,
+                        self.scan,
+                        self.path_filter(),
+                    )
+                ),
+                source_folder,
+                replica_folder,
+            )
+        finally:
+            self.finish_pass()
+
+        return True
+
+    def dry_run(self, source_folder: str, replica_folder: str) -> dict:
+        """
+        Report the changes a sync would apply, without touching the replica
+
+        The count and bytes of each operation are reported with an estimated duration of the copies
+        and updates, bound by the slower of the source read and replica write throughputs, which are
+        measured on the largest files to transfer and with a temporary file in the replica folder,
+        and capped by the configured byte limit.
+
+        Parameters:
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
+
+        Returns:
+            dict: The machine readable report.
+        """
+        started = time.perf_counter()
+        operations, largest = summarize_plan(
+            self.plan(source_folder, replica_folder)
+        )
+        plan_seconds = time.perf_counter() - started
+
+        if self.index:
+            self.index.commit()
+
+        read_throughput = measure_read_throughput(largest) if largest else 0.0
+        write_throughput = measure_write_throughput(replica_folder) if largest else 0.0
+
+        if self.throttle.bytes.rate > 0:
+            read_throughput = min(read_throughput, self.throttle.bytes.rate)
+            write_throughput = min(write_throughput, self.throttle.bytes.rate)
+
+        return {
+            "source_folder": source_folder,
+            "replica_folder": replica_folder,
+            "operations": operations,
+            "total": {
+                "count": sum(operation["count"] for operation in operations.values()),
+                "bytes": sum(operation["bytes"] for operation in operations.values()),
+            },
+            "plan_seconds": plan_seconds,
+            "read_bytes_per_second": read_throughput,
+            "write_bytes_per_second": write_throughput,
+            "estimated_seconds": estimate_duration(
+                operations, read_throughput, write_throughput
+            ),
+        }
+
+    def finish_pass(self) -> None:
+        """
+        Close the metrics of a pass and rewrite the stats file if configured
+
+        Returns:
+            None
+        """
+        self.metrics.end_pass()
+
+        if self.config.stats_file:
+            try:
+                self.metrics.write_stats(self.config.stats_file)
+            except OSError as e:
+                self.log("finish_pass", str(e), "error")
+
+    def adapt_interval(self, changes: int, elapsed: float) -> float:
+        """
+        Compute the seconds to wait before the next pass
+
+        Without the adaptive mode, this is always the configured interval. In adaptive mode,
+        the interval is halved after a pass that found changes and doubled after an idle pass,
+        within the configured bounds, and it is never shorter than the last pass, so slow passes
+        leave the disks idle at least half of the time.
+
+        Parameters:
+            changes (int): The number of changes applied by the last pass.
+            elapsed (float): The duration in seconds of the last pass.
+
+        Returns:
+            float: The seconds to wait before the next pass.
+        """
+        if not self.config.adaptive_interval:
+            self.interval = self.config.interval_sync
+            return self.interval
+
+        if changes:
+            interval = max(self.interval / 2, self.config.min_interval)
+        else:
+            interval = min(self.interval * 2, self.config.max_interval)
+
+        self.interval = max(interval, elapsed)
+        return self.interval
+
+    def plan(
+        self,
+        source_folder: str,
+        replica_folder: str,
+        directories: MetadataIndex | None = None,
+        journal: Journal | None = None,
+    ) -> Iterator[Change]:
+        """
+        Walk both folders and yield the changes to apply, see 'iter_plan'
+
+        With a mount concurrency, the folders are walked by the asyncio walker, with many listings
+        and comparisons in flight, unless moves are detected, since a folder moved into place by
+        'apply_plan' must be visited after the move.
+
+        Parameters:
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
+            directories (MetadataIndex | None): The cache of directory pairs found in sync, None to list every directory.
+            journal (Journal | None): The progress of the pass, None to not record it.
 
-            for dest_root, dest_dirs, dest_files in os.walk(replica_folder):
-                for file in dest_files:
-                    replica_file = os.path.join(dest_root, file)
-                    source_file = replica_file.replace(replica_folder, source_folder)
+        Returns:
+            Iterator[Change]: The changes to apply to the replica, in order.
+        """
+        if self.walker and not (self.index and self.config.detect_moves):
+            return self.walker.iter_plan(
+                source_folder,
+                replica_folder,
+                self.compare,
+                self.scan,
+                directories,
+                self.path_filter(),
+                journal,
+            )
+
+        return iter_plan(
+            source_folder,
+            replica_folder,
+            self.compare,
+            scan=self.scan,
+            directories=directories,
+            filters=self.path_filter(),
+            hasher=self.hasher,
+            journal=journal,
+        )
+
+    def resume_plan(self, source_folder: str, replica_folder: str) -> Iterator[Change]:
+        """
+        Plan again the changes left behind by an interrupted pass, from the current state of their paths
+
+        Only the changes of the directories completed by the interrupted pass are planned here,
+        the other directories are walked again. A folder is only created, since the walk still
+        visits it as a subdirectory of its completed parent. Interrupted copies resume from their
+        partial files when they are applied.
+
+        Parameters:
+            source_folder (str): The source folder to sync from.
+            replica_folder (str): The replica folder to sync to.
 
-                    if not os.path.exists(source_file):
-                        self.delete_file(replica_file)
+        Yields:
+            Change: The changes to apply to the replica before the walk.
+        """
+        pending = self.journal.pending()
+        self.log(
+            "resume_plan",
+            f"Resuming the interrupted pass, {len(self.journal.completed)} directories "
+            f"completed and {len(pending)} changes pending",
+        )
+        operations: dict[str, set[str]] = {}
 
-                for dest_dir in dest_dirs:
-                    replica_dir = os.path.join(dest_root, dest_dir)
-                    source_dir = replica_dir.replace(replica_folder, source_folder)
+        for path, operation, offset in pending:
+            if path and os.path.dirname(path) in self.journal.completed:
+                operations.setdefault(path, set()).add(operation)
+                if offset:
+                    self.log("resume_plan", f"Resuming {path} from {offset} bytes")
 
-                    if not os.path.exists(source_dir):
-                        self.delete_folder(replica_dir)
+        for path, pending_operations in operations.items():
+            source_path = os.path.join(source_folder, path)
+            replica_path = os.path.join(replica_folder, path)
 
-            for dir in dirs:
-                self.sync_folders(
-                    os.path.join(source_folder, dir),
-                    os.path.join(replica_folder, dir),
+            if Operation.CREATE_FOLDER.value not in pending_operations:
+                yield from iter_path_plan(
+                    source_folder,
+                    replica_folder,
+                    path,
+                    self.compare,
+                    self.scan,
+                    self.path_filter(),
                 )
 
+            elif os.path.isdir(source_path) and not os.path.isdir(replica_path):
+                if os.path.lexists(replica_path):
+                    yield Change(Operation.DELETE_FILE, path, None, replica_path)
+                yield Change(Operation.CREATE_FOLDER, path, source_path, replica_path)
+
+    def path_filter(self) -> PathFilter | None:
+        """
+        Get the rules excluding paths from the plans
+
+        Returns:
+            PathFilter | None: The filters, None if no pattern or limit is configured.
+        """
+        return self.filters if self.filters.enabled() else None
+
+    def throttled(self) -> Callable[[int], None] | None:
+        """
+        Get the callback charging the byte limit, passed to the copy, update and hash loops
+
+        Returns:
+            Callable[[int], None] | None: The callback, None if the bytes are not limited.
+        """
+        return self.throttle.consume if self.throttle.bytes.rate > 0 else None
+
+    def scan(self, folder: str) -> list[os.DirEntry] | None:
+        """
+        List a directory, counting the scanned entries and the time spent walking
+
+        Parameters:
+            folder (str): The directory to list.
+
+        Returns:
+            list[os.DirEntry] | None: The entries of the directory sorted by name, None if it can't be listed.
+        """
+        started = time.perf_counter()
+        entries = scan_directory(
+            folder, lambda e: self.log("scan", str(e), "error")
+        )
+        self.metrics.add_phase("walk", time.perf_counter() - started)
+        self.metrics.add("directories_scanned")
+        self.metrics.add("entries_scanned", len(entries) if entries is not None else 0)
+        return entries
+
+    def compare(
+        self,
+        source_file: str,
+        replica_file: str,
+        stats: tuple[os.stat_result, os.stat_result] | None = None,
+    ) -> bool:
+        """
+        Check if two files with the same size have the same content, counting the time spent
+
+        A file removed or unreadable since the directory listing is logged and found different.
+
+        Parameters:
+            source_file (str): The path of the source file.
+            replica_file (str): The path of the replica file.
+            stats (tuple[os.stat_result, os.stat_result] | None): The metadata of both files
+                from their directory listing, None to stat them when needed.
+
+        Returns:
+            bool: True if the files have the same content, False otherwise.
+        """
+        started = time.perf_counter()
+
+        try:
+            if self.index:
+                return self.index.files_are_equal(source_file, replica_file, stats)
+
+            size = stats[0].st_size if stats else os.path.getsize(source_file)
+            self.metrics.add("bytes_hashed", 2 * size)
+            return files_are_equal(
+                source_file,
+                replica_file,
+                method=self.config.compare_method,
+                throttle=self.throttled(),
+                stats=stats,
+            )
+        except OSError as e:
+            self.log("compare", str(e), "error")
+            return False
+        finally:
+            self.metrics.add("files_compared")
+            self.metrics.add_phase("compare", time.perf_counter() - started)
+
+    def apply_plan(
+        self,
+        plan: Iterable[Change],
+        source_folder: str,
+        replica_folder: str,
+        journal: Journal | None = None,
+    ) -> None:
+        """
+        Apply a change plan to the replica as it is produced
+
+        Folder creations and deletions run in order on the calling thread, so a folder exists
+        before anything is copied into it and is only removed once. Copies and updates, which
+        never depend on each other, run concurrently on the worker pool. At most a few copies
+        per worker are queued at a time, so a lazy plan is never buffered in memory.
+
+        With move detection, deletions are held until the end of the pass, unless a later change
+        needs their path, so a file or folder moved in the source can still be moved in the replica
+        instead of being copied again, see 'find_move'.
+
+        With a journal, every change is recorded when it is taken from the plan and forgotten once
+        applied, so an interrupted pass knows which changes it left behind.
+
+        Parameters:
+            plan (Iterable[Change]): The ordered changes to apply.
+            source_folder (str): The source folder being synced.
+            replica_folder (str): The replica folder being synced.
+            journal (Journal | None): The progress of the pass, None to not record it.
+
+        Returns:
+            None
+        """
+        started = time.monotonic()
+        transfers = (Operation.COPY_FILE, Operation.UPDATE_FILE)
+        deletions = (Operation.DELETE_FILE, Operation.DELETE_FOLDER)
+        creations = (Operation.CREATE_FOLDER, Operation.COPY_FILE)
+        detect_moves = bool(self.index and self.config.detect_moves)
+        max_pending = self.config.workers * PENDING_PER_WORKER
+        pending = set()
+        deferred: dict[str, Change] = {}
+        changes = files = size = errors = 0
+
+        def run(change: Change) -> int:
+            written = self.execute(change, source_folder)
+            if journal and written >= 0:
+                journal.applied(change.path, change.operation.value)
+            return written
+
+        def count(written: int) -> None:
+            nonlocal files, size, errors
+            if written < 0:
+                errors += 1
+            else:
+                files += 1
+                size += written
+
+        try:
+            for change in plan:
+                changes += 1
+                apply_started = time.perf_counter()
+
+                if journal:
+                    journal.planned(change.path, change.operation.value)
+
+                if detect_moves and change.operation in deletions:
+                    deferred[change.replica] = change
+                    continue
+
+                if change.replica in deferred:
+                    run(deferred.pop(change.replica))
+
+                moved = (
+                    self.find_move(change, source_folder, replica_folder)
+                    if detect_moves and change.operation in creations
+                    else None
+                )
+
+                if moved and self.move_path(*moved, change.source, change.replica):
+                    for applied in (change, deferred.pop(moved[1], None)):
+                        if journal and applied:
+                            journal.applied(applied.path, applied.operation.value)
+                elif change.operation not in transfers:
+                    run(change)
+                elif not self.executor:
+                    count(run(change))
+                else:
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            count(future.result())
+                    pending.add(self.executor.submit(run, change))
+
+                self.metrics.add_phase("apply", time.perf_counter() - apply_started)
+
+            apply_started = time.perf_counter()
+            for future in pending:
+                count(future.result())
+            for change in deferred.values():
+                if os.path.lexists(change.replica):
+                    run(change)
+                elif journal:
+                    journal.applied(change.path, change.operation.value)
+            self.metrics.add_phase("apply", time.perf_counter() - apply_started)
+        finally:
+            wait(pending)
+            if self.index:
+                self.index.commit()
+            self.metrics.add("changes", changes)
+
+        self.log_summary(files, size, errors, time.monotonic() - started)
+
+    def find_move(
+        self, change: Change, source_folder: str, replica_folder: str
+    ) -> tuple[str, str] | None:
+        """
+        Find where the replica holds a file or folder that was moved to a new source path
+
+        The index is searched for a former source path with the inode of the new one. That path
+        must be gone from the source, and its replica must be a folder, for folders, or a file
+        recorded with the same digest as the source, for files whose size and mtime are unchanged.
+
+        Parameters:
+            change (Change): The creation of a folder or the copy of a file.
+            source_folder (str): The source folder being synced.
+            replica_folder (str): The replica folder being synced.
+
+        Returns:
+            tuple[str, str] | None: The former source and replica paths, None if the path wasn't moved.
+        """
+        try:
+            stat = os.stat(change.source)
+        except OSError:
+            return None
+
+        folder = change.operation == Operation.CREATE_FOLDER
+
+        for record in self.index.lookup_inode(stat.st_ino, source_folder):
+            former_source = record[0]
+
+            if (record[4] == FOLDER_DIGEST) != folder or os.path.lexists(former_source):
+                continue
+
+            former_replica = os.path.join(
+                replica_folder, os.path.relpath(former_source, source_folder)
+            )
+
+            if folder:
+                if os.path.isdir(former_replica):
+                    return former_source, former_replica
+                continue
+
+            replica_record = self.index.lookup(former_replica)
+
+            try:
+                replica_stat = os.stat(former_replica)
+            except OSError:
+                continue
+
+            if (
+                self.index.current(record[1:], stat)
+                and self.index.current(replica_record, replica_stat)
+                and replica_record[3] == record[4]
+            ):
+                return former_source, former_replica
+
+        return None
+
+    @logger
+    def move_path(
+        self, former_source: str, former_replica: str, source: str, replica: str
+    ) -> bool:
+        """
+        Move a file or folder within the replica, following a move in the source
+
+        Parameters:
+            former_source (str): The former source path.
+            former_replica (str): The former replica path.
+            source (str): The new source path.
+            replica (str): The new replica path.
+
+        Returns:
+            bool: True if the path is successfully moved, False otherwise.
+        """
+        try:
+            os.rename(former_replica, replica)
+        except Exception as e:
+            self.log("move_path", str(e), "error")
+            self.metrics.record_operation("move_path", False)
+            return False
+
+        self.index.move(former_source, source)
+        self.index.move(former_replica, replica)
+        self.metrics.record_operation("move_path", True)
         return True
 
+    def execute(self, change: Change, source_folder: str) -> int:
+        """
+        Apply a change and keep the metadata index in line with it
+
+        Parameters:
+            change (Change): The change to apply.
+            source_folder (str): The source folder being synced.
+
+        Returns:
+            int: The number of bytes written to the replica, -1 if the change failed.
+        """
+        transfer = change.operation in (Operation.COPY_FILE, Operation.UPDATE_FILE)
+        self.throttle.operation()
+        started = time.perf_counter()
+        applied = self.apply_change(change)
+        self.metrics.record_operation(
+            change.operation.value,
+            applied,
+            time.perf_counter() - started if transfer else None,
+        )
+
+        if not applied:
+            return -1
+
+        if self.index:
+            self.update_index(change, source_folder)
+
+        if not transfer:
+            return 0
+
+        try:
+            size = os.path.getsize(change.replica)
+        except OSError:
+            return 0
+
+        self.metrics.add("bytes_copied", size)
+        return size
+
+    def apply_change(self, change: Change) -> bool:
+        """
+        Apply a single change of the plan to the replica
+
+        Parameters:
+            change (Change): The change to apply.
+
+        Returns:
+            bool: True if the change is successfully applied, False otherwise.
+        """
+        if change.operation in (Operation.COPY_FILE, Operation.UPDATE_FILE):
+            return getattr(self, change.operation.value)(change.source, change.replica)
+
+        return getattr(self, change.operation.value)(change.replica)
+
+    def update_index(self, change: Change, source_folder: str) -> None:
+        """
+        Keep the metadata index in line with an applied change
+
+        Parameters:
+            change (Change): The change that was applied.
+            source_folder (str): The source folder being synced.
+
+        Returns:
+            None
+        """
+        if change.operation in (Operation.COPY_FILE, Operation.UPDATE_FILE):
+            self.index.record_copy(change.source, change.replica)
+
+        elif change.operation == Operation.CREATE_FOLDER:
+            try:
+                self.index.store(change.source, os.stat(change.source), FOLDER_DIGEST)
+            except OSError:
+                pass
+
+        elif change.operation in (Operation.DELETE_FILE, Operation.DELETE_FOLDER):
+            self.index.remove(change.replica)
+            self.index.remove(os.path.join(source_folder, change.path))
+
+    def log_summary(self, files: int, size: int, errors: int, elapsed: float) -> None:
+        """
+        Log the throughput of a pass, to help tuning the number of workers
+
+        Parameters:
+            files (int): The number of files copied or updated.
+            size (int): The number of bytes written.
+            errors (int): The number of copies or updates that failed.
+            elapsed (float): The duration of the pass in seconds.
+
+        Returns:
+            None
+        """
+        if not files and not errors:
+            return
+
+        elapsed = max(elapsed, 1e-9)
+        self.log(
+            "summary",
+            f"{files} files, {size / 1024 ** 2:.2f} MB, "
+            f"{errors} errors in {elapsed:.2f}s|{files / elapsed:.1f} files/s, "
+            f"{size / 1024 ** 2 / elapsed:.2f} MB/s with {self.config.workers} workers",
+        )
+
+    def log(self, name: str, message: str, level: str = "info", **fields) -> None:
+        """
+        Log a message in the same format as the logged method calls, without blocking
+
+        Parameters:
+            name (str): The name of the logged event.
+            message (str): The message to log.
+            level (str): The level of the message.
+            **fields: Extra fields for the JSON log format.
+
+        Returns:
+            None
+        """
+        self.log_writer.write(level, name, message, **fields)
+
     @logger
     def create_folder(self, folder: str) -> bool:
         """
@@ -146,7 +894,7 @@ class Sync:
             os.makedirs(folder)
             return True
         except Exception as e:
-            print(e)
+            self.log("create_folder", str(e), "error")
             return False
 
     @logger
@@ -164,7 +912,7 @@ class Sync:
             shutil.rmtree(folder)
             return True
         except Exception as e:
-            print(e)
+            self.log("delete_folder", str(e), "error")
             return False
 
     @logger
@@ -182,7 +930,7 @@ class Sync:
             os.remove(file)
             return True
         except Exception as e:
-            print(e)
+            self.log("delete_file", str(e), "error")
             return False
 
     @logger
@@ -190,6 +938,9 @@ class Sync:
         """
         Copy files from source to replica
 
+        The content is copied with the cheapest strategy the filesystems support,
+        from reflinks to kernel side copies, and the metadata is preserved like shutil.copy2.
+
         Parameters:
             source_file (str): The path of the source file to be copied.
             replica_file (str): The path where the file will be copied to.
@@ -198,17 +949,68 @@ class Sync:
             bool: True if the file is successfully copied, False otherwise.
         """
         try:
-            shutil.copy2(source_file, replica_file)
+            if not self.dedup_file(source_file, replica_file):
+                transfer_file(source_file, replica_file, self.throttled())
             return True
         except Exception as e:
-            print(e)
+            self.log("copy_file", str(e), "error")
+            return False
+
+    def dedup_file(self, source_file: str, replica_file: str) -> bool:
+        """
+        Share the content of an identical file already in the replica instead of copying it
+
+        The source is hashed through the index and the replica records with the same digest
+        are tried in turn, skipping those changed since they were indexed. Filesystems without
+        hard links or reflinks, or inodes at their link limit, fall back to a copy.
+
+        Parameters:
+            source_file (str): The path of the source file to be copied.
+            replica_file (str): The path where the file will be copied to.
+
+        Returns:
+            bool: True if the replica file was linked, False if it must be copied.
+        """
+        if not self.config.dedup or not self.index:
+            return False
+
+        if os.stat(source_file).st_size == 0:
             return False
 
+        digest = self.index.digest(source_file)
+
+        for path, *record in self.index.lookup_digest(
+            digest, self.config.replica_folder
+        ):
+            record = tuple(record)
+            if path == replica_file:
+                continue
+
+            try:
+                if not self.index.current(record, os.stat(path)):
+                    continue
+                link_file(source_file, path, replica_file, self.config.dedup)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                if e.errno in UNSUPPORTED_ERRORS or e.errno == errno.EMLINK:
+                    return False
+                raise
+
+            self.metrics.add("bytes_deduplicated", record[0])
+            return True
+
+        return False
+
     @logger
     def update_file(self, source_file: str, replica_file: str) -> bool:
         """
         Update files from source to replica
 
+        Replicas at least as large as the configured delta threshold are updated in place,
+        rewriting only the blocks that changed, and the saved bytes are logged.
+        Other replicas are replaced atomically by a complete copy, see 'transfer_file'.
+
         Parameters:
             source_file (str): The path of the source file to be updated.
             replica_file (str): The path where the file will be updated to.
@@ -217,11 +1019,23 @@ class Sync:
             bool: True if the file is successfully updated, False otherwise.
         """
         try:
-            os.remove(replica_file)
-            shutil.copy2(source_file, replica_file)
+            if delta_eligible(replica_file, self.config.delta_threshold):
+                written = delta_update(
+                    source_file, replica_file, throttle=self.throttled()
+                )
+                shutil.copystat(source_file, replica_file)
+                size = os.path.getsize(replica_file)
+                self.log(
+                    "delta",
+                    f"{replica_file}|{written} of {size} bytes written, "
+                    f"{size - written} bytes saved",
+                )
+                return True
+
+            transfer_file(source_file, replica_file, self.throttled())
             return True
         except Exception as e:
-            print(e)
+            self.log("update_file", str(e), "error")
             return False
 
     def start(self):
@@ -229,6 +1043,9 @@ class Sync:
         Start the synchronization process.
 
         This method continuously syncs the folders between the specified source and replica folders based on the configured interval. It calls the 'sync_folders' method to perform the synchronization operation.
+        In adaptive mode, the wait after each pass follows the changes found, see 'adapt_interval'.
+        In dry run mode, the planned changes are reported as JSON and nothing is synced.
+        With the report on stdout, the log records are echoed to stderr and written before the report.
 
         Parameters:
             None
@@ -236,7 +1053,68 @@ class Sync:
         Returns:
             None
         """
+        if self.config.dry_run:
+            report = self.dry_run(self.config.source_folder, self.config.replica_folder)
+            self.log_writer.flush()
+            write_report(self.config.dry_run, report)
+            return
+
+        if self.config.watch:
+            self.watch()
+
         while True:
             print("Syncing folders...")
+            started = time.monotonic()
             self.sync_folders(self.config.source_folder, self.config.replica_folder)
-            time.sleep(self.config.interval_sync)
+            time.sleep(
+                self.adapt_interval(
+                    self.metrics.last_pass.get("changes", 0),
+                    time.monotonic() - started,
+                )
+            )
+
+    def watch(self):
+        """
+        Sync the folders whenever the source changes.
+
+        This method subscribes to inotify events on the source folder and syncs only the changed paths
+        once a burst of events settles. A full sync still runs every configured interval, and whenever
+        events were lost, as a safety net. If inotify is not available, it returns so polling can be used.
+        A batch of changed paths that fails is logged, and its paths are synced by the next full sync.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        try:
+            watcher = Watcher(self.config.source_folder)
+        except OSError as e:
+            print(f"Watch mode unavailable, falling back to polling: {e}")
+            return
+
+        try:
+            print("Syncing folders...")
+            self.sync_folders(self.config.source_folder, self.config.replica_folder)
+            next_full_sync = time.monotonic() + self.config.interval_sync
+
+            while True:
+                paths = watcher.wait(next_full_sync - time.monotonic())
+
+                if paths is None or time.monotonic() >= next_full_sync:
+                    print("Syncing folders...")
+                    self.sync_folders(
+                        self.config.source_folder, self.config.replica_folder
+                    )
+                    next_full_sync = time.monotonic() + self.config.interval_sync
+
+                elif paths:
+                    try:
+                        self.sync_paths(
+                            self.config.source_folder, self.config.replica_folder, paths
+                        )
+                    except Exception as e:
+                        self.log("watch", str(e), "error")
+        finally:
+            watcher.close()
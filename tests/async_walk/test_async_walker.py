@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import pytest
+
+from async_walk import AsyncWalker
+from diff import Operation, build_plan, scan_directory
+
+
+def write(path, content=b"content"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def operations(plan):
+    return sorted((change.path, change.operation.value) for change in plan)
+
+
+def make_trees(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for index in range(30):
+        write(f"{source}/d{index % 5}/e{index % 3}/{index}.txt", b"new")
+    for index in range(0, 30, 2):
+        write(f"{replica}/d{index % 5}/e{index % 3}/{index}.txt", b"old")
+    write(f"{replica}/stale/a.txt")
+    return source, replica
+
+
+def test_plan_matches_the_sequential_walk(tmp_path):
+    source, replica = make_trees(tmp_path)
+    walker = AsyncWalker(4)
+
+    plan = list(walker.iter_plan(source, replica))
+
+    assert operations(plan) == operations(build_plan(source, replica))
+    walker.close()
+
+
+def test_folders_are_created_before_their_content(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "missing")
+    write(f"{source}/a/b/c/d.txt")
+    walker = AsyncWalker(4)
+
+    paths = [change.path for change in walker.iter_plan(source, replica)]
+
+    assert paths == ["", "a", "a/b", "a/b/c", "a/b/c/d.txt"]
+    walker.close()
+
+
+def test_listings_overlap(tmp_path):
+    source, replica = make_trees(tmp_path)
+    running = peak = 0
+    lock = threading.Lock()
+
+    def scan(folder):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return scan_directory(folder)
+
+    walker = AsyncWalker(4)
+    list(walker.iter_plan(source, replica, scan=scan))
+
+    assert peak > 2
+    walker.close()
+
+
+def test_errors_and_early_stops_end_the_walk(tmp_path):
+    source, replica = make_trees(tmp_path)
+    walker = AsyncWalker(2)
+
+    def compare(source_file, replica_file, stats=None):
+        raise OSError("unreachable")
+
+    with pytest.raises(OSError):
+        list(walker.iter_plan(source, replica, compare=compare))
+
+    plan = walker.iter_plan(source, replica)
+    assert next(plan).operation in Operation
+    plan.close()
+    assert not [thread for thread in threading.enumerate() if thread.name == "AsyncWalker"]
+    walker.close()
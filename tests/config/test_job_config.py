@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from config import ConfigArgs, ConfigJob
+
+VALID_PATH = os.getcwd()
+INVALID_PATH = "/invalid/path"
+
+
+def test_job_inherits_missing_options():
+    defaults = ConfigArgs(VALID_PATH, VALID_PATH, 60, "sync.log", workers=8)
+
+    config_job = ConfigJob(
+        {"source_folder": VALID_PATH, "replica_folder": VALID_PATH, "interval_sync": 5},
+        defaults,
+    )
+
+    assert config_job.interval_sync == 5
+    assert config_job.workers == 8
+    assert config_job.log_file == "sync.log"
+    assert config_job.name == f"{VALID_PATH} -> {VALID_PATH}"
+
+
+def test_invalid_job_raises_exception():
+    defaults = ConfigArgs(VALID_PATH, VALID_PATH, 60, "sync.log")
+
+    with pytest.raises(Exception):
+        ConfigJob({"name": "broken", "source_folder": INVALID_PATH}, defaults)
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        "max_bytes_per_second",
+        "max_ops_per_second",
+        "burst_seconds",
+        "nice",
+        "min_size",
+        "max_size",
+        "min_age",
+        "max_age",
+        "hash_workers",
+        "mount_concurrency",
+    ],
+)
+def test_job_with_a_non_numeric_option_is_invalid(key):
+    defaults = ConfigArgs(VALID_PATH, VALID_PATH, 60, "sync.log")
+
+    with pytest.raises(Exception, match="Invalid sync job"):
+        ConfigJob(
+            {"source_folder": VALID_PATH, "replica_folder": VALID_PATH, key: "1M"},
+            defaults,
+        )
@@ -0,0 +1,45 @@
+import errno
+import os
+
+import pytest
+
+import copier
+from copier import link_file, partial_path
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_hardlink_shares_the_existing_inode(tmp_path):
+    write(tmp_path / "source", b"data")
+    write(tmp_path / "existing", b"data")
+
+    link_file(
+        str(tmp_path / "source"),
+        str(tmp_path / "existing"),
+        str(tmp_path / "replica"),
+        "hardlink",
+    )
+
+    assert os.stat(tmp_path / "replica").st_ino == os.stat(tmp_path / "existing").st_ino
+
+
+def test_failed_reflink_leaves_no_partial_file(tmp_path, mocker):
+    write(tmp_path / "source", b"data")
+    write(tmp_path / "existing", b"data")
+    mocker.patch.object(
+        copier, "reflink", side_effect=OSError(errno.EOPNOTSUPP, "unsupported")
+    )
+
+    with pytest.raises(OSError):
+        link_file(
+            str(tmp_path / "source"),
+            str(tmp_path / "existing"),
+            str(tmp_path / "replica"),
+            "reflink",
+        )
+
+    assert not os.path.exists(partial_path(str(tmp_path / "replica")))
+    assert not os.path.exists(tmp_path / "replica")
@@ -0,0 +1,127 @@
+import errno
+import os
+
+import pytest
+
+import copier
+from copier import STRATEGIES, VERIFY_BLOCK_SIZE, partial_path, transfer_file
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_content_and_metadata_are_copied(tmp_path):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, os.urandom(300 * 1024))
+    os.chmod(source, 0o640)
+    os.utime(source, ns=(1_000_000_000, 2_000_000_000))
+
+    assert transfer_file(source, replica) in STRATEGIES
+    assert read(replica) == read(source)
+    assert os.stat(replica).st_mtime_ns == 2_000_000_000
+    assert os.stat(replica).st_mode & 0o777 == 0o640
+
+
+def test_existing_replica_is_overwritten(tmp_path):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, b"short")
+    write(replica, b"a much longer previous content")
+
+    transfer_file(source, replica)
+
+    assert read(replica) == b"short"
+
+
+def test_unsupported_strategies_fall_back_and_are_remembered(tmp_path, mocker):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, b"content")
+    unsupported = OSError(errno.EXDEV, "unsupported")
+    mocker.patch.dict(
+        copier.BACKENDS,
+        {
+            "reflink": mocker.Mock(side_effect=unsupported),
+            "copy_file_range": mocker.Mock(side_effect=unsupported),
+        },
+    )
+    mocker.patch.dict(copier._strategies, clear=True)
+
+    assert transfer_file(source, replica) == "sendfile"
+    assert transfer_file(source, replica) == "sendfile"
+    assert copier.BACKENDS["reflink"].call_count == 1
+    assert read(replica) == b"content"
+
+
+def test_short_kernel_copies_fall_back_and_are_not_remembered(tmp_path, mocker):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, b"content")
+    write(replica, b"previous")
+    mocker.patch.dict(
+        copier.BACKENDS,
+        {"reflink": mocker.Mock(side_effect=OSError(errno.EXDEV, "unsupported"))},
+    )
+    mocker.patch("copier.os.copy_file_range", return_value=0)
+    mocker.patch("copier.os.sendfile", return_value=0)
+    mocker.patch.dict(copier._strategies, clear=True)
+
+    assert transfer_file(source, replica) == "userspace"
+    assert read(replica) == b"content"
+    assert list(copier._strategies.values()) == ["userspace"]
+
+
+def test_interrupted_copy_keeps_the_replica(tmp_path, mocker):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, b"new content")
+    write(replica, b"old content")
+    mocker.patch("copier.copy_content", side_effect=OSError(errno.EIO, "failed"))
+
+    with pytest.raises(OSError):
+        transfer_file(source, replica)
+
+    assert read(replica) == b"old content"
+    assert os.path.exists(partial_path(replica))
+
+
+def test_partial_copy_of_a_read_only_source_stays_writable(tmp_path, mocker):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(source, b"content")
+    os.chmod(source, 0o444)
+    mocker.patch("copier.copy_content", side_effect=OSError(errno.EIO, "failed"))
+
+    with pytest.raises(OSError):
+        transfer_file(source, replica)
+
+    assert os.stat(partial_path(replica)).st_mode & 0o777 == 0o600
+    mocker.stopall()
+    transfer_file(source, replica)
+
+    assert read(replica) == b"content"
+    assert os.stat(replica).st_mode & 0o777 == 0o444
+    assert not os.path.exists(partial_path(replica))
+
+
+def test_copy_resumes_after_verified_blocks(tmp_path, mocker):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    content = os.urandom(3 * VERIFY_BLOCK_SIZE + 100)
+    write(source, content)
+    write(partial_path(replica), content[: 2 * VERIFY_BLOCK_SIZE] + b"garbage")
+    copy_content = mocker.spy(copier, "copy_content")
+
+    transfer_file(source, replica)
+
+    assert copy_content.call_args.args[3] == 2 * VERIFY_BLOCK_SIZE
+    assert read(replica) == content
+    assert not os.path.exists(partial_path(replica))
@@ -0,0 +1,60 @@
+import os
+
+from delta import delta_eligible, delta_update
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_only_changed_blocks_are_written(tmp_path):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    content = bytearray(os.urandom(10 * 1024))
+    write(replica, bytes(content))
+    content[5000] ^= 0xFF
+    write(source, bytes(content))
+
+    written = delta_update(source, replica, block_size=1024)
+
+    assert written == 1024
+    assert read(replica) == read(source)
+
+
+def test_replica_is_truncated_to_a_shorter_source(tmp_path):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(replica, b"a" * 3000)
+    write(source, b"a" * 1500)
+
+    assert delta_update(source, replica, block_size=1024) == 0
+    assert read(replica) == b"a" * 1500
+
+
+def test_replica_is_extended_to_a_longer_source(tmp_path):
+    source = str(tmp_path / "source.bin")
+    replica = str(tmp_path / "replica.bin")
+    write(replica, b"a" * 1500)
+    write(source, b"a" * 1500 + b"b" * 1000)
+
+    assert delta_update(source, replica, block_size=1024) == 1476
+    assert read(replica) == read(source)
+
+
+def test_delta_eligible_respects_threshold_and_hard_links(tmp_path):
+    replica = str(tmp_path / "replica.bin")
+    write(replica, b"a" * 100)
+
+    assert delta_eligible(replica, 0) is False
+    assert delta_eligible(replica, 101) is False
+    assert delta_eligible(replica, 100) is True
+
+    os.link(replica, str(tmp_path / "link.bin"))
+
+    assert delta_eligible(replica, 100) is False
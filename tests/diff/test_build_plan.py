@@ -0,0 +1,241 @@
+import os
+
+from diff import Change, Operation, build_plan, iter_plan, scan_directory
+from filters import PathFilter
+from hashing import HashService
+from index import MetadataIndex
+from utils import files_are_equal
+
+
+def write(path, content=b"content"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def operations(plan):
+    return [(change.operation, change.path) for change in plan]
+
+
+def test_missing_replica_is_created_before_its_content(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/a.txt")
+    write(f"{source}/sub/b.txt")
+
+    plan = build_plan(source, replica)
+
+    assert plan[0] == Change(Operation.CREATE_FOLDER, "", source, replica)
+    assert operations(plan).index(
+        (Operation.CREATE_FOLDER, "sub")
+    ) < operations(plan).index((Operation.COPY_FILE, "sub/b.txt"))
+    assert (Operation.COPY_FILE, "a.txt") in operations(plan)
+
+
+def test_identical_trees_produce_empty_plan(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for root in (source, replica):
+        write(f"{root}/a.txt")
+        write(f"{root}/sub/deep/b.txt")
+
+    assert build_plan(source, replica) == []
+
+
+def test_changed_and_removed_entries(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/same_size.txt", b"aaaa")
+    write(f"{replica}/same_size.txt", b"bbbb")
+    write(f"{source}/other_size.txt", b"a")
+    write(f"{replica}/other_size.txt", b"bb")
+    write(f"{replica}/gone.txt")
+    write(f"{replica}/gone_dir/file.txt")
+
+    assert sorted(operations(build_plan(source, replica)), key=str) == sorted(
+        [
+            (Operation.UPDATE_FILE, "same_size.txt"),
+            (Operation.UPDATE_FILE, "other_size.txt"),
+            (Operation.DELETE_FILE, "gone.txt"),
+            (Operation.DELETE_FOLDER, "gone_dir"),
+        ],
+        key=str,
+    )
+
+
+def test_type_conflicts_delete_before_create(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/was_file/inner.txt")
+    write(f"{replica}/was_file")
+    write(f"{source}/was_dir")
+    write(f"{replica}/was_dir/inner.txt")
+
+    plan = operations(build_plan(source, replica))
+
+    assert len(plan) == 5
+    assert plan.index((Operation.DELETE_FILE, "was_file")) < plan.index(
+        (Operation.CREATE_FOLDER, "was_file")
+    )
+    assert plan.index((Operation.CREATE_FOLDER, "was_file")) < plan.index(
+        (Operation.COPY_FILE, "was_file/inner.txt")
+    )
+    assert plan.index((Operation.DELETE_FOLDER, "was_dir")) < plan.index(
+        (Operation.COPY_FILE, "was_dir")
+    )
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for root in (source, replica):
+        write(f"{root}/a.txt")
+        write(f"{root}/sub/deep/b.txt")
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    listed = []
+
+    def scan(folder):
+        listed.append(folder)
+        return sorted(os.scandir(folder), key=lambda entry: entry.name)
+
+    assert build_plan(source, replica, scan=scan, directories=index) == []
+    listed.clear()
+    write(f"{source}/sub/deep/c.txt")
+
+    plan = build_plan(source, replica, scan=scan, directories=index)
+
+    assert operations(plan) == [(Operation.COPY_FILE, "sub/deep/c.txt")]
+    assert sorted(listed) == sorted([f"{source}/sub/deep", f"{replica}/sub/deep"])
+
+
+def test_plan_is_produced_while_walking(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for index in range(3):
+        write(f"{source}/dir{index}/a.txt")
+    write(f"{replica}/stale.txt")
+    listed = []
+
+    def scan(folder):
+        listed.append(folder)
+        return sorted(os.scandir(folder), key=lambda entry: entry.name)
+
+    plan = iter_plan(source, replica, scan=scan)
+
+    assert next(plan).operation == Operation.CREATE_FOLDER
+    assert listed == [source, replica]
+    assert len(list(plan)) == 6
+
+
+def test_unlistable_directory_is_skipped_without_deletions(tmp_path, mocker):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for name in ("f1", "f2", "f3"):
+        write(f"{replica}/d/{name}")
+    write(f"{source}/d/f1")
+    write(f"{source}/new.txt")
+    scandir = os.scandir
+    errors = []
+
+    def failing_scandir(folder):
+        if folder == f"{source}/d":
+            raise OSError(5, "Input/output error", folder)
+        return scandir(folder)
+
+    mocker.patch("diff.os.scandir", side_effect=failing_scandir)
+
+    plan = build_plan(
+        source, replica, scan=lambda folder: scan_directory(folder, errors.append)
+    )
+
+    assert operations(plan) == [(Operation.COPY_FILE, "new.txt")]
+    assert [error.errno for error in errors] == [5]
+
+
+def test_partial_files_are_kept_only_for_existing_sources(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/a.txt", b"new")
+    write(f"{replica}/a.txt", b"old")
+    write(f"{replica}/.a.txt.syncpart", b"ne")
+    write(f"{replica}/.gone.txt.syncpart", b"x")
+
+    assert sorted(operations(build_plan(source, replica)), key=str) == [
+        (Operation.DELETE_FILE, ".gone.txt.syncpart"),
+        (Operation.UPDATE_FILE, "a.txt"),
+    ]
+
+
+def test_source_files_named_like_partial_files_are_synced(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/.a.txt.syncpart", b"data")
+    write(f"{source}/.b.txt.syncpart", b"new")
+    write(f"{replica}/.a.txt.syncpart", b"data")
+    write(f"{replica}/.b.txt.syncpart", b"old")
+
+    assert operations(build_plan(source, replica)) == [
+        (Operation.UPDATE_FILE, ".b.txt.syncpart")
+    ]
+
+
+def test_excluded_paths_are_pruned_and_kept_in_the_replica(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/main.py")
+    write(f"{source}/node_modules/pkg/index.js")
+    write(f"{source}/big.bin", b"x" * 100)
+    write(f"{replica}/debug.tmp")
+    listed = []
+
+    def scan(folder):
+        listed.append(os.path.relpath(folder, tmp_path))
+        return scan_directory(folder)
+
+    plan = build_plan(
+        source,
+        replica,
+        scan=scan,
+        filters=PathFilter(["node_modules/", "*.tmp"], max_size=50),
+    )
+
+    assert operations(plan) == [(Operation.COPY_FILE, "main.py")]
+    assert sorted(listed) == ["replica", "source"]
+
+
+def test_hash_service_finds_the_same_updates_and_caches_directories(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for index in range(10):
+        write(f"{source}/sub{index % 3}/{index}.txt", b"same")
+        write(f"{replica}/sub{index % 3}/{index}.txt", b"same" if index % 3 else b"diff")
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    hasher = HashService(files_are_equal, workers=4)
+
+    plan = build_plan(source, replica, directories=index, hasher=hasher)
+
+    assert sorted(operations(plan)) == sorted(operations(build_plan(source, replica)))
+    assert len(plan) == 4
+    assert index.cached_directory(
+        f"{source}/sub1",
+        f"{replica}/sub1",
+        index.directory_state(f"{source}/sub1", f"{replica}/sub1"),
+    ) == []
+    assert index.cached_directory(
+        f"{source}/sub0",
+        f"{replica}/sub0",
+        index.directory_state(f"{source}/sub0", f"{replica}/sub0"),
+    ) is None
+    hasher.close()
+
+
+def test_comparisons_reuse_the_listing_metadata(tmp_path, mocker):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    for root in (source, replica):
+        write(f"{root}/a.txt")
+        write(f"{root}/sub/b.txt")
+    stat = mocker.spy(os, "stat")
+
+    assert build_plan(source, replica) == []
+    assert [call.args[0] for call in stat.call_args_list] == [replica]
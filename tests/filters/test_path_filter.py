@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+from filters import PathFilter
+
+PATTERNS = [
+    "# build outputs",
+    ".git/",
+    "node_modules/",
+    "*.tmp",
+    "!keep.tmp",
+    "/build",
+    "docs/**/*.md",
+    "cache-[0-9]",
+]
+
+
+@pytest.mark.parametrize(
+    "relative, is_dir, excluded",
+    [
+        (".git", True, True),
+        ("a/b/.git", True, True),
+        (".git", False, False),
+        ("x.tmp", False, True),
+        ("a/b/x.tmp", False, True),
+        ("a/b/keep.tmp", False, False),
+        ("build", True, True),
+        ("a/build", True, False),
+        ("docs/x.md", False, True),
+        ("docs/a/b/x.md", False, True),
+        ("src/docs/x.md", False, False),
+        ("cache-1", False, True),
+        ("cache-x", False, False),
+        ("main.py", False, False),
+    ],
+)
+def test_gitignore_patterns(relative, is_dir, excluded):
+    assert PathFilter(PATTERNS).excluded(relative, is_dir) is excluded
+
+
+def test_same_kind_patterns_share_one_expression():
+    filters = PathFilter(["*.tmp", "*.log", "*.bak", "!keep.log", "dist/", "out/"])
+
+    assert len(filters.groups) == 3
+    assert filters.enabled()
+    assert not PathFilter().enabled()
+
+
+def test_size_and_age_limits(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 100)
+    stat = os.stat(path)
+
+    assert PathFilter(max_size=99).excluded_stat(stat)
+    assert PathFilter(min_size=101).excluded_stat(stat)
+    assert not PathFilter(min_size=100, max_size=100).excluded_stat(stat)
+    assert PathFilter(min_age=60).excluded_stat(stat)
+
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert PathFilter(max_age=60).excluded_stat(os.stat(path))
+
+
+def test_excluded_path_checks_parent_folders(tmp_path):
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    filters = PathFilter(["node_modules/"])
+
+    assert filters.excluded_path(
+        "node_modules/pkg/index.js", str(tmp_path / "node_modules/pkg/index.js")
+    )
+    assert filters.excluded_path("node_modules", str(tmp_path / "gone"))
+    assert not filters.excluded_path("src/index.js", str(tmp_path / "src/index.js"))
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from hashing import HashService
+
+
+def test_results_are_streamed_back_with_their_items():
+    service = HashService(lambda source, replica, stats: source == replica, workers=4)
+
+    for index in range(20):
+        service.submit(index, str(index), str(index if index % 2 else -index))
+    results = dict(service.results(wait_all=True))
+
+    assert results == {index: index % 2 == 1 or index == 0 for index in range(20)}
+    assert not service.pending
+    service.close()
+
+
+def test_comparisons_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def compare(source, replica, stats=None):
+        barrier.wait()
+        return True
+
+    service = HashService(compare, workers=3)
+    for index in range(3):
+        service.submit(index, "a", "b")
+
+    assert sorted(item for item, equal in service.results(wait_all=True)) == [0, 1, 2]
+    service.close()
+
+
+def test_errors_are_raised_to_the_consumer():
+    def compare(source, replica, stats=None):
+        raise OSError("gone")
+
+    service = HashService(compare, workers=2)
+    service.submit("a", "a", "b")
+
+    with pytest.raises(OSError):
+        list(service.results(wait_all=True))
+    service.close()
@@ -0,0 +1,97 @@
+import os
+
+from index import MetadataIndex
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_digest_is_reused_while_metadata_is_unchanged(tmp_path, mocker):
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    file = str(tmp_path / "a.txt")
+    write(file, b"content")
+
+    first = index.digest(file)
+    digest = mocker.patch("index.file_digest", return_value="other")
+
+    assert index.digest(file) == first
+    digest.assert_not_called()
+
+
+def test_digest_is_recomputed_when_metadata_changes(tmp_path):
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    file = str(tmp_path / "a.txt")
+    write(file, b"content")
+    first = index.digest(file)
+
+    write(file, b"changed content")
+
+    assert index.digest(file) != first
+
+
+def test_index_persists_between_instances(tmp_path):
+    index_file = str(tmp_path / "index.db")
+    file = str(tmp_path / "a.txt")
+    write(file, b"content")
+
+    index = MetadataIndex(index_file)
+    digest = index.digest(file)
+    index.close()
+
+    assert MetadataIndex(index_file).lookup(file)[3] == digest
+
+
+def test_remove_forgets_folder_content_only(tmp_path):
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    os.makedirs(tmp_path / "dir")
+    inside = str(tmp_path / "dir" / "a.txt")
+    sibling = str(tmp_path / "dir_other.txt")
+    write(inside, b"a")
+    write(sibling, b"b")
+    index.digest(inside)
+    index.digest(sibling)
+
+    index.remove(str(tmp_path / "dir"))
+
+    assert index.lookup(inside) is None
+    assert index.lookup(sibling) is not None
+
+
+def test_digests_of_another_algorithm_are_not_reused(tmp_path):
+    index_file = str(tmp_path / "index.db")
+    file = str(tmp_path / "a.txt")
+    write(file, b"content")
+
+    index = MetadataIndex(index_file, "md5")
+    md5 = index.digest(file)
+    index.close()
+    sha256 = MetadataIndex(index_file, "sha256").digest(file)
+
+    assert md5.startswith("md5:")
+    assert sha256.startswith("sha256:")
+
+
+def test_bytes_method_skips_files_found_equal_before(tmp_path, mocker):
+    index = MetadataIndex(str(tmp_path / "index.db"), "bytes")
+    source = str(tmp_path / "source.txt")
+    replica = str(tmp_path / "replica.txt")
+    write(source, b"content")
+    write(replica, b"content")
+
+    assert index.files_are_equal(source, replica) is True
+    compare = mocker.patch("index.bytes_are_equal")
+
+    assert index.files_are_equal(source, replica) is True
+    compare.assert_not_called()
+
+
+def test_files_that_cant_be_compared_are_reported(tmp_path):
+    errors = []
+    index = MetadataIndex(str(tmp_path / "index.db"), on_error=errors.append)
+    file = str(tmp_path / "a.txt")
+    write(file, b"content")
+
+    assert not index.files_are_equal(file, str(tmp_path / "missing.txt"))
+    assert [type(error) for error in errors] == [FileNotFoundError]
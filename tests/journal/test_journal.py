@@ -0,0 +1,58 @@
+import os
+
+from copier import partial_path
+from journal import Journal
+
+
+def test_new_pass_starts_from_scratch(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+
+    assert journal.begin("/source", "/replica") is False
+    assert journal.pending() == []
+    assert journal.completed_directory("") is None
+
+
+def test_interrupted_pass_is_resumed(tmp_path):
+    replica = tmp_path / "replica"
+    replica.mkdir()
+    journal = Journal(str(tmp_path / "journal.db"))
+    journal.begin("/source", str(replica))
+    journal.complete_directory("", ["a", "b"])
+    journal.planned("a.txt", "copy_file")
+    journal.planned("big.bin", "copy_file")
+    journal.applied("a.txt", "copy_file")
+    with open(partial_path(str(replica / "big.bin")), "wb") as f:
+        f.write(b"x" * 10)
+    journal.checkpoint()
+    journal.close()
+
+    resumed = Journal(str(tmp_path / "journal.db"))
+
+    assert resumed.begin("/source", str(replica)) is True
+    assert resumed.completed_directory("") == ["a", "b"]
+    assert resumed.completed_directory("a") is None
+    assert resumed.pending() == [("big.bin", "copy_file", 10)]
+
+
+def test_passes_of_other_folders_are_kept_apart(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    journal.begin("/one", "/replica-one")
+    journal.planned("a.txt", "delete_file")
+    journal.checkpoint()
+
+    assert journal.begin("/two", "/replica-two") is False
+    assert journal.pending() == []
+    assert journal.begin("/one", "/replica-one") is True
+    assert journal.pending() == [("a.txt", "delete_file", 0)]
+
+
+def test_finished_pass_is_forgotten(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    journal.begin("/source", "/replica")
+    journal.complete_directory("", [])
+    journal.planned("a.txt", "copy_file")
+    journal.finish()
+
+    assert journal.begin("/source", "/replica") is False
+    assert journal.pending() == []
+    assert os.path.exists(tmp_path / "journal.db")
@@ -0,0 +1,70 @@
+import json
+import os
+
+from logwriter import LogWriter
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_records_are_written_in_text_format(tmp_path):
+    log_file = str(tmp_path / "sync.log")
+    writer = LogWriter(log_file, echo=False)
+
+    writer.write("info", "copy_file", "('a', 'b')|{}")
+    writer.close()
+
+    [line] = read_lines(log_file)
+    assert line.endswith("|copy_file|('a', 'b')|{}")
+
+
+def test_records_below_level_are_dropped(tmp_path):
+    log_file = str(tmp_path / "sync.log")
+    writer = LogWriter(log_file, level="warning", echo=False)
+
+    writer.write("info", "copy_file", "ignored")
+    writer.write("error", "copy_file", "kept")
+    writer.close()
+
+    assert [line.split("|")[-1] for line in read_lines(log_file)] == ["kept"]
+
+
+def test_json_lines_include_extra_fields(tmp_path):
+    log_file = str(tmp_path / "sync.log")
+    writer = LogWriter(log_file, log_format="json", echo=False)
+
+    writer.write("info", "summary", "done", files=3)
+    writer.close()
+
+    record = json.loads(read_lines(log_file)[0])
+    assert record["event"] == "summary"
+    assert record["level"] == "info"
+    assert record["files"] == 3
+
+
+def test_flush_waits_for_queued_records(tmp_path):
+    log_file = str(tmp_path / "sync.log")
+    writer = LogWriter(log_file, echo=False, flush_interval=10)
+
+    for index in range(100):
+        writer.write("info", "copy_file", str(index))
+    writer.flush()
+
+    assert len(read_lines(log_file)) == 100
+    writer.close()
+
+
+def test_log_file_is_rotated_by_size(tmp_path):
+    log_file = str(tmp_path / "sync.log")
+    writer = LogWriter(log_file, max_bytes=100, backups=2, echo=False)
+
+    for index in range(3):
+        writer.write("info", "copy_file", "x" * 100)
+        writer.flush()
+    writer.close()
+
+    assert os.path.exists(f"{log_file}.1")
+    assert os.path.exists(f"{log_file}.2")
+    assert not os.path.exists(f"{log_file}.3")
@@ -0,0 +1,70 @@
+import urllib.request
+
+from metrics import Histogram, Metrics, MetricsServer
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 2.0):
+        histogram.observe(value)
+
+    lines = histogram.render("latency")
+
+    assert 'latency_bucket{le="0.1"} 1' in lines
+    assert 'latency_bucket{le="1.0"} 3' in lines
+    assert 'latency_bucket{le="+Inf"} 4' in lines
+    assert "latency_count 4" in lines
+
+
+def test_render_includes_counters_operations_and_phases():
+    metrics = Metrics()
+    metrics.add("bytes_copied", 10)
+    metrics.add_phase("walk", 0.5)
+    metrics.record_operation("copy_file", True, 0.01)
+    metrics.record_operation("copy_file", False, 0.02)
+
+    text = metrics.render()
+
+    assert "sync_bytes_copied_total 10" in text
+    assert 'sync_operations_total{operation="copy_file"} 2' in text
+    assert 'sync_errors_total{operation="copy_file"} 1' in text
+    assert 'sync_phase_seconds_total{phase="walk"} 0.5' in text
+    assert "sync_copy_latency_seconds_count 2" in text
+
+
+def test_last_pass_only_counts_its_own_figures():
+    metrics = Metrics()
+    metrics.add("files_compared", 5)
+    metrics.start_pass()
+    metrics.add("files_compared", 2)
+    metrics.end_pass()
+
+    assert metrics.last_pass["files_compared"] == 2
+    assert metrics.counters["passes"] == 1
+
+
+def test_write_stats_replaces_the_file(tmp_path):
+    stats_file = tmp_path / "stats.prom"
+    stats_file.write_text("stale")
+    metrics = Metrics()
+    metrics.add("bytes_copied", 3)
+
+    metrics.write_stats(str(stats_file))
+
+    assert "sync_bytes_copied_total 3" in stats_file.read_text()
+    assert not (tmp_path / "stats.prom.tmp").exists()
+
+
+def test_server_exposes_the_metrics():
+    metrics = Metrics()
+    metrics.add("bytes_copied", 7)
+    server = MetricsServer(metrics, 0)
+
+    try:
+        port = server.server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            body = response.read().decode()
+    finally:
+        server.close()
+
+    assert "sync_bytes_copied_total 7" in body
@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+from diff import build_plan
+from planner import (
+    estimate_duration,
+    measure_read_throughput,
+    measure_write_throughput,
+    summarize_plan,
+    write_report,
+)
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_plan_is_counted_by_operation(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/new.txt", b"12345")
+    write(f"{source}/changed.txt", b"abc")
+    write(f"{replica}/changed.txt", b"ab")
+    write(f"{replica}/stale/a.txt", b"1234")
+
+    operations, largest = summarize_plan(build_plan(source, replica))
+
+    assert operations["copy_file"] == {"count": 1, "bytes": 5}
+    assert operations["update_file"] == {"count": 1, "bytes": 3}
+    assert operations["delete_folder"] == {"count": 1, "bytes": 4}
+    assert largest == [f"{source}/new.txt", f"{source}/changed.txt"]
+
+
+def test_estimate_is_bound_by_the_slower_volume():
+    operations = {
+        "copy_file": {"count": 1, "bytes": 100},
+        "update_file": {"count": 1, "bytes": 100},
+    }
+
+    assert estimate_duration(operations, 100.0, 50.0) == 4.0
+    assert estimate_duration(operations, 0.0, 50.0) is None
+
+
+def test_probes_measure_and_clean_up(tmp_path):
+    file = str(tmp_path / "data.bin")
+    write(file, os.urandom(1024 * 1024))
+
+    assert measure_read_throughput([file]) > 0
+    assert measure_write_throughput(str(tmp_path), probe_size=1024 * 1024) > 0
+    assert os.listdir(tmp_path) == ["data.bin"]
+
+
+def test_report_is_written_as_json(tmp_path):
+    report_file = str(tmp_path / "plan.json")
+
+    write_report(report_file, {"total": {"count": 1}})
+
+    with open(report_file) as f:
+        assert json.load(f) == {"total": {"count": 1}}
+
+
+def test_dry_run_report_on_stdout_is_valid_json(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/new.txt", b"12345")
+    os.makedirs(replica)
+    main = os.path.join(os.path.dirname(__file__), "..", "..", "main.py")
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            main,
+            "--source",
+            source,
+            "--replica",
+            replica,
+            "--log",
+            str(tmp_path / "sync.log"),
+            "--index",
+            str(tmp_path / "sync_index.db"),
+            "--journal",
+            str(tmp_path / "sync_journal.db"),
+            "--dry-run",
+        ],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert json.loads(result.stdout)["total"]["count"] == 1
+    assert "Using configuration arguments" in result.stderr
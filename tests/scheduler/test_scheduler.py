@@ -0,0 +1,58 @@
+import os
+
+from config import ConfigArgs, ConfigJob
+from scheduler import Scheduler
+
+
+def make_job(tmp_path, name, interval):
+    source = tmp_path / name / "source"
+    replica = tmp_path / name / "replica"
+    source.mkdir(parents=True)
+    replica.mkdir()
+    (source / "a.txt").write_bytes(name.encode())
+    defaults = ConfigArgs(
+        str(source),
+        str(replica),
+        60,
+        str(tmp_path / "sync.log"),
+        str(tmp_path / "sync_index.db"),
+        journal_file=str(tmp_path / "sync_journal.db"),
+    )
+    return ConfigJob({"name": name, "interval_sync": interval}, defaults)
+
+
+def test_jobs_share_workers_and_log_writer(tmp_path):
+    scheduler = Scheduler(
+        [make_job(tmp_path, "one", 60), make_job(tmp_path, "two", 60)], workers=2
+    )
+
+    one, two = scheduler.syncs
+
+    assert one.executor is two.executor is scheduler.executor
+    assert one.log_writer is two.log_writer
+
+
+def test_jobs_never_get_a_pool_of_their_own(tmp_path):
+    jobs = [make_job(tmp_path, "one", 60), make_job(tmp_path, "two", 60)]
+    for job in jobs:
+        job.workers = 8
+
+    scheduler = Scheduler(jobs, workers=1)
+
+    assert all(sync.executor is scheduler.executor for sync in scheduler.syncs)
+    assert scheduler.executor._max_workers == 1
+    assert all(sync.config.workers == 1 for sync in scheduler.syncs)
+
+
+def test_earliest_due_job_runs_first(tmp_path, mocker):
+    sleep = mocker.patch("scheduler.time.sleep")
+    scheduler = Scheduler(
+        [make_job(tmp_path, "slow", 3600), make_job(tmp_path, "fast", 1)], workers=1
+    )
+
+    ran = [scheduler.run_next().config.name for _ in range(3)]
+
+    assert ran == ["slow", "fast", "fast"]
+    assert os.path.exists(tmp_path / "fast" / "replica" / "a.txt")
+    assert os.path.exists(tmp_path / "slow" / "replica" / "a.txt")
+    assert sleep.call_count == 1
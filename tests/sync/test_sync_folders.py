@@ -0,0 +1,391 @@
+import json
+import os
+
+import pytest
+
+import sync as sync_module
+from async_walk import AsyncWalker
+from config import ConfigArgs
+from filters import PathFilter
+from sync import Sync
+from throttle import Throttle
+
+
+def write(path, content=b"content"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def tree(root):
+    return sorted(
+        os.path.relpath(os.path.join(folder, name), root)
+        for folder, dirs, files in os.walk(root)
+        for name in dirs + files
+    )
+
+
+def make_sync(tmp_path):
+    source = tmp_path / "source"
+    replica = tmp_path / "replica"
+    source.mkdir()
+    replica.mkdir()
+    config = ConfigArgs(
+        str(source),
+        str(replica),
+        60,
+        str(tmp_path / "sync.log"),
+        str(tmp_path / "sync_index.db"),
+        journal_file=str(tmp_path / "sync_journal.db"),
+    )
+    return Sync(configuration=config), str(source), str(replica)
+
+
+def test_sync_copies_nested_tree(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/a.txt", b"a")
+    write(f"{source}/one/two/three/b.txt", b"b")
+
+    assert sync.sync_folders(source, replica) is True
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/one/two/three/b.txt") == b"b"
+
+
+def test_sync_updates_and_deletes(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/keep/a.txt", b"new")
+    write(f"{replica}/keep/a.txt", b"old")
+    write(f"{replica}/keep/stale.txt")
+    write(f"{replica}/stale_dir/b.txt")
+
+    sync.sync_folders(source, replica)
+
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/keep/a.txt") == b"new"
+
+
+def test_unchanged_files_are_not_hashed_again(tmp_path, mocker):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/a.txt", b"same")
+    write(f"{replica}/a.txt", b"same")
+
+    sync.sync_folders(source, replica)
+    digest = mocker.patch("index.file_digest")
+    sync.sync_folders(source, replica)
+
+    digest.assert_not_called()
+
+
+def test_file_removed_after_the_scan_does_not_stop_the_pass(tmp_path):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/a.txt", b"same")
+    write(f"{source}/b.txt", b"new")
+    write(f"{replica}/a.txt", b"same")
+    config = ConfigArgs(source, replica, 60, str(tmp_path / "sync.log"), "")
+    sync = Sync(configuration=config)
+    scan = sync.scan
+
+    def scan_then_remove(folder):
+        entries = scan(folder)
+        if folder == source:
+            for entry in entries:
+                entry.stat()
+            os.remove(f"{source}/a.txt")
+        return entries
+
+    sync.scan = scan_then_remove
+    sync.sync_folders(source, replica)
+
+    assert read(f"{replica}/a.txt") == b"same"
+    assert read(f"{replica}/b.txt") == b"new"
+
+
+def test_sync_paths_only_touches_given_paths(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/changed.txt", b"changed")
+    write(f"{source}/untouched.txt", b"untouched")
+    write(f"{source}/new_dir/deep/b.txt", b"b")
+    write(f"{replica}/removed.txt")
+
+    sync.sync_paths(
+        source,
+        replica,
+        {
+            f"{source}/changed.txt",
+            f"{source}/new_dir/deep/b.txt",
+            f"{source}/removed.txt",
+        },
+    )
+
+    assert tree(replica) == ["changed.txt", "new_dir", "new_dir/deep", "new_dir/deep/b.txt"]
+
+
+def test_concurrent_workers_sync_whole_tree(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    for folder in range(5):
+        for file in range(20):
+            write(f"{source}/{folder}/sub/{file}.txt", f"{folder}-{file}".encode())
+
+    sync.sync_folders(source, replica)
+
+    assert sync.executor is not None
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/4/sub/19.txt") == b"4-19"
+
+
+def test_sync_records_metrics_and_writes_stats(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.stats_file = str(tmp_path / "stats.prom")
+    write(f"{source}/a.txt", b"abc")
+    write(f"{source}/sub/b.txt", b"de")
+
+    sync.sync_folders(source, replica)
+
+    assert sync.metrics.last_pass["bytes_copied"] == 5
+    assert sync.metrics.operations["copy_file"] == 2
+    assert sync.metrics.operations["create_folder"] == 1
+    assert "walk_seconds" in sync.metrics.last_pass
+    assert "sync_bytes_copied_total 5" in (tmp_path / "stats.prom").read_text()
+
+
+def test_adaptive_interval_follows_changes(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.adaptive_interval = True
+    sync.config.min_interval = 5
+    sync.config.max_interval = 100
+
+    assert sync.adapt_interval(changes=3, elapsed=0.1) == 30
+    assert sync.adapt_interval(changes=3, elapsed=0.1) == 15
+    assert sync.adapt_interval(changes=3, elapsed=0.1) == 7.5
+    assert sync.adapt_interval(changes=3, elapsed=0.1) == 5
+    assert sync.adapt_interval(changes=0, elapsed=0.1) == 10
+    assert sync.adapt_interval(changes=0, elapsed=0.1) == 20
+    assert sync.adapt_interval(changes=0, elapsed=400) == 400
+
+
+def test_fixed_interval_without_adaptive_mode(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+
+    assert sync.adapt_interval(changes=10, elapsed=120) == 60
+
+
+def test_full_verify_pass_finds_in_place_changes(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.dir_skip = True
+    sync.config.full_verify_every = 3
+    write(f"{source}/sub/a.txt", b"old")
+
+    sync.sync_folders(source, replica)
+    sync.sync_folders(source, replica)
+    stat = os.stat(f"{source}/sub")
+    write(f"{source}/sub/a.txt", b"new")
+    os.utime(f"{source}/sub", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    sync.sync_folders(source, replica)
+    assert read(f"{replica}/sub/a.txt") == b"old"
+
+    sync.sync_folders(source, replica)
+    assert read(f"{replica}/sub/a.txt") == b"new"
+
+
+def test_dry_run_reports_without_touching_the_replica(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/a.txt", b"abc")
+    write(f"{replica}/stale.txt", b"x")
+
+    report = sync.dry_run(source, replica)
+
+    assert report["operations"]["copy_file"] == {"count": 1, "bytes": 3}
+    assert report["operations"]["delete_file"] == {"count": 1, "bytes": 1}
+    assert report["total"] == {"count": 2, "bytes": 4}
+    assert report["estimated_seconds"] is not None
+    assert tree(replica) == ["stale.txt"]
+
+
+def test_dry_run_report_on_stdout_is_not_mixed_with_the_log(tmp_path, mocker, capsys):
+    source = str(tmp_path / "source")
+    replica = str(tmp_path / "replica")
+    write(f"{source}/a.txt", b"abc")
+    write(f"{source}/locked/b.txt", b"x")
+    os.makedirs(replica)
+    config = ConfigArgs(
+        source,
+        replica,
+        60,
+        str(tmp_path / "sync.log"),
+        "",
+        dry_run="-",
+        journal_file="",
+    )
+    sync = Sync(configuration=config)
+    scandir = os.scandir
+
+    def failing_scandir(folder):
+        if folder.endswith("locked"):
+            raise PermissionError(13, "Permission denied", folder)
+        return scandir(folder)
+
+    mocker.patch("diff.os.scandir", side_effect=failing_scandir)
+    sync.start()
+    output = capsys.readouterr()
+
+    assert json.loads(output.out)["operations"]["copy_file"]["count"] == 1
+    assert "Permission denied" in output.err
+
+
+def test_moved_files_and_folders_are_not_copied_again(tmp_path, mocker):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.detect_moves = True
+    write(f"{source}/photos/a.jpg", b"a")
+    write(f"{source}/photos/deep/b.jpg", b"b")
+    write(f"{source}/c.txt", b"c")
+    write(f"{source}/docs/keep.txt", b"k")
+
+    sync.sync_folders(source, replica)
+    sync.sync_folders(source, replica)
+    os.rename(f"{source}/photos", f"{source}/pictures")
+    os.rename(f"{source}/c.txt", f"{source}/docs/c.txt")
+    transfer = mocker.patch("sync.transfer_file")
+    digest = mocker.patch("index.file_digest")
+
+    sync.sync_folders(source, replica)
+
+    transfer.assert_not_called()
+    digest.assert_not_called()
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/pictures/deep/b.jpg") == b"b"
+    assert read(f"{replica}/docs/c.txt") == b"c"
+    assert sync.metrics.operations["move_path"] == 2
+
+
+def test_dedup_links_identical_files_and_breaks_links_on_update(tmp_path, mocker):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.dedup = "hardlink"
+    write(f"{source}/a.bin", b"shared")
+
+    sync.sync_folders(source, replica)
+    write(f"{source}/vendor/b.bin", b"shared")
+    transfer = mocker.spy(sync_module, "transfer_file")
+    sync.sync_folders(source, replica)
+
+    transfer.assert_not_called()
+    assert os.stat(f"{replica}/vendor/b.bin").st_ino == os.stat(f"{replica}/a.bin").st_ino
+    assert sync.metrics.counters["bytes_deduplicated"] == 6
+
+    write(f"{source}/vendor/b.bin", b"changed")
+    sync.sync_folders(source, replica)
+
+    assert read(f"{replica}/vendor/b.bin") == b"changed"
+    assert read(f"{replica}/a.bin") == b"shared"
+    assert os.stat(f"{replica}/a.bin").st_nlink == 1
+
+
+def test_byte_limit_throttles_copies(tmp_path, mocker):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.max_bytes_per_second = 1000
+    sync.throttle = Throttle(1000, burst_seconds=1.0, metrics=sync.metrics)
+    write(f"{source}/a.bin", b"x" * 3000)
+    sleep = mocker.patch("throttle.time.sleep")
+
+    sync.sync_folders(source, replica)
+
+    assert read(f"{replica}/a.bin") == b"x" * 3000
+    assert sum(call.args[0] for call in sleep.call_args_list) == pytest.approx(2, abs=0.1)
+
+
+def test_sync_paths_skips_excluded_paths(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    sync.filters = PathFilter([".git/"])
+    write(f"{source}/.git/objects/a", b"a")
+    write(f"{source}/b.txt", b"b")
+
+    sync.sync_paths(source, replica, {f"{source}/.git/objects/a", f"{source}/b.txt"})
+
+    assert tree(replica) == ["b.txt"]
+
+
+def test_sync_paths_replaces_a_broken_symlink_in_the_replica(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/a.txt", b"a")
+    os.symlink(f"{tmp_path}/missing", f"{replica}/a.txt")
+
+    sync.sync_paths(source, replica, {f"{source}/a.txt"})
+
+    assert not os.path.islink(f"{replica}/a.txt")
+    assert read(f"{replica}/a.txt") == b"a"
+
+
+def test_concurrent_walk_syncs_the_tree(tmp_path):
+    sync, source, replica = make_sync(tmp_path)
+    sync.config.dir_skip = True
+    sync.walker = AsyncWalker(4)
+    write(f"{source}/a/b/c.txt", b"c")
+    write(f"{source}/a/d.txt", b"d")
+    write(f"{replica}/stale/e.txt", b"e")
+
+    sync.sync_folders(source, replica)
+    write(f"{source}/a/b/c.txt", b"changed")
+    sync.sync_folders(source, replica)
+
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/a/b/c.txt") == b"changed"
+
+
+def test_interrupted_pass_resumes_without_walking_completed_directories(
+    tmp_path, mocker
+):
+    sync, source, replica = make_sync(tmp_path)
+    sync.executor = None
+    for name in ("a", "b", "c"):
+        write(f"{source}/{name}.txt", name.encode())
+        write(f"{source}/sub/{name}.txt", name.encode())
+    copy_file = Sync.copy_file
+    copies = []
+
+    def interrupted_copy(self, source_file, replica_file):
+        if len(copies) == 4:
+            raise KeyboardInterrupt
+        copies.append(source_file)
+        return copy_file(self, source_file, replica_file)
+
+    mocker.patch.object(Sync, "copy_file", interrupted_copy)
+    with pytest.raises(KeyboardInterrupt):
+        sync.sync_folders(source, replica)
+    mocker.stopall()
+
+    restarted = Sync(configuration=sync.config)
+    scan = mocker.spy(restarted, "scan")
+    restarted.sync_folders(source, replica)
+
+    assert tree(replica) == tree(source)
+    assert read(f"{replica}/sub/c.txt") == b"c"
+    assert [call.args[0] for call in scan.call_args_list] == [
+        os.path.join(source, "sub"),
+        os.path.join(replica, "sub"),
+    ]
+    assert restarted.journal.begin(source, replica) is False
+
+
+def test_changes_left_behind_in_completed_directories_are_planned_again(
+    tmp_path, mocker
+):
+    sync, source, replica = make_sync(tmp_path)
+    write(f"{source}/a.txt", b"a")
+    write(f"{source}/b.txt", b"b")
+    write(f"{replica}/b.txt", b"b")
+    sync.journal.begin(source, replica)
+    sync.journal.complete_directory("", [])
+    sync.journal.planned("a.txt", "copy_file")
+    sync.journal.checkpoint()
+
+    scan = mocker.spy(sync, "scan")
+    sync.sync_folders(source, replica)
+
+    assert read(f"{replica}/a.txt") == b"a"
+    scan.assert_not_called()
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import throttle
+from throttle import Throttle, TokenBucket, parse_hours, valid_hours
+
+
+def test_burst_is_free_and_debt_is_slept(mocker):
+    sleep = mocker.patch("throttle.time.sleep")
+    mocker.patch("throttle.time.monotonic", return_value=100.0)
+    bucket = TokenBucket(rate=10, burst=20)
+
+    assert bucket.consume(20) == 0.0
+    assert bucket.consume(5) == pytest.approx(0.5)
+    assert bucket.consume(10) == pytest.approx(1.5)
+    sleep.assert_called_with(pytest.approx(1.5))
+
+
+def test_tokens_refill_up_to_the_burst(mocker):
+    clock = mocker.patch("throttle.time.monotonic", return_value=0.0)
+    mocker.patch("throttle.time.sleep")
+    bucket = TokenBucket(rate=10, burst=20)
+    bucket.consume(20)
+
+    clock.return_value = 1000.0
+
+    assert bucket.consume(20) == 0.0
+    assert bucket.consume(10) == pytest.approx(1.0)
+
+
+def test_unlimited_bucket_never_sleeps(mocker):
+    sleep = mocker.patch("throttle.time.sleep")
+
+    assert TokenBucket(rate=0, burst=0).consume(10**12) == 0.0
+    sleep.assert_not_called()
+
+
+def test_hours_windows_and_midnight():
+    limits = Throttle(bytes_per_second=1, hours="08:00-12:00, 22:30-02:00")
+
+    assert parse_hours("08:00-12:00") == [(480, 720)]
+    assert limits.active(datetime(2024, 1, 1, 9, 0))
+    assert limits.active(datetime(2024, 1, 1, 23, 0))
+    assert limits.active(datetime(2024, 1, 1, 1, 59))
+    assert not limits.active(datetime(2024, 1, 1, 12, 0))
+    assert not limits.active(datetime(2024, 1, 1, 2, 0))
+    assert valid_hours("")
+    assert not valid_hours("08:00")
+    assert not valid_hours("25:00-26:00")
+
+
+def test_limits_only_apply_inside_the_windows(mocker):
+    limits = Throttle(bytes_per_second=1, ops_per_second=1, hours="08:00-09:00")
+    mocker.patch.object(limits, "active", return_value=False)
+    sleep = mocker.patch("throttle.time.sleep")
+
+    limits.consume(10**9)
+    limits.operation()
+    limits.operation()
+
+    sleep.assert_not_called()
+
+
+def test_io_class_uses_ioprio_set(mocker):
+    libc = mocker.patch("throttle.ctypes.CDLL").return_value
+    libc.syscall.return_value = 0
+    mocker.patch("throttle.platform.machine", return_value="x86_64")
+    mocker.patch("throttle.platform.system", return_value="Linux")
+
+    throttle.set_priority(0, "idle")
+
+    libc.syscall.assert_called_once_with(251, 1, 0, 3 << 13)
@@ -0,0 +1,39 @@
+import os
+
+from utils import READ_BUFFER_SIZE, bytes_are_equal
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_identical_multi_block_files_are_equal(tmp_path):
+    content = os.urandom(READ_BUFFER_SIZE * 2 + 10)
+    write(tmp_path / "a", content)
+    write(tmp_path / "b", content)
+
+    assert bytes_are_equal(tmp_path / "a", tmp_path / "b") is True
+
+
+def test_difference_in_last_partial_block_is_found(tmp_path):
+    content = bytearray(READ_BUFFER_SIZE + 10)
+    write(tmp_path / "a", bytes(content))
+    content[-1] = 1
+    write(tmp_path / "b", bytes(content))
+
+    assert bytes_are_equal(tmp_path / "a", tmp_path / "b") is False
+
+
+def test_files_with_different_lengths_are_not_equal(tmp_path):
+    write(tmp_path / "a", b"content")
+    write(tmp_path / "b", b"content and more")
+
+    assert bytes_are_equal(tmp_path / "a", tmp_path / "b") is False
+
+
+def test_empty_files_are_equal(tmp_path):
+    write(tmp_path / "a", b"")
+    write(tmp_path / "b", b"")
+
+    assert bytes_are_equal(tmp_path / "a", tmp_path / "b") is True
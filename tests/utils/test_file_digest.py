@@ -0,0 +1,23 @@
+import hashlib
+
+import pytest
+
+from utils import HASH_ALGORITHMS, file_digest
+
+
+@pytest.mark.parametrize("algorithm", sorted(HASH_ALGORITHMS))
+def test_digest_matches_the_hash_of_the_content(tmp_path, algorithm):
+    file = tmp_path / "a.bin"
+    content = b"Hello, World!" * 100_000
+    file.write_bytes(content)
+
+    assert file_digest(str(file), algorithm) == HASH_ALGORITHMS[algorithm](
+        content
+    ).hexdigest()
+
+
+def test_default_algorithm_is_sha256(tmp_path):
+    file = tmp_path / "a.bin"
+    file.write_bytes(b"content")
+
+    assert file_digest(str(file)) == hashlib.sha256(b"content").hexdigest()
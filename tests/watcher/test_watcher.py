@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+from watcher import Watcher
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+
+
+def test_wait_times_out_without_events(tmp_path):
+    watcher = Watcher(str(tmp_path))
+
+    assert watcher.wait(0.05) == set()
+
+    watcher.close()
+
+
+def test_burst_of_events_is_coalesced(tmp_path):
+    watcher = Watcher(str(tmp_path))
+    file = str(tmp_path / "a.txt")
+
+    for content in (b"1", b"2", b"3"):
+        with open(file, "wb") as f:
+            f.write(content)
+
+    assert watcher.wait(1) == {file}
+
+    watcher.close()
+
+
+def test_new_folders_are_watched(tmp_path):
+    watcher = Watcher(str(tmp_path))
+    folder = str(tmp_path / "new")
+    os.mkdir(folder)
+    watcher.wait(1)
+
+    with open(f"{folder}/a.txt", "wb") as f:
+        f.write(b"content")
+
+    assert watcher.wait(1) == {f"{folder}/a.txt"}
+
+    watcher.close()
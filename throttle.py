@@ -0,0 +1,254 @@
+import ctypes
+import os
+import platform
+import threading
+import time
+from datetime import datetime
+
+from metrics import Metrics
+
+IO_CLASSES: dict[str, tuple[int, int]] = {
+    "best-effort": (2, 7),
+    "idle": (3, 0),
+}
+IOPRIO_CLASS_SHIFT: int = 13
+IOPRIO_WHO_PROCESS: int = 1
+IOPRIO_SET_SYSCALLS: dict[str, int] = {
+    "x86_64": 251,
+    "aarch64": 30,
+    "i686": 289,
+    "armv7l": 314,
+    "ppc64le": 273,
+}
+
+
+class TokenBucket:
+    """
+    TokenBucket limits a rate while allowing bursts. Tokens are refilled continuously up to
+    the burst capacity, and a consumer taking more tokens than available goes into debt and
+    sleeps until the debt is repaid, so concurrent consumers share the rate.
+
+    Attributes:
+        rate (float): The tokens refilled per second, 0 for no limit.
+        burst (float): The maximum number of tokens saved up while idle.
+        tokens (float): The tokens currently available, negative while in debt.
+
+    Methods:
+        consume(amount: float) -> float: Take tokens, sleeping while the bucket is in debt.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.lock = threading.Lock()
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.updated: float = time.monotonic()
+
+    def __str__(self):
+        return "TokenBucket"
+
+    def consume(self, amount: float) -> float:
+        """
+        Take tokens, sleeping while the bucket is in debt
+
+        Parameters:
+            amount (float): The number of tokens taken, such as bytes read or written.
+
+        Returns:
+            float: The seconds slept.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def parse_hours(hours: str) -> list[tuple[int, int]]:
+    """
+    Parse comma separated time of day windows such as "08:00-20:00,22:30-02:00".
+
+    Parameters:
+        hours (str): The windows, a window ending before it starts spans midnight.
+
+    Returns:
+        list[tuple[int, int]]: The start and end of each window in minutes since midnight.
+    """
+    windows = []
+
+    for window in filter(None, (part.strip() for part in hours.split(","))):
+        start, end = (
+            datetime.strptime(bound.strip(), "%H:%M") for bound in window.split("-")
+        )
+        windows.append((start.hour * 60 + start.minute, end.hour * 60 + end.minute))
+
+    return windows
+
+
+def valid_hours(hours: str) -> bool:
+    """
+    Check if time of day windows can be parsed.
+
+    Parameters:
+        hours (str): The comma separated windows.
+
+    Returns:
+        bool: True if every window is valid, False otherwise.
+    """
+    try:
+        parse_hours(hours)
+        return True
+    except ValueError:
+        return False
+
+
+class Throttle:
+    """
+    Throttle caps the bytes and operations per second of the sync, optionally only during
+    time of day windows. The byte limit is charged chunk by chunk from the copy, update and
+    hash loops, the operation limit once per applied change.
+
+    Attributes:
+        bytes (TokenBucket): The bucket of bytes read or written.
+        operations (TokenBucket): The bucket of applied operations.
+        windows (list[tuple[int, int]]): The windows the limits apply in, empty for always.
+        metrics (Metrics | None): The metrics counting the time spent throttled.
+
+    Methods:
+        active() -> bool: Check if the limits apply now.
+        consume(size: int) -> None: Charge bytes read or written.
+        operation() -> None: Charge an applied operation.
+        record(seconds: float) -> None: Count the time spent sleeping.
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: int = 0,
+        ops_per_second: int = 0,
+        burst_seconds: float = 1.0,
+        hours: str = "",
+        metrics: Metrics | None = None,
+    ):
+        self.bytes: TokenBucket = TokenBucket(
+            bytes_per_second, bytes_per_second * burst_seconds
+        )
+        self.operations: TokenBucket = TokenBucket(
+            ops_per_second, max(ops_per_second * burst_seconds, 1)
+        )
+        self.windows: list[tuple[int, int]] = parse_hours(hours)
+        self.metrics: Metrics | None = metrics
+
+    def __str__(self):
+        return "Throttle"
+
+    def active(self, now: datetime | None = None) -> bool:
+        """
+        Check if the limits apply at a time of day
+
+        Parameters:
+            now (datetime | None): The time to check, the current local time if None.
+
+        Returns:
+            bool: True if there are no windows or the time is inside one, False otherwise.
+        """
+        if not self.windows:
+            return True
+
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+
+        for start, end in self.windows:
+            if start <= end and start <= minute < end:
+                return True
+            if start > end and (minute >= start or minute < end):
+                return True
+
+        return False
+
+    def consume(self, size: int) -> None:
+        """
+        Charge bytes read or written, sleeping while over the byte limit
+
+        Parameters:
+            size (int): The number of bytes.
+
+        Returns:
+            None
+        """
+        if self.bytes.rate > 0 and self.active():
+            self.record(self.bytes.consume(size))
+
+    def operation(self) -> None:
+        """
+        Charge an applied operation, sleeping while over the operation limit
+
+        Returns:
+            None
+        """
+        if self.operations.rate > 0 and self.active():
+            self.record(self.operations.consume(1))
+
+    def record(self, seconds: float) -> None:
+        """
+        Count the time spent sleeping in the throttle phase
+
+        Parameters:
+            seconds (float): The seconds slept.
+
+        Returns:
+            None
+        """
+        if seconds and self.metrics:
+            self.metrics.add_phase("throttle", seconds)
+
+
+def set_priority(nice: int, io_class: str) -> None:
+    """
+    Set the CPU and I/O scheduling priority of the whole process.
+
+    Parameters:
+        nice (int): The niceness, from -20 to 19, 0 to leave it unchanged.
+        io_class (str): "best-effort" for the lowest best-effort level, "idle" to only
+            use the disk when no other process does, empty to leave it unchanged.
+
+    Returns:
+        None
+
+    Raises:
+        OSError: If the priority can't be set, such as a negative niceness without privileges
+            or an I/O class on a system without ioprio_set.
+    """
+    if nice:
+        os.setpriority(os.PRIO_PROCESS, 0, nice)
+
+    if not io_class:
+        return
+
+    syscall = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if syscall is None or platform.system() != "Linux":
+        raise OSError(f"ioprio_set is not available on {platform.machine()}")
+
+    priority_class, level = IO_CLASSES[io_class]
+    libc = ctypes.CDLL(None, use_errno=True)
+
+    if (
+        libc.syscall(
+            syscall,
+            IOPRIO_WHO_PROCESS,
+            0,
+            (priority_class << IOPRIO_CLASS_SHIFT) | level,
+        )
+        != 0
+    ):
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
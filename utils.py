@@ -1,36 +1,125 @@
 import hashlib
 import os
-
-
-def files_are_equal(file1: str, file2: str) -> bool:
+from typing import Callable
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+READ_BUFFER_SIZE: int = 1024 * 1024
+HASH_ALGORITHMS: dict = {
+    "md5": hashlib.md5,
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+if xxhash is not None:
+    HASH_ALGORITHMS["xxh3_128"] = xxhash.xxh3_128
+    HASH_ALGORITHMS["xxh64"] = xxhash.xxh64
+
+COMPARE_METHODS: tuple[str, ...] = (*HASH_ALGORITHMS, "bytes")
+DEFAULT_COMPARE_METHOD: str = "sha256"
+
+
+def files_are_equal(
+    file1: str,
+    file2: str,
+    method: str = DEFAULT_COMPARE_METHOD,
+    throttle: Callable[[int], None] | None = None,
+    stats: tuple[os.stat_result, os.stat_result] | None = None,
+) -> bool:
     """
-    Check if two files are equal by comparing their content using MD5 hash.
+    Check if two files are equal by comparing their content.
     :param file1: str - The path to the first file to be compared.
     :param file2: str - The path to the second file to be compared.
+    :param method: str - A hash algorithm from HASH_ALGORITHMS, or "bytes" to compare the content directly.
+    :param throttle: Callable[[int], None] | None - Called with the bytes read after each block.
+    :param stats: tuple[os.stat_result, os.stat_result] | None - The metadata of both files from their
+        directory listing, None to stat them here.
     :return: bool - True if the files have the same content, False otherwise.
     """
 
-    if not os.path.exists(file1) or not os.path.exists(file2):
-        return False
+    if stats is None:
+        if not os.path.exists(file1) or not os.path.exists(file2):
+            return False
+        sizes = (os.path.getsize(file1), os.path.getsize(file2))
+    else:
+        sizes = (stats[0].st_size, stats[1].st_size)
 
-    if os.path.getsize(file1) != os.path.getsize(file2):
+    if sizes[0] != sizes[1]:
         return False
 
     if file1.split("/")[-1] != file2.split("/")[-1]:
         return False
 
-    hash1 = hashlib.md5()
-    hash2 = hashlib.md5()
+    if method == "bytes":
+        return bytes_are_equal(file1, file2, throttle)
+
+    return file_digest(file1, method, throttle) == file_digest(file2, method, throttle)
+
+
+def file_digest(
+    file: str,
+    algorithm: str = DEFAULT_COMPARE_METHOD,
+    throttle: Callable[[int], None] | None = None,
+) -> str:
+    """
+    Compute the hash of a file content, reading it through a large reusable buffer.
+    :param file: str - The path to the file to be hashed.
+    :param algorithm: str - The name of the hash algorithm, a key of HASH_ALGORITHMS.
+    :param throttle: Callable[[int], None] | None - Called with the bytes read after each block.
+    :return: str - The hexadecimal digest of the file content.
+    """
+    with open(file, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest") and not throttle:
+            return hashlib.file_digest(f, HASH_ALGORITHMS[algorithm]).hexdigest()
+
+        digest = HASH_ALGORITHMS[algorithm]()
+        buffer = bytearray(READ_BUFFER_SIZE)
+        view = memoryview(buffer)
+
+        while read := f.readinto(buffer):
+            digest.update(view[:read])
+            if throttle:
+                throttle(read)
+
+        return digest.hexdigest()
+
+
+def bytes_are_equal(
+    file1: str, file2: str, throttle: Callable[[int], None] | None = None
+) -> bool:
+    """
+    Check if two files have the same content by comparing them block by block,
+    stopping at the first block that differs.
+    :param file1: str - The path to the first file to be compared.
+    :param file2: str - The path to the second file to be compared.
+    :param throttle: Callable[[int], None] | None - Called with the bytes read after each block.
+    :return: bool - True if the files have the same content, False otherwise.
+    """
+    with open(file1, "rb") as f1, open(file2, "rb") as f2:
+        size = min(READ_BUFFER_SIZE, max(os.fstat(f1.fileno()).st_size, 1))
+        buffer1 = bytearray(size)
+        buffer2 = bytearray(size)
+
+        while True:
+            read1 = f1.readinto(buffer1)
+            read2 = f2.readinto(buffer2)
+
+            if throttle:
+                throttle(read1 + read2)
 
-    with open(file1, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash1.update(chunk)
+            if read1 != read2:
+                return False
 
-    with open(file2, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash2.update(chunk)
+            if not read1:
+                return True
 
-    return hash1.hexdigest() == hash2.hexdigest()
+            if read1 == size:
+                if buffer1 != buffer2:
+                    return False
+            elif buffer1[:read1] != buffer2[:read2]:
+                return False
 
 
 def valid_path_folder(path: str) -> bool:
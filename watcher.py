@@ -0,0 +1,212 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = (
+    IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher:
+    """
+    Watcher subscribes to Linux inotify events on every folder of a tree through ctypes,
+    and reports the paths that changed after a burst of events has settled.
+
+    Attributes:
+        folder (str): The root folder being watched.
+        settle_delay (float): Seconds without events after which a burst is considered finished.
+        max_delay (float): Maximum seconds a burst is coalesced before its paths are reported.
+        watches (dict[int, str]): The watched folders keyed by their watch descriptor.
+
+    Methods:
+        add_tree(folder: str) -> None: Watch a folder and all its subfolders.
+        remove_tree(folder: str) -> None: Stop watching a folder and all its subfolders.
+        read_events() -> tuple[set[str], bool]: Read the pending events.
+        wait(timeout: float) -> set[str] | None: Wait for changes and return the affected paths.
+        close() -> None: Release the inotify file descriptor.
+
+    Raises:
+        OSError: If inotify is not available on this system.
+    """
+
+    def __init__(self, folder: str, settle_delay: float = 0.1, max_delay: float = 1.0):
+        self.folder: str = folder
+        self.settle_delay: float = settle_delay
+        self.max_delay: float = max_delay
+        self.watches: dict[int, str] = {}
+
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+
+        self.libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd: int = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        self.add_tree(folder)
+
+    def __str__(self):
+        return "Watcher"
+
+    def add_tree(self, folder: str) -> None:
+        """
+        Watch a folder and all its subfolders
+
+        Parameters:
+            folder (str): The folder to watch.
+
+        Returns:
+            None
+        """
+        for root, dirs, files in os.walk(folder):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+
+            if wd < 0:
+                error = ctypes.get_errno()
+                print(f"Can't watch {root}: {os.strerror(error)}")
+                continue
+
+            self.watches[wd] = root
+
+    def remove_tree(self, folder: str) -> None:
+        """
+        Stop watching a folder and all its subfolders
+
+        Parameters:
+            folder (str): The folder to stop watching.
+
+        Returns:
+            None
+        """
+        prefix = f"{folder}{os.sep}"
+
+        for wd, path in list(self.watches.items()):
+            if path == folder or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def read_events(self) -> tuple[set[str], bool]:
+        """
+        Read the pending events without blocking
+
+        Returns:
+            tuple[set[str], bool]: The paths affected by the events and whether the kernel queue overflowed.
+        """
+        paths: set[str] = set()
+        overflow = False
+
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+
+                folder = self.watches.get(wd)
+                if folder is None:
+                    continue
+
+                if mask & IN_IGNORED:
+                    del self.watches[wd]
+                    continue
+
+                path = os.path.join(folder, name) if name else folder
+                paths.add(path)
+
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.remove_tree(path)
+
+        return paths, overflow
+
+    def wait(self, timeout: float) -> set[str] | None:
+        """
+        Wait for changes and return the affected paths
+
+        After the first event, events keep being collected until no new event arrives
+        for settle_delay seconds or max_delay seconds have passed, so bursts are synced once.
+
+        Parameters:
+            timeout (float): Maximum seconds to wait for the first event.
+
+        Returns:
+            set[str] | None: The affected paths, empty on timeout, None if events were lost and a full sync is needed.
+        """
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+
+        if not poller.poll(max(timeout, 0) * 1000):
+            return set()
+
+        paths: set[str] = set()
+        overflow = False
+        deadline = time.monotonic() + self.max_delay
+
+        while True:
+            new_paths, new_overflow = self.read_events()
+            paths |= new_paths
+            overflow = overflow or new_overflow
+
+            remaining = min(self.settle_delay, deadline - time.monotonic())
+            if remaining <= 0 or not poller.poll(remaining * 1000):
+                break
+
+        return None if overflow else paths
+
+    def close(self) -> None:
+        """
+        Release the inotify file descriptor
+
+        Returns:
+            None
+        """
+        os.close(self.fd)